@@ -1,7 +1,9 @@
 from django.contrib import admin
 from .models import (
     Branch, Department, Role, Profile, Category, TaxCode, UOM, Warehouse, Size, Color,
-    Supplier, Product, CandidateDocument, Candidate, GovernmentHoliday, Attendance, Task, Customer
+    Supplier, Product, CandidateDocument, Candidate, GovernmentHoliday, Attendance, Task, Customer,
+    DocumentSequence, OutboundEmail, AttendanceMonth, DepartmentAttendanceMonth, AttendancePunch, CustomerMatch,
+    CustomerMerge, StockMovement, StockLevel
 )
 
 @admin.register(Branch)
@@ -69,6 +71,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('product_type', 'status', 'category', 'warehouse')
     search_fields = ('product_id', 'name')
     autocomplete_fields = ['category', 'tax_code', 'uom', 'warehouse', 'size', 'color', 'supplier']
+    readonly_fields = ('quantity',)
 
 @admin.register(CandidateDocument)
 class CandidateDocumentAdmin(admin.ModelAdmin):
@@ -95,6 +98,27 @@ class AttendanceAdmin(admin.ModelAdmin):
     search_fields = ('user__username',)
     autocomplete_fields = ['user']
 
+@admin.register(AttendancePunch)
+class AttendancePunchAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'ts', 'punch_type')
+    list_filter = ('date', 'punch_type')
+    search_fields = ('user__username',)
+    autocomplete_fields = ['user', 'attendance']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(AttendanceMonth)
+class AttendanceMonthAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'month', 'present_days', 'absent_days', 'total_hours')
+    list_filter = ('year', 'month')
+    search_fields = ('user__username',)
+
+@admin.register(DepartmentAttendanceMonth)
+class DepartmentAttendanceMonthAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'department', 'year', 'month', 'present_days', 'absent_days', 'total_hours')
+    list_filter = ('year', 'month', 'branch')
+
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ('name', 'status', 'priority', 'assigned_to', 'due_date')
@@ -107,4 +131,44 @@ class CustomerAdmin(admin.ModelAdmin):
     list_display = ('customer_id', 'first_name', 'last_name', 'customer_type', 'status')
     list_filter = ('customer_type', 'status')
     search_fields = ('customer_id', 'first_name', 'last_name', 'email')
-    autocomplete_fields = ['assigned_sales_rep']
\ No newline at end of file
+    autocomplete_fields = ['assigned_sales_rep']
+
+@admin.register(CustomerMerge)
+class CustomerMergeAdmin(admin.ModelAdmin):
+    list_display = ('primary', 'primary_customer_id', 'credit_limit_added', 'merged_by', 'merged_at')
+    list_filter = ('merged_at',)
+    search_fields = ('primary_customer_id', 'primary__first_name', 'primary__last_name')
+    readonly_fields = ('merged_customers', 'moved_records')
+
+@admin.register(CustomerMatch)
+class CustomerMatchAdmin(admin.ModelAdmin):
+    list_display = ('customer', 'match', 'score')
+    search_fields = ('customer__first_name', 'customer__last_name', 'match__first_name', 'match__last_name')
+    autocomplete_fields = ['customer', 'match']
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ('series', 'scope', 'last_value', 'updated_at')
+    list_filter = ('series',)
+    search_fields = ('series', 'scope')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'last_error')
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'quantity', 'document_type', 'document_id', 'created_at')
+    list_filter = ('document_type', 'warehouse')
+    search_fields = ('product__name', 'product__product_id')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(StockLevel)
+class StockLevelAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'on_hand', 'updated_at')
+    list_filter = ('warehouse',)
+    search_fields = ('product__name', 'product__product_id')
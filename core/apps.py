@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+
+        from .authentication import token_deleted, user_saved
+        post_save.connect(user_saved, sender=User, dispatch_uid='core.auth_cache.user_saved')
+        post_delete.connect(token_deleted, sender=Token, dispatch_uid='core.auth_cache.token_deleted')
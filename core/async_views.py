@@ -0,0 +1,91 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.template.loader import render_to_string
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .outbox import aqueue_email
+
+
+def run_mode_view(sync_view, async_view, **initkwargs):
+    # URLs serve the async variant when the project runs under ASGI (asgi.py sets
+    # ASYNC_VIEWS); under WSGI the sync view is kept, as an async view there would
+    # pay for an event loop per request and gain nothing
+    return (async_view if getattr(settings, 'ASYNC_VIEWS', False) else sync_view).as_view(**initkwargs)
+
+
+class AsyncAPIView(APIView):
+    # APIView whose handlers are coroutines. Authentication, permissions and throttles
+    # may query the database, so initial() runs on the sync thread; handlers use the
+    # async ORM, or sync_to_async for work that follows relations lazily.
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # options() is inherited from APIView and stays synchronous
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def get_view_name(self):
+        # OPTIONS and the browsable API describe the endpoint, not the variant serving it
+        name = super().get_view_name()
+        return name[len('Async '):] if name.startswith('Async ') else name
+
+
+async def arender_to_string(template_name, context):
+    # Templates follow the relations of the documents they render, which the async ORM
+    # cannot load lazily, so the whole render runs on the sync thread
+    return await sync_to_async(render_to_string)(template_name, context)
+
+
+class AsyncDocumentEmailView(AsyncAPIView):
+    # Queues a document's email template to the outbox. Subclasses set model, template,
+    # context_name, subject (formatted with the document) and label; owner_field limits
+    # the lookup to documents of the requesting user.
+    permission_classes = [permissions.IsAuthenticated]
+    model = None
+    template = None
+    context_name = None
+    subject = None
+    label = None
+    owner_field = None
+
+    def get_queryset(self, request):
+        documents = self.model.objects.all()
+        if self.owner_field:
+            documents = documents.filter(**{self.owner_field: request.user})
+        return documents
+
+    async def post(self, request, pk):
+        try:
+            document = await self.get_queryset(request).aget(id=pk)
+        except ObjectDoesNotExist:
+            return Response({'error': f'{self.label} not found'}, status=status.HTTP_404_NOT_FOUND)
+        email = request.data.get('email')
+        if not email:
+            return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
+        html_message = await arender_to_string(self.template, {self.context_name: document})
+        queued_email = await aqueue_email(
+            self.subject.format(document=document), html_message, [email], html=True, user=request.user,
+        )
+        return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
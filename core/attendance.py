@@ -0,0 +1,179 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import Attendance, AttendanceMonth, AttendancePunch, DepartmentAttendanceMonth, Profile
+
+HOUR = Decimal('0.01')
+
+
+class PunchError(Exception):
+    pass
+
+
+def _hours(value):
+    return Decimal(str(value or 0))
+
+
+def _bump(model, key, deltas):
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**key).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another request created the row first
+        model.objects.filter(**key).update(**updates)
+
+
+def day_deltas(hours, previous_hours=None, created=False):
+    # One day's change in the monthly rollups, from its previous state to its current one
+    hours = _hours(hours)
+    present = hours > 0
+    deltas = {'present_days': int(present), 'absent_days': int(not present), 'total_hours': hours}
+    if not created:
+        previous_hours = _hours(previous_hours)
+        deltas['present_days'] -= int(previous_hours > 0)
+        deltas['absent_days'] -= int(previous_hours <= 0)
+        deltas['total_hours'] -= previous_hours
+    return {field: value for field, value in deltas.items() if value}
+
+
+def _add(totals, key, deltas):
+    bucket = totals.setdefault(key, {})
+    for field, value in deltas.items():
+        bucket[field] = bucket.get(field, 0) + value
+
+
+def record_attendance_changes(changes):
+    # changes are (user_id, date, deltas) rows; deltas for the same month are
+    # combined so each rollup row is bumped once, with one profile query overall
+    changes = [(user_id, date, deltas) for user_id, date, deltas in changes if deltas]
+    if not changes:
+        return
+    profiles = {
+        user_id: (branch_id, department_id)
+        for user_id, branch_id, department_id in Profile.objects.filter(
+            user_id__in={user_id for user_id, _, _ in changes}
+        ).values_list('user_id', 'branch_id', 'department_id')
+    }
+    user_totals, department_totals = {}, {}
+    for user_id, date, deltas in changes:
+        branch_id, department_id = profiles.get(user_id, (None, None))
+        _add(user_totals, (user_id, date.year, date.month), deltas)
+        _add(department_totals, (branch_id, department_id, date.year, date.month), deltas)
+    _bump_all(AttendanceMonth, ('user_id', 'year', 'month'), user_totals)
+    _bump_all(DepartmentAttendanceMonth, ('branch_id', 'department_id', 'year', 'month'), department_totals)
+
+
+def _bump_all(model, key_fields, totals):
+    totals = {
+        key: {field: value for field, value in deltas.items() if value}
+        for key, deltas in totals.items()
+    }
+    totals = {key: deltas for key, deltas in totals.items() if deltas}
+    if len(totals) <= 1:
+        for key, deltas in totals.items():
+            _bump(model, dict(zip(key_fields, key)), deltas)
+        return
+    # Many months at once (bulk imports): lock the existing rows, update them in one
+    # statement and insert the missing ones in another
+    query = Q()
+    for key in totals:
+        query |= Q(**dict(zip(key_fields, key)))
+    rows = model.objects.select_for_update().filter(query)
+    existing = {tuple(getattr(row, field) for field in key_fields): row for row in rows}
+    for key, row in existing.items():
+        for field, value in totals[key].items():
+            setattr(row, field, getattr(row, field) + value)
+    model.objects.bulk_update(existing.values(), ['present_days', 'absent_days', 'total_hours'])
+    missing = {key: deltas for key, deltas in totals.items() if key not in existing}
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([model(**dict(zip(key_fields, key)), **deltas) for key, deltas in missing.items()])
+    except IntegrityError:
+        # Another request created some of the rows first
+        for key, deltas in missing.items():
+            _bump(model, dict(zip(key_fields, key)), deltas)
+
+
+def record_attendance_change(attendance, previous_hours=None, created=False):
+    record_attendance_changes([
+        (attendance.user_id, attendance.date, day_deltas(attendance.total_hours, previous_hours, created)),
+    ])
+
+
+def _rollup(queryset, *fields):
+    return queryset.annotate(year=ExtractYear('date'), month=ExtractMonth('date')).values(*fields, 'year', 'month').annotate(
+        present_days=Count('id', filter=Q(total_hours__gt=0)),
+        absent_days=Count('id', filter=Q(total_hours__lte=0)),
+        hours=Sum('total_hours'),
+    ).order_by()
+
+
+def rebuild_attendance_months(year=None):
+    # Recomputes both rollups from Attendance, attributing days to each user's current branch and department
+    attendance = Attendance.objects.all()
+    if year:
+        attendance = attendance.filter(date__year=year)
+    with transaction.atomic():
+        months = AttendanceMonth.objects.all()
+        department_months = DepartmentAttendanceMonth.objects.all()
+        if year:
+            months = months.filter(year=year)
+            department_months = department_months.filter(year=year)
+        months.delete()
+        department_months.delete()
+        user_rows = [
+            AttendanceMonth(
+                user_id=row['user_id'], year=row['year'], month=row['month'],
+                present_days=row['present_days'], absent_days=row['absent_days'], total_hours=row['hours'] or 0,
+            )
+            for row in _rollup(attendance, 'user_id')
+        ]
+        AttendanceMonth.objects.bulk_create(user_rows, batch_size=1000)
+        department_rows = [
+            DepartmentAttendanceMonth(
+                branch_id=row['user__profile__branch_id'], department_id=row['user__profile__department_id'],
+                year=row['year'], month=row['month'], present_days=row['present_days'],
+                absent_days=row['absent_days'], total_hours=row['hours'] or 0,
+            )
+            for row in _rollup(attendance, 'user__profile__branch_id', 'user__profile__department_id')
+        ]
+        DepartmentAttendanceMonth.objects.bulk_create(department_rows, batch_size=1000)
+    return len(user_rows), len(department_rows)
+
+
+def interval_hours(start, end):
+    return (Decimal(str((end - start).total_seconds())) / 3600).quantize(HOUR, ROUND_HALF_UP)
+
+
+def record_punch(user, date, is_check_in, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        attendance, created = Attendance.objects.get_or_create(user=user, date=date, defaults={'total_hours': 0})
+        if created:
+            record_attendance_change(attendance, created=True)
+        # The row lock serialises concurrent taps for the same user and day
+        attendance = Attendance.objects.select_for_update().get(pk=attendance.pk)
+        last_punch = attendance.punches.order_by('-ts', '-id').first()
+        is_open = last_punch is not None and last_punch.punch_type == 'in'
+        if is_check_in and is_open:
+            raise PunchError("Already checked in. Check out first.")
+        if not is_check_in and not is_open:
+            raise PunchError("Not checked in yet.")
+
+        AttendancePunch.objects.create(
+            attendance=attendance, user=user, date=date, ts=now, punch_type='in' if is_check_in else 'out',
+        )
+        if not is_check_in:
+            # Only the interval being closed is added; earlier punches are never re-read
+            previous_hours = attendance.total_hours
+            attendance.total_hours = _hours(previous_hours) + interval_hours(last_punch.ts, now)
+            attendance.save(update_fields=['total_hours'])
+            record_attendance_change(attendance, previous_hours)
+    return attendance
@@ -0,0 +1,141 @@
+import codecs
+import csv
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .attendance import day_deltas, interval_hours, record_attendance_changes
+from .models import Attendance, AttendancePunch, Profile
+
+REQUIRED_FIELDS = ['employee_id', 'timestamp']
+BATCH_SIZE = 1000
+
+
+def read_csv(file):
+    # Expects a binary file; a BOM from spreadsheet exports is dropped
+    return csv.DictReader(codecs.iterdecode(file, 'utf-8-sig'))
+
+
+def _parse(value):
+    try:
+        ts = parse_datetime(str(value or '').strip())
+    except ValueError:
+        return None
+    if ts is not None and timezone.is_naive(ts):
+        # Terminals export wall-clock time in the site's timezone
+        ts = timezone.make_aware(ts)
+    return ts
+
+
+def _read(rows, report):
+    punches = []
+    for number, row in enumerate(rows, start=1):
+        report['received'] += 1
+        employee_id = str(row.get('employee_id') or '').strip()
+        ts = _parse(row.get('timestamp'))
+        if not employee_id or ts is None:
+            report['errors'].append({'row': number, 'error': 'employee_id and a valid timestamp are required'})
+            continue
+        punches.append((number, employee_id, ts))
+    return punches
+
+
+def _days(punches, report):
+    # One query resolves every employee id in the batch
+    users = dict(Profile.objects.filter(
+        employee_id__in={employee_id for _, employee_id, _ in punches}
+    ).values_list('employee_id', 'user_id'))
+    days = {}
+    for number, employee_id, ts in punches:
+        user_id = users.get(employee_id)
+        if user_id is None:
+            report['errors'].append({'row': number, 'error': f'Unknown employee_id {employee_id}'})
+            continue
+        days.setdefault((user_id, timezone.localtime(ts).date()), set()).add(ts)
+    return days
+
+
+def _worked_hours(timestamps):
+    # Punches alternate in, out, in, ...; an unmatched last check-in adds nothing yet
+    return sum(
+        (interval_hours(start, end) for start, end in zip(timestamps[::2], timestamps[1::2])),
+        Decimal('0'),
+    )
+
+
+def import_punches(rows):
+    report = {'received': 0, 'imported': 0, 'duplicates': 0, 'days': 0, 'errors': []}
+    days = _days(_read(rows, report), report)
+    if not days:
+        return report
+
+    with transaction.atomic():
+        # Locks the days that already exist so check-ins through the API wait for the import
+        existing = {
+            (attendance.user_id, attendance.date): attendance
+            for attendance in Attendance.objects.select_for_update().filter(
+                user_id__in={user_id for user_id, _ in days}, date__in={date for _, date in days},
+            )
+        }
+        recorded = {}
+        for punch in AttendancePunch.objects.filter(
+            attendance_id__in=[attendance.pk for attendance in existing.values()]
+        ).only('id', 'attendance_id', 'ts', 'punch_type'):
+            recorded.setdefault(punch.attendance_id, {})[punch.ts] = punch
+
+        attendances, new_punches, retyped, changes = [], {}, [], []
+        for (user_id, date), timestamps in days.items():
+            current = existing.get((user_id, date))
+            known = recorded.get(current.pk, {}) if current else {}
+            new = timestamps - known.keys()
+            report['duplicates'] += len(timestamps) - len(new)
+            if not new:
+                continue
+            merged = sorted(known.keys() | new)
+            hours = _worked_hours(merged)
+            attendances.append(Attendance(user_id=user_id, date=date, total_hours=hours))
+            new_punches[(user_id, date)] = []
+            for index, ts in enumerate(merged):
+                punch_type = 'in' if index % 2 == 0 else 'out'
+                if ts in new:
+                    new_punches[(user_id, date)].append((ts, punch_type))
+                elif known[ts].punch_type != punch_type:
+                    # An imported punch sorted before this one, so it now has the other role
+                    known[ts].punch_type = punch_type
+                    retyped.append(known[ts])
+            changes.append((user_id, date, day_deltas(
+                hours, current.total_hours if current else None, created=current is None,
+            )))
+
+        # MySQL upserts on any unique key and rejects an explicit conflict target
+        unique_fields = ['user', 'date'] if connection.features.supports_update_conflicts_with_target else None
+        Attendance.objects.bulk_create(
+            attendances, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=unique_fields, update_fields=['total_hours'],
+        )
+        if any(attendance.pk is None for attendance in attendances):
+            # Backends that cannot return ids from an upsert
+            ids = {
+                (user_id, date): pk
+                for user_id, date, pk in Attendance.objects.filter(
+                    user_id__in={a.user_id for a in attendances}, date__in={a.date for a in attendances},
+                ).values_list('user_id', 'date', 'id')
+            }
+            for attendance in attendances:
+                attendance.pk = ids[(attendance.user_id, attendance.date)]
+
+        punches = [
+            AttendancePunch(attendance_id=attendance.pk, user_id=attendance.user_id, date=attendance.date,
+                            ts=ts, punch_type=punch_type)
+            for attendance in attendances
+            for ts, punch_type in new_punches[(attendance.user_id, attendance.date)]
+        ]
+        AttendancePunch.objects.bulk_create(punches, batch_size=BATCH_SIZE)
+        AttendancePunch.objects.bulk_update(retyped, ['punch_type'], batch_size=BATCH_SIZE)
+        record_attendance_changes(changes)
+
+    report['imported'] = len(punches)
+    report['days'] = len(attendances)
+    return report
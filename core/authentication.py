@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .caching import shared_cache
+
+AUTH_TOKEN_CACHE_KEY = 'auth_token:{}'
+
+
+def _forget_tokens(token_keys):
+    cache = shared_cache()
+    if cache is None or not token_keys:
+        return
+    cache_keys = [AUTH_TOKEN_CACHE_KEY.format(key) for key in token_keys]
+    cache.delete_many(cache_keys)
+    # Again after commit, in case a request reloaded the old rows in between
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def invalidate_auth_cache(user_id):
+    _forget_tokens(list(Token.objects.filter(user_id=user_id).values_list('key', flat=True)))
+
+
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Deactivation, password or permission changes made anywhere (views, admin, shell)
+    # must not keep authenticating from the cache; login only touches last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_auth_cache(instance.pk)
+
+
+def token_deleted(sender, instance, **kwargs):
+    # Also runs for the tokens cascaded away when their user is deleted
+    _forget_tokens([instance.key])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # Loads the token's user together with profile, role and branch in one query
+    # and keeps the result for AUTH_TOKEN_CACHE_TIMEOUT seconds. Only a cache shared by
+    # all workers is used: logout, deactivation and token deletes must reach every one.
+    def authenticate_credentials(self, key):
+        cache = shared_cache()
+        cache_key = AUTH_TOKEN_CACHE_KEY.format(key)
+        token = cache.get(cache_key) if cache is not None else None
+        if token is None:
+            try:
+                token = Token.objects.select_related(
+                    'user__profile__role', 'user__profile__branch'
+                ).get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            if cache is not None:
+                cache.set(cache_key, token, getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        return (token.user, token)
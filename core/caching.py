@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.cache import cache
+
+# Backends whose entries live in one worker process only
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    # The default cache if every worker reads the same entries, else None. An entry
+    # invalidated in a per-process cache is only gone in the worker that dropped it,
+    # so callers must not cache anything that has to be revocable without one.
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    return None if backend in PROCESS_LOCAL_BACKENDS else cache
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Task
+
+TASK_SUMMARY_FIELDS = {
+    'not_started': 'Not Started',
+    'in_progress': 'In Progress',
+    'completed': 'Completed',
+    'awaiting_feedback': 'Awaiting Feedback',
+}
+
+
+def _summary_key(user_id):
+    return f'task_summary:{user_id}'
+
+
+def task_summary(user_id):
+    # One conditional aggregate for every status, cached until one of the user's tasks changes
+    key = _summary_key(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = Task.objects.filter(assigned_to_id=user_id).aggregate(**{
+            field: Count('id', filter=Q(status=value)) for field, value in TASK_SUMMARY_FIELDS.items()
+        })
+        cache.set(key, summary, getattr(settings, 'TASK_SUMMARY_CACHE_TIMEOUT', 300))
+    return summary
+
+
+async def atask_summary(user_id):
+    key = _summary_key(user_id)
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = await Task.objects.filter(assigned_to_id=user_id).aaggregate(**{
+            field: Count('id', filter=Q(status=value)) for field, value in TASK_SUMMARY_FIELDS.items()
+        })
+        await cache.aset(key, summary, getattr(settings, 'TASK_SUMMARY_CACHE_TIMEOUT', 300))
+    return summary
+
+
+def invalidate_task_summary(*user_ids):
+    cache.delete_many([_summary_key(user_id) for user_id in user_ids if user_id is not None])
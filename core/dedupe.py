@@ -0,0 +1,200 @@
+import re
+from decimal import Decimal
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Customer, CustomerCluster, CustomerMatch, CustomerMatchKey
+
+MATCH_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone_number', 'gst_tax_id')
+# A key shared by more customers than this (a placeholder phone, a generic mailbox)
+# says nothing about identity and would make the block quadratic
+MAX_BLOCK_SIZE = 100
+# Score added for one matching contact detail (phone or email) on top of the name similarity
+CONTACT_WEIGHT = 0.25
+SOUNDEX_CODES = {
+    letter: str(code)
+    for code, letters in enumerate(['aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'])
+    for letter in letters
+}
+
+
+def match_threshold():
+    return getattr(settings, 'CUSTOMER_MATCH_THRESHOLD', 0.85)
+
+
+def soundex(value):
+    letters = [c for c in (value or '').lower() if c in SOUNDEX_CODES]
+    if not letters:
+        return ''
+    result, previous = [letters[0].upper()], SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        code = SOUNDEX_CODES[letter]
+        if code != '0' and code != previous:
+            result.append(code)
+        if letter not in 'hw':
+            previous = code
+    return ''.join(result)[:4].ljust(4, '0')
+
+
+def normalize_phone(value):
+    digits = re.sub(r'\D', '', value or '')
+    # The national number only, so +91 and trunk prefixes do not matter
+    return digits[-10:] if len(digits) >= 7 else ''
+
+
+def email_local_part(value):
+    local = (value or '').strip().lower().partition('@')[0]
+    return local.partition('+')[0].replace('.', '')
+
+
+def normalize_gst(value):
+    return re.sub(r'[^0-9A-Z]', '', (value or '').upper())
+
+
+def match_profile(row):
+    # Everything the matcher needs from one customer, normalised once
+    profile = {
+        'id': row['id'],
+        'name': ' '.join(f"{row['first_name']} {row['last_name']}".lower().split()),
+        'phone': normalize_phone(row['phone_number']),
+        'email': email_local_part(row['email']),
+        'gst': normalize_gst(row['gst_tax_id']),
+    }
+    keys = set()
+    if row['first_name']:
+        keys.add(f"name:{soundex(row['first_name'])}{soundex(row['last_name'])}")
+    if profile['phone']:
+        keys.add(f"phone:{profile['phone']}")
+    if len(profile['email']) >= 3:
+        keys.add(f"email:{profile['email']}")
+    if profile['gst']:
+        keys.add(f"gst:{profile['gst']}")
+    profile['keys'] = keys
+    return profile
+
+
+def match_score(a, b):
+    contacts = sum(bool(a[field]) and a[field] == b[field] for field in ('phone', 'email'))
+    # The same GST id, or the same phone and mailbox, is the same customer whatever the name
+    if (a['gst'] and a['gst'] == b['gst']) or contacts == 2:
+        return 1.0
+    score = SequenceMatcher(None, a['name'], b['name']).ratio() + CONTACT_WEIGHT * contacts
+    return min(score, 1.0)
+
+
+def _components(edges):
+    # Union-find over matched pairs; each group is named after its lowest customer id
+    parent = {}
+
+    def find(pk):
+        parent.setdefault(pk, pk)
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    for a, b in edges:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return {pk: find(pk) for pk in parent}
+
+
+def _match(customer_id, match_id, score):
+    a, b = sorted((customer_id, match_id))
+    return CustomerMatch(customer_id=a, match_id=b, score=Decimal(str(round(score, 3))))
+
+
+def cluster_members(customer_ids):
+    clusters = CustomerCluster.objects.filter(customer_id__in=customer_ids).values('cluster')
+    return set(CustomerCluster.objects.filter(cluster__in=clusters).values_list('customer_id', flat=True))
+
+
+def recluster(customer_ids):
+    # Recomputes the clusters of everything connected to these customers
+    seen, frontier, edges = set(), set(customer_ids), set()
+    while frontier:
+        seen |= frontier
+        rows = list(CustomerMatch.objects.filter(
+            Q(customer_id__in=frontier) | Q(match_id__in=frontier)
+        ).values_list('customer_id', 'match_id'))
+        edges.update(rows)
+        frontier = {pk for row in rows for pk in row} - seen
+    if not seen:
+        return
+    with transaction.atomic():
+        CustomerCluster.objects.filter(customer_id__in=seen).delete()
+        # A concurrent refresh of the same cluster writes the same rows
+        CustomerCluster.objects.bulk_create([
+            CustomerCluster(customer_id=pk, cluster=cluster) for pk, cluster in _components(edges).items()
+        ], ignore_conflicts=True)
+
+
+def refresh_customer_matches(customer):
+    profile = match_profile({field: getattr(customer, field) for field in MATCH_FIELDS})
+    with transaction.atomic():
+        stored = CustomerMatchKey.objects.filter(customer_id=customer.pk)
+        stored.exclude(key__in=profile['keys']).delete()
+        known = set(stored.values_list('key', flat=True))
+        CustomerMatchKey.objects.bulk_create([
+            CustomerMatchKey(customer_id=customer.pk, key=key) for key in profile['keys'] - known
+        ])
+
+        blocks = CustomerMatchKey.objects.filter(key__in=profile['keys']).values('key').annotate(size=Count('id'))
+        keys = [block['key'] for block in blocks if block['size'] <= MAX_BLOCK_SIZE]
+        candidates = Customer.objects.filter(match_keys__key__in=keys).exclude(pk=customer.pk).distinct()
+        threshold = match_threshold()
+        matches = []
+        for row in candidates.values(*MATCH_FIELDS):
+            score = match_score(profile, match_profile(row))
+            if score >= threshold:
+                matches.append(_match(customer.pk, row['id'], score))
+
+        previous = cluster_members([customer.pk])
+        CustomerMatch.objects.filter(Q(customer_id=customer.pk) | Q(match_id=customer.pk)).delete()
+        CustomerMatch.objects.bulk_create(matches, ignore_conflicts=True)
+        recluster(previous | {customer.pk} | {match.customer_id for match in matches} | {match.match_id for match in matches})
+
+
+def rebuild_customer_matches(batch_size=1000):
+    # One pass over every customer: block on the normalised keys, then score pairs within each block
+    profiles = {
+        row['id']: match_profile(row)
+        for row in Customer.objects.values(*MATCH_FIELDS).iterator(chunk_size=batch_size)
+    }
+    blocks = {}
+    for pk, profile in profiles.items():
+        for key in profile['keys']:
+            blocks.setdefault(key, []).append(pk)
+
+    threshold = match_threshold()
+    scored, matches = set(), []
+    for ids in blocks.values():
+        if len(ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                pair = (min(a, b), max(a, b))
+                if pair in scored:
+                    continue
+                scored.add(pair)
+                score = match_score(profiles[a], profiles[b])
+                if score >= threshold:
+                    matches.append(_match(a, b, score))
+
+    clusters = _components((match.customer_id, match.match_id) for match in matches)
+    with transaction.atomic():
+        CustomerMatchKey.objects.all().delete()
+        CustomerMatch.objects.all().delete()
+        CustomerCluster.objects.all().delete()
+        CustomerMatchKey.objects.bulk_create([
+            CustomerMatchKey(customer_id=pk, key=key) for pk, profile in profiles.items() for key in profile['keys']
+        ], batch_size=batch_size)
+        CustomerMatch.objects.bulk_create(matches, batch_size=batch_size)
+        CustomerCluster.objects.bulk_create([
+            CustomerCluster(customer_id=pk, cluster=cluster) for pk, cluster in clusters.items()
+        ], batch_size=batch_size)
+    return len(profiles), len(matches), len(set(clusters.values()))
@@ -0,0 +1,122 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+from .pagination import KeysetPagination, keyset_ordering
+
+# Filter values the frontend sends to mean "no filter"
+IGNORED_VALUES = ('', 'All')
+
+
+def _select_paths(select, prefix=''):
+    paths = []
+    for name, nested in select.items():
+        paths.append(f'{prefix}{name}')
+        paths.extend(_select_paths(nested, f'{prefix}{name}__'))
+    return paths
+
+
+def _lookup_root(lookup):
+    path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+    return path.split('__')[0]
+
+
+class ListQuery:
+    # Declarative ?<filter>=, ?sort= and ?fields= handling shared by the list views.
+    # filters maps a query parameter to an ORM lookup, or to a callable taking
+    # (queryset, value); sorts lists the fields a client may order by, the first one
+    # being the default (newest first unless descending=False).
+    def __init__(self, filters=None, sorts=('pk',), descending=True):
+        self.filters = filters or {}
+        self.sorts = tuple(sorts)
+        self.descending = descending
+
+    def apply(self, queryset, request, serializer_class):
+        params = request.query_params
+        queryset = self._filter(queryset, params)
+        sort_field, descending = self._sort(params)
+        fields = self._fields(params, serializer_class)
+        if fields is not None:
+            queryset = self._project(queryset, fields, sort_field)
+        ordering = keyset_ordering(queryset.model, sort_field, descending)
+        return Listing(queryset.order_by(*ordering), serializer_class, fields, sort_field, descending)
+
+    def _filter(self, queryset, params):
+        for param, lookup in self.filters.items():
+            value = params.get(param)
+            if value is None or value in IGNORED_VALUES:
+                continue
+            try:
+                if callable(lookup):
+                    queryset = lookup(queryset, value)
+                elif lookup.endswith('__in'):
+                    queryset = queryset.filter(**{lookup: [item for item in value.split(',') if item]})
+                else:
+                    queryset = queryset.filter(**{lookup: value})
+            except (ValueError, TypeError, DjangoValidationError):
+                raise ValidationError({'error': f'Invalid value for {param}'})
+        return queryset
+
+    def _sort(self, params):
+        value = params.get('sort')
+        if not value:
+            return self.sorts[0], self.descending
+        field = value.lstrip('-')
+        if field not in self.sorts:
+            raise ValidationError({'error': f'sort must be one of {list(self.sorts)}'})
+        return field, value.startswith('-')
+
+    def _fields(self, params, serializer_class):
+        value = params.get('fields')
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        declared = serializer_class().fields
+        unknown = [name for name in fields if name not in declared]
+        if unknown:
+            raise ValidationError({'error': f'Unknown fields: {unknown}'})
+        return {name: declared[name] for name in fields}
+
+    def _project(self, queryset, fields, sort_field):
+        # Only load the columns, joins and prefetches the requested fields read
+        sources = {field.source.split('.')[0] for field in fields.values()}
+        if '*' in sources:
+            # A method field can read anything on the instance
+            return queryset
+        prefetches = [lookup for lookup in queryset._prefetch_related_lookups if _lookup_root(lookup) in sources]
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+        select = queryset.query.select_related
+        if select is True:
+            return queryset
+        model = queryset.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        if select:
+            paths = [path for path in _select_paths(select) if path.split('__')[0] in sources]
+            # A reverse one-to-one has no column on this model, so .only() would defer the
+            # relation it joins through; those are fetched in a separate query instead
+            joined = [path for path in paths if path.split('__')[0] in concrete]
+            queryset = queryset.select_related(None).select_related(*joined)
+            queryset = queryset.prefetch_related(*[path for path in paths if path.split('__')[0] not in concrete])
+        columns = {name for name in sources | {sort_field} if name in concrete}
+        return queryset.only(model._meta.pk.name, *columns)
+
+
+class Listing:
+    def __init__(self, queryset, serializer_class, fields, sort_field, descending):
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self.fields = fields
+        self.sort_field = sort_field
+        self.descending = descending
+
+    def paginator(self):
+        return KeysetPagination(self.sort_field, descending=self.descending)
+
+    def serialize(self, rows, **kwargs):
+        serializer = self.serializer_class(rows, many=True, **kwargs)
+        if self.fields is not None:
+            child = serializer.child
+            for name in list(child.fields):
+                if name not in self.fields:
+                    child.fields.pop(name)
+        return serializer.data
@@ -0,0 +1,55 @@
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.query_audit import audit
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queries the main list views issue and report full table scans and filesorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to run the views as (default: the first superuser)')
+        parser.add_argument('--repeat', type=int, default=0, help='Also time every query, taking the median of this many runs')
+        parser.add_argument('--plans', action='store_true', help='Print the full plan of every query')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error when any query needs a scan or a sort')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to run the views as; pass --user')
+        if connection.vendor not in ('sqlite', 'mysql', 'postgresql'):
+            self.stdout.write(self.style.WARNING(f'Plans from {connection.vendor} are printed but not analysed'))
+
+        flagged = 0
+        total_ms = 0
+        for entry in audit(user, repeat=options['repeat']):
+            label = entry['view'].rsplit('.', 1)[1]
+            if entry['params']:
+                label = f"{label}?{urlencode(entry['params'])}"
+            self.stdout.write(f"{label}: {len(entry['queries'])} queries")
+            for query in entry['queries']:
+                timing = ''
+                if query['ms'] is not None:
+                    total_ms += query['ms']
+                    timing = f" ({query['ms']:.2f} ms)"
+                if query['findings'] or options['plans'] or timing:
+                    self.stdout.write(f"  {query['sql'][:160]}{timing}")
+                for kind, where in query['findings']:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f'    {kind.upper()}: {where}'))
+                if options['plans']:
+                    for row in query['plan']:
+                        self.stdout.write(f"    | {' | '.join(str(value) for value in row.values())}")
+
+        if options['repeat']:
+            self.stdout.write(f'Total median query time: {total_ms:.2f} ms')
+        if flagged and options['fail']:
+            raise CommandError(f'{flagged} full scan(s)/filesort(s) found')
+        style = self.style.WARNING if flagged else self.style.SUCCESS
+        self.stdout.write(style(f'{flagged} full scan(s)/filesort(s) found'))
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Attendance, AttendancePunch
+
+
+def legacy_punches(attendance):
+    # check_in_times holds ISO timestamps that alternate check-in, check-out
+    punches = []
+    for i, value in enumerate(attendance.check_in_times or []):
+        try:
+            ts = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            continue
+        if timezone.is_naive(ts):
+            ts = timezone.make_aware(ts)
+        punches.append(AttendancePunch(
+            attendance=attendance, user_id=attendance.user_id, date=attendance.date, ts=ts,
+            punch_type='in' if i % 2 == 0 else 'out',
+        ))
+    return punches
+
+
+class Command(BaseCommand):
+    help = 'Copy the legacy check_in_times JSON of each attendance into attendance punches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # Attendances that already have punches are skipped, so the command can be re-run safely
+        attendances = Attendance.objects.filter(punches__isnull=True).exclude(check_in_times=[]).order_by('id')
+        batch = []
+        created = 0
+        with transaction.atomic():
+            for attendance in attendances.iterator(chunk_size=batch_size):
+                batch.extend(legacy_punches(attendance))
+                if len(batch) >= batch_size:
+                    AttendancePunch.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            AttendancePunch.objects.bulk_create(batch)
+            created += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Created {created} attendance punch(es)'))
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.attendance_import import REQUIRED_FIELDS, import_punches, read_csv
+
+
+class Command(BaseCommand):
+    help = 'Load a biometric terminal export (CSV or JSON of employee_id, timestamp) into attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, or JSON file holding a list of punches')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        with open(path, 'rb') as f:
+            if path.lower().endswith('.json'):
+                rows = json.load(f)
+                if not isinstance(rows, list):
+                    raise CommandError('The JSON file must hold a list of punches')
+            else:
+                rows = read_csv(f)
+                missing_fields = [field for field in REQUIRED_FIELDS if field not in (rows.fieldnames or [])]
+                if missing_fields:
+                    raise CommandError(f'Missing required fields: {missing_fields}')
+            report = import_punches(rows)
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']} punch(es) over {report['days']} day(s); "
+            f"{report['duplicates']} already recorded, {len(report['errors'])} rejected"
+        ))
@@ -0,0 +1,78 @@
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(samples, fraction):
+    # samples must be sorted
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def timed_request(url, method, body, headers, timeout):
+    started = time.perf_counter()
+    try:
+        with urlopen(Request(url, data=body, headers=headers, method=method), timeout=timeout) as response:
+            response.read()
+            code = response.status
+    except HTTPError as exc:
+        code = exc.code
+    except (URLError, OSError) as exc:
+        code = type(exc).__name__
+    return code, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent requests at one endpoint on running servers and report throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Endpoint to load, e.g. /api/dashboard/tasks/')
+        parser.add_argument('--server', action='append', dest='servers',
+                            help='Base URL of a running server; repeat to compare, e.g. a WSGI and an ASGI deployment')
+        parser.add_argument('--token', help='API token sent as "Authorization: Token <token>"')
+        parser.add_argument('--method', default='GET')
+        parser.add_argument('--data', help='JSON request body, e.g. \'{"email": "ops@example.com"}\'')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per server')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        servers = options['servers'] or ['http://127.0.0.1:8000']
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f"Token {options['token']}"
+        body = None
+        if options['data']:
+            try:
+                body = json.dumps(json.loads(options['data'])).encode()
+            except ValueError as exc:
+                raise CommandError(f'--data is not valid JSON: {exc}')
+            headers['Content-Type'] = 'application/json'
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be at least 1')
+
+        for server in servers:
+            url = server.rstrip('/') + '/' + options['path'].lstrip('/')
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(
+                    lambda _: timed_request(url, options['method'].upper(), body, headers, options['timeout']),
+                    range(options['requests']),
+                ))
+            elapsed = time.perf_counter() - started
+
+            codes = Counter(code for code, _ in results)
+            latencies = sorted(seconds * 1000 for _, seconds in results)
+            self.stdout.write(
+                f"{url}: {len(results) / elapsed:.1f} req/s over {elapsed:.2f}s at concurrency {options['concurrency']}; "
+                f"latency p50 {percentile(latencies, 0.5):.0f} ms, p90 {percentile(latencies, 0.9):.0f} ms, "
+                f"p99 {percentile(latencies, 0.99):.0f} ms, max {latencies[-1]:.0f} ms"
+            )
+            self.stdout.write('  responses: ' + ', '.join(f'{code} x{count}' for code, count in sorted(codes.items(), key=str)))
+            failed = sum(count for code, count in codes.items() if not (isinstance(code, int) and code < 400))
+            if failed:
+                self.stdout.write(self.style.WARNING(f'  {failed} request(s) failed; the throughput figure includes them'))
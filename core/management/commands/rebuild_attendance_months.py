@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.attendance import rebuild_attendance_months
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly attendance rollups from the attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this calendar year')
+
+    def handle(self, *args, **options):
+        user_rows, department_rows = rebuild_attendance_months(options['year'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {user_rows} user month(s) and {department_rows} branch/department month(s)'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.dedupe import rebuild_customer_matches
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer duplicate keys, matches and clusters from scratch'
+
+    def handle(self, *args, **options):
+        customers, matches, clusters = rebuild_customer_matches()
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {customers} customer(s): {matches} match(es) in {clusters} cluster(s)'
+        ))
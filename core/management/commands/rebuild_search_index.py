@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SearchDocument
+from core.search import SEARCH_TYPES, index_objects
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index for customers, products and suppliers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(SEARCH_TYPES), help='Only rebuild this document type')
+
+    def handle(self, *args, **options):
+        kinds = [options['type']] if options['type'] else list(SEARCH_TYPES)
+        for kind in kinds:
+            model = SEARCH_TYPES[kind][0]
+            # Documents of deleted objects are dropped; the rest are rewritten in batches
+            SearchDocument.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk')).delete()
+            count = index_objects(kind, model.objects.all())
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {kind}(s)'))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.totals import amount, line_sums
+from crm.models import Invoice, OrderSummary, InvoiceReturnSummary
+from finance.models import CreditNotePaymentRefund
+
+# label -> (records, path from a record to its lines, {stored field: summed line value})
+CHECKS = {
+    'invoice totals': (Invoice.objects.all(), 'items__', {'invoice_total': 'line_total'}),
+    'order summaries': (
+        OrderSummary.objects.all(), 'invoice__items__', {'subtotal': 'line_total', 'tax_summary': 'line_tax'},
+    ),
+    'invoice return summaries': (
+        InvoiceReturnSummary.objects.all(), 'invoice_return__items__', {'return_subtotal': 'line_total'},
+    ),
+    'credit note refunds': (
+        CreditNotePaymentRefund.objects.filter(credit_note__invoice_reference__summary__isnull=False),
+        'credit_note__items__', {'invoice_return_amount': 'line_total'},
+    ),
+}
+
+
+def find_drift(queryset, prefix, fields):
+    rows = queryset.annotate(**line_sums(prefix)).values('pk', *fields, 'line_total', 'line_tax')
+    for row in rows.iterator():
+        expected = {field: amount(row[source]) for field, source in fields.items()}
+        if any(amount(row[field]) != value for field, value in expected.items()):
+            yield row['pk'], {field: amount(row[field]) for field in fields}, expected
+
+
+class Command(BaseCommand):
+    help = 'Verify maintained document totals against their lines and optionally repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite drifted totals from their lines')
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for label, (queryset, prefix, fields) in CHECKS.items():
+            rows = list(find_drift(queryset, prefix, fields))
+            drifted += len(rows)
+            self.stdout.write(f'{label}: {len(rows)} drifted')
+            for pk, stored, expected in rows:
+                self.stdout.write(f'  #{pk}: stored {stored}, lines {expected}')
+                if options['fix']:
+                    with transaction.atomic():
+                        records = queryset.model.objects.filter(pk=pk)
+                        records.update(**expected)
+                        # Columns derived from the repaired ones are recomputed in the database
+                        if hasattr(queryset.model, 'derived_totals'):
+                            records.update(**queryset.model.derived_totals())
+        if drifted and options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {drifted} record(s)'))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(f'{drifted} record(s) drifted; run with --fix to repair'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All totals match their lines'))
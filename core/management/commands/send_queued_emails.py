@@ -0,0 +1,33 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from core.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbound emails, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queue once and exit')
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails claimed per batch')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        # One SMTP connection is kept open while there is work and closed when idle
+        connection = get_connection()
+        try:
+            while True:
+                sent, failed = deliver_pending(connection, options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} email(s), {failed} failed')
+                    continue
+                connection.close()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
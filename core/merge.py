@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .dedupe import cluster_members, recluster
+from .search import remove_objects
+from .models import Customer, CustomerCluster, CustomerMatch, CustomerMatchKey, CustomerMerge
+
+# Matching data belongs to the duplicate itself; it is dropped with it and the clusters rebuilt
+REBUILT_MODELS = (CustomerMatchKey, CustomerMatch, CustomerCluster)
+SNAPSHOT_FIELDS = ('id', 'customer_id', 'first_name', 'last_name', 'email', 'phone_number', 'credit_limit', 'available_limit')
+UPDATE_BATCH_SIZE = 1000
+
+
+class CustomerMergeError(Exception):
+    pass
+
+
+def customer_relations():
+    # Every foreign key to Customer, found through the model registry so new
+    # documents are carried along without touching this module
+    return [
+        relation for relation in Customer._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete and relation.one_to_many
+        and relation.related_model not in REBUILT_MODELS
+    ]
+
+
+def _groups(merges):
+    # merges are (primary_id, duplicate_ids) pairs; returns {duplicate_id: primary_id}
+    targets = {}
+    primaries = set()
+    for primary_id, duplicate_ids in merges:
+        primaries.add(primary_id)
+        for duplicate_id in duplicate_ids:
+            if duplicate_id == primary_id:
+                continue
+            if targets.get(duplicate_id, primary_id) != primary_id:
+                raise CustomerMergeError(f'Customer {duplicate_id} is listed in more than one merge')
+            targets[duplicate_id] = primary_id
+    chained = primaries & set(targets)
+    if chained:
+        raise CustomerMergeError(f'Customers {sorted(chained)} are both a primary and a duplicate')
+    return targets
+
+
+def _repoint(relation, targets):
+    # One UPDATE per relation (per batch of duplicates) mapping each duplicate to its
+    # primary; returns how many rows each duplicate had
+    column = relation.field.attname
+    manager = relation.related_model._base_manager
+    counts = {}
+    duplicate_ids = list(targets)
+    for start in range(0, len(duplicate_ids), UPDATE_BATCH_SIZE):
+        batch = duplicate_ids[start:start + UPDATE_BATCH_SIZE]
+        rows = manager.filter(**{f'{column}__in': batch})
+        batch_counts = dict(rows.values(column).annotate(count=Count('pk')).order_by().values_list(column, 'count'))
+        counts.update(batch_counts)
+        if batch_counts:
+            rows.update(**{column: Case(
+                *[When(**{column: duplicate_id}, then=Value(targets[duplicate_id])) for duplicate_id in batch],
+                output_field=IntegerField(),
+            )})
+    return counts
+
+
+def _snapshot(customer):
+    return {field: str(value) if isinstance(value, Decimal) else value
+            for field, value in ((field, getattr(customer, field)) for field in SNAPSHOT_FIELDS)}
+
+
+def merge_customers(merges, user=None):
+    targets = _groups(merges)
+    if not targets:
+        raise CustomerMergeError('No valid duplicates provided')
+    primary_ids = set(targets.values())
+
+    with transaction.atomic():
+        customers = Customer.objects.select_for_update().in_bulk(primary_ids | set(targets))
+        missing = (primary_ids | set(targets)) - set(customers)
+        if missing:
+            raise Customer.DoesNotExist(f'Customers not found: {sorted(missing)}')
+        members = cluster_members(list(customers))
+
+        moved = {}
+        for relation in customer_relations():
+            counts = _repoint(relation, targets)
+            if counts:
+                moved[relation.related_model._meta.label] = counts
+
+        duplicates_of = {primary_id: [] for primary_id in primary_ids}
+        for duplicate_id, primary_id in targets.items():
+            duplicates_of[primary_id].append(customers[duplicate_id])
+        audits = []
+        for primary_id, duplicates in duplicates_of.items():
+            primary = customers[primary_id]
+            credit_limit = sum((Decimal(str(d.credit_limit or 0)) for d in duplicates), Decimal('0'))
+            primary.credit_limit = Decimal(str(primary.credit_limit or 0)) + credit_limit
+            primary.available_limit = Decimal(str(primary.available_limit or 0)) + sum(
+                (Decimal(str(d.available_limit or 0)) for d in duplicates), Decimal('0')
+            )
+            moved_records = {}
+            for label, counts in moved.items():
+                count = sum(counts.get(d.pk, 0) for d in duplicates)
+                if count:
+                    moved_records[label] = count
+            audits.append(CustomerMerge(
+                primary=primary, primary_customer_id=primary.customer_id or '',
+                merged_customers=[_snapshot(d) for d in duplicates],
+                moved_records=moved_records,
+                credit_limit_added=credit_limit,
+                merged_by=user if user is not None and user.is_authenticated else None,
+            ))
+
+        # Queryset updates and deletes skip Customer.save/delete; clusters and search are updated once below
+        Customer.objects.bulk_update([customers[pk] for pk in primary_ids], ['credit_limit', 'available_limit'])
+        CustomerMerge.objects.bulk_create(audits, batch_size=UPDATE_BATCH_SIZE)
+        Customer.objects.filter(pk__in=list(targets)).delete()
+        recluster((members | primary_ids) - set(targets))
+        remove_objects('customer', list(targets))
+
+    return audits
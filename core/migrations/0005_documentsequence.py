@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_candidatedocument_alter_candidate_aadhar_number_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('series', models.CharField(max_length=50)),
+                ('scope', models.CharField(blank=True, default='', max_length=100)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Document Sequence',
+                'verbose_name_plural': 'Document Sequences',
+                'unique_together': {('series', 'scope')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Attendance Month',
+                'verbose_name_plural': 'Attendance Months',
+                'unique_together': {('user', 'year', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DepartmentAttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.branch')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.department')),
+            ],
+            options={
+                'verbose_name': 'Department Attendance Month',
+                'verbose_name_plural': 'Department Attendance Months',
+                'indexes': [models.Index(fields=['year', 'month'], name='core_dept_att_year_month_idx')],
+                'unique_together': {('branch', 'department', 'year', 'month')},
+            },
+        ),
+    ]
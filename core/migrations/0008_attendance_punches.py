@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_attendance_months'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='check_in_times',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='AttendancePunch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('ts', models.DateTimeField()),
+                ('punch_type', models.CharField(choices=[('in', 'Check In'), ('out', 'Check Out')], max_length=3)),
+                ('attendance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punches', to='core.attendance')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_punches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Attendance Punch',
+                'verbose_name_plural': 'Attendance Punches',
+                'indexes': [models.Index(fields=['user', 'date', 'ts'], name='core_punch_user_date_ts_idx')],
+            },
+        ),
+    ]
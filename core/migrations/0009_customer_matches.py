@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_attendance_punches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cluster', models.IntegerField(db_index=True)),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_cluster', to='core.customer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CustomerMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.DecimalField(decimal_places=3, max_digits=4)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.customer')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.customer')),
+            ],
+            options={
+                'verbose_name_plural': 'Customer Matches',
+                'unique_together': {('customer', 'match')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=120)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='core.customer')),
+            ],
+            options={
+                'unique_together': {('customer', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_customer_matches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerMerge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('primary_customer_id', models.CharField(blank=True, max_length=10)),
+                ('merged_customers', models.JSONField(default=list)),
+                ('moved_records', models.JSONField(default=dict)),
+                ('credit_limit_added', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('merged_at', models.DateTimeField(auto_now_add=True)),
+                ('merged_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('primary', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='merges', to='core.customer')),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['status', 'last_edit_date', 'id'], name='core_customer_status_edit_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_list_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_edit_date', 'id'], name='core_customer_edit_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'due_date', 'id'], name='core_task_user_due_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_levels', to='core.product')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_levels', to='core.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Level',
+                'verbose_name_plural': 'Stock Levels',
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('document_type', models.CharField(choices=[('stock_receipt', 'Stock Receipt'), ('stock_return', 'Stock Return'), ('delivery_note', 'Delivery Note'), ('delivery_note_return', 'Delivery Note Return')], max_length=30)),
+                ('document_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='core.product')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='core.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Movement',
+                'verbose_name_plural': 'Stock Movements',
+                'indexes': [models.Index(fields=['document_type', 'document_id'], name='core_stockmove_document_idx'), models.Index(fields=['product', 'warehouse', 'created_at'], name='core_stockmove_product_idx')],
+            },
+        ),
+    ]
@@ -42,6 +42,15 @@ class Role(models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+        from .permissions import invalidate_role_permissions
+        invalidate_role_permissions(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .permissions import invalidate_role_permissions
+        role_id = self.pk
+        result = super().delete(*args, **kwargs)
+        invalidate_role_permissions(role_id)
+        return result
 
     def __str__(self):
         return self.role
@@ -63,6 +72,13 @@ class Profile(models.Model):
     reset_token = models.CharField(max_length=32, blank=True, null=True)
     reset_token_expiry = models.DateTimeField(blank=True, null=True)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .authentication import invalidate_auth_cache
+        from .permissions import invalidate_user_role
+        invalidate_user_role(self.user_id)
+        invalidate_auth_cache(self.user_id)
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
@@ -114,6 +130,19 @@ class Supplier(models.Model):
     phone_number = models.CharField(max_length=15)
     email = models.EmailField()
     address = models.TextField()
+
+    def save(self, *args, **kwargs):
+        from .search import index_object
+        super().save(*args, **kwargs)
+        index_object('supplier', self)
+
+    def delete(self, *args, **kwargs):
+        from .search import remove_objects
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        remove_objects('supplier', [pk])
+        return result
+
     def __str__(self):
         return self.name
 
@@ -182,11 +211,26 @@ class Product(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
+        from .search import index_object
+        if not self.product_id:
+            from .sequences import next_document_number
+            self.product_id = next_document_number('product')
+        if not self._state.adding and not kwargs.get('force_insert'):
+            # quantity is the stock ledger's running total, moved with F() by core.stock;
+            # writing back the value this instance loaded would undo concurrent postings
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'quantity']
         super().save(*args, **kwargs)
-        if is_new and not self.product_id:
-            self.product_id = f'CVB{self.id:03d}'
-            Product.objects.filter(pk=self.pk).update(product_id=self.product_id)
+        index_object('product', self)
+
+    def delete(self, *args, **kwargs):
+        from .search import remove_objects
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        remove_objects('product', [pk])
+        return result
 
     
 
@@ -254,13 +298,8 @@ class Candidate(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.employee_code:
-            last_candidate = Candidate.objects.order_by('id').last()
-            if last_candidate:
-                last_num = int(last_candidate.employee_code.replace('STA', ''))
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            self.employee_code = f'STA{new_num:04d}'
+            from .sequences import next_document_number
+            self.employee_code = next_document_number('candidate', branch=self.branch if self.branch_id else None)
 
         # Validate phone numbers
         phone_regex = r'^[0-9+\-\s]+$'
@@ -307,7 +346,8 @@ class GovernmentHoliday(models.Model):
 class Attendance(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
-    check_in_times = models.JSONField(default=list)  # Array of check-in/check-out timestamps
+    # Legacy punch list; punches are now recorded as AttendancePunch rows (see backfill_attendance_punches)
+    check_in_times = models.JSONField(default=list, blank=True)
     total_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0.0)
 
     class Meta:
@@ -315,6 +355,74 @@ class Attendance(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.total_hours} hrs"
+
+
+class AttendancePunch(models.Model):
+    # Append-only log of check-in/check-out events; punches alternate in, out, in, ...
+    PUNCH_TYPES = [
+        ('in', 'Check In'),
+        ('out', 'Check Out'),
+    ]
+    attendance = models.ForeignKey(Attendance, on_delete=models.CASCADE, related_name='punches')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_punches')
+    date = models.DateField()
+    ts = models.DateTimeField()
+    punch_type = models.CharField(max_length=3, choices=PUNCH_TYPES)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'ts'], name='core_punch_user_date_ts_idx'),
+        ]
+        verbose_name = "Attendance Punch"
+        verbose_name_plural = "Attendance Punches"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Attendance punches are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.ts} ({self.punch_type})"
+
+
+class AttendanceMonth(models.Model):
+    # Per-user monthly rollup of Attendance, kept current by CheckInOutView
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_months')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('user', 'year', 'month')
+        verbose_name = "Attendance Month"
+        verbose_name_plural = "Attendance Months"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.year}/{self.month:02d}"
+
+
+class DepartmentAttendanceMonth(models.Model):
+    # The same rollup per branch and department, for organisation-wide reports
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('branch', 'department', 'year', 'month')
+        indexes = [
+            models.Index(fields=['year', 'month'], name='core_dept_att_year_month_idx'),
+        ]
+        verbose_name = "Department Attendance Month"
+        verbose_name_plural = "Department Attendance Months"
+
+    def __str__(self):
+        return f"{self.branch} / {self.department} - {self.year}/{self.month:02d}"
     
 
 from django.db import models
@@ -338,6 +446,25 @@ class Task(models.Model):
     ])
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['assigned_to', 'due_date', 'id'], name='core_task_user_due_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .dashboard import invalidate_task_summary
+        # A reassigned task changes the summary of its previous assignee as well
+        previous_user_id = Task.objects.filter(pk=self.pk).values_list('assigned_to_id', flat=True).first() if self.pk else None
+        super().save(*args, **kwargs)
+        invalidate_task_summary(self.assigned_to_id, previous_user_id)
+
+    def delete(self, *args, **kwargs):
+        from .dashboard import invalidate_task_summary
+        user_id = self.assigned_to_id
+        result = super().delete(*args, **kwargs)
+        invalidate_task_summary(user_id)
+        return result
+
     def __str__(self):
         return self.name
     
@@ -384,7 +511,219 @@ class Customer(models.Model):
     credit_term = models.CharField(max_length=50, blank=True)
     last_edit_date = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_edit_date', 'id'], name='core_customer_edit_id_idx'),
+            models.Index(fields=['status', 'last_edit_date', 'id'], name='core_customer_status_edit_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .dedupe import refresh_customer_matches
+        from .search import index_object
+        super().save(*args, **kwargs)
+        refresh_customer_matches(self)
+        index_object('customer', self)
+
+    def delete(self, *args, **kwargs):
+        from .dedupe import cluster_members, recluster
+        from .search import remove_objects
+        # The rest of the customer's cluster may fall apart once it is gone
+        pk = self.pk
+        members = cluster_members([pk]) - {pk}
+        result = super().delete(*args, **kwargs)
+        recluster(members)
+        remove_objects('customer', [pk])
+        return result
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.customer_id})"
+
+
+class CustomerMerge(models.Model):
+    # Audit record of one merge; the merged customers are kept as snapshots since their rows are deleted
+    primary = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='merges')
+    primary_customer_id = models.CharField(max_length=10, blank=True)
+    merged_customers = models.JSONField(default=list)
+    moved_records = models.JSONField(default=dict)
+    credit_limit_added = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    merged_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    merged_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{len(self.merged_customers)} customer(s) into {self.primary_customer_id or self.primary_id}"
+
+
+class CustomerMatchKey(models.Model):
+    # Normalised blocking keys; only customers sharing a key are ever compared
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='match_keys')
+    key = models.CharField(max_length=120, db_index=True)
+
+    class Meta:
+        unique_together = ('customer', 'key')
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.key}"
+
+
+class CustomerMatch(models.Model):
+    # A scored candidate pair, stored once with customer_id < match_id
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    match = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    score = models.DecimalField(max_digits=4, decimal_places=3)
+
+    class Meta:
+        unique_together = ('customer', 'match')
+        verbose_name_plural = "Customer Matches"
+
+    def __str__(self):
+        return f"{self.customer_id} ~ {self.match_id} ({self.score})"
+
+
+class CustomerCluster(models.Model):
+    # Connected groups of matching customers, keyed by the lowest customer id in the group
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='duplicate_cluster')
+    cluster = models.IntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.customer_id} in {self.cluster}"
         
 
+
+
+class DocumentSequence(models.Model):
+    # One counter row per document series and scope (branch / fiscal year segment).
+    series = models.CharField(max_length=50)
+    scope = models.CharField(max_length=100, blank=True, default='')
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('series', 'scope')
+        verbose_name = "Document Sequence"
+        verbose_name_plural = "Document Sequences"
+
+    def __str__(self):
+        return f"{self.series}{'/' + self.scope if self.scope else ''} @ {self.last_value}"
+
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=10, default='plain')
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_status_next_idx'),
+        ]
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class SearchDocument(models.Model):
+    # Denormalised, searchable copy of a customer, product or supplier (see core.search)
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class SearchToken(models.Model):
+    # Inverted index: one row per distinct word of a document
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='tokens')
+    kind = models.CharField(max_length=20)
+    token = models.CharField(max_length=40)
+
+    class Meta:
+        indexes = [
+            # Covers the typeahead scan: a token range read in (token, document) order
+            models.Index(fields=['kind', 'token', 'document'], name='core_search_kind_token_idx'),
+            models.Index(fields=['document', 'token'], name='core_search_doc_token_idx'),
+        ]
+
+
+class SearchGram(models.Model):
+    # Trigrams of every indexed word, used to find near spellings of a misspelt word
+    gram = models.CharField(max_length=3)
+    token = models.CharField(max_length=40)
+    length = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('gram', 'token')
+        indexes = [
+            models.Index(fields=['gram', 'length'], name='core_search_gram_length_idx'),
+        ]
+
+
+class StockMovement(models.Model):
+    # Append-only stock ledger; quantity is signed (receipts in, deliveries out) and a
+    # posted document is reversed by adding opposite movements, never by editing these
+    DOCUMENT_TYPES = [
+        ('stock_receipt', 'Stock Receipt'),
+        ('stock_return', 'Stock Return'),
+        ('delivery_note', 'Delivery Note'),
+        ('delivery_note_return', 'Delivery Note Return'),
+    ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, null=True, blank=True, related_name='stock_movements')
+    quantity = models.IntegerField()
+    document_type = models.CharField(max_length=30, choices=DOCUMENT_TYPES)
+    document_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['document_type', 'document_id'], name='core_stockmove_document_idx'),
+            models.Index(fields=['product', 'warehouse', 'created_at'], name='core_stockmove_product_idx'),
+        ]
+        verbose_name = "Stock Movement"
+        verbose_name_plural = "Stock Movements"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Stock movements are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.quantity:+d} ({self.document_type} {self.document_id})"
+
+
+class StockLevel(models.Model):
+    # On-hand balance per product and warehouse, maintained by core.stock from StockMovement
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_levels')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, null=True, blank=True, related_name='stock_levels')
+    on_hand = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('product', 'warehouse')
+        verbose_name = "Stock Level"
+        verbose_name_plural = "Stock Levels"
+
+    def __str__(self):
+        return f"{self.product_id}@{self.warehouse_id}: {self.on_hand}"
@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# A claimed email is leased to its worker for this long; if the worker dies the
+# row becomes claimable again once the lease runs out.
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def queue_email(subject, body, to, html=False, from_email=None, user=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        content_subtype='html' if html else 'plain',
+        from_email=from_email or '',
+        to=list(to),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+async def aqueue_email(subject, body, to, html=False, from_email=None, user=None):
+    return await OutboundEmail.objects.acreate(
+        subject=subject,
+        body=body,
+        content_subtype='html' if html else 'plain',
+        from_email=from_email or '',
+        to=list(to),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_SECONDS', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+def claim_emails(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(status='sending', next_attempt_at=now + CLAIM_LEASE)
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def deliver(email, connection):
+    message = EmailMessage(
+        email.subject, email.body, email.from_email or None, email.to, connection=connection,
+    )
+    message.content_subtype = email.content_subtype
+    email.attempts += 1
+    try:
+        message.send()
+    except Exception as e:
+        email.last_error = str(e)
+        if email.attempts >= email.max_attempts:
+            email.status = 'failed'
+        else:
+            email.status = 'queued'
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.error(f"Failed to send email {email.id} (attempt {email.attempts}): {e}")
+        email.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error'])
+        return False
+    email.status = 'sent'
+    email.sent_at = timezone.now()
+    email.last_error = ''
+    email.save(update_fields=['attempts', 'status', 'sent_at', 'last_error'])
+    return True
+
+
+def _open(connection):
+    # An open connection is reused for every message; if it cannot be opened the
+    # send itself reconnects and the failure is recorded against the email.
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Could not open email connection: {e}")
+
+
+def deliver_pending(connection=None, batch_size=50):
+    # Reuses the caller's open SMTP connection across batches when one is given
+    emails = claim_emails(batch_size)
+    if not emails:
+        return 0, 0
+    owns_connection = connection is None
+    connection = connection or get_connection()
+    sent = 0
+    try:
+        _open(connection)
+        for email in emails:
+            if deliver(email, connection):
+                sent += 1
+            else:
+                # Drop a connection that may be broken and reconnect for the next email
+                connection.close()
+                _open(connection)
+    finally:
+        if owns_connection:
+            connection.close()
+    return sent, len(emails) - sent
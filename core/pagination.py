@@ -0,0 +1,139 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+def approximate_count(queryset):
+    # Row estimate from the query planner; exact COUNT(*) on other backends
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            row = cursor.fetchone()
+            if row and 'rows' in columns:
+                return int(row[columns.index('rows')] or 0)
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.count()
+
+
+def is_nullable(model, field_name):
+    try:
+        return model._meta.get_field(field_name).null
+    except FieldDoesNotExist:
+        # 'pk' and other aliases name the primary key
+        return False
+
+
+def keyset_ordering(model, field_name, descending):
+    # NULLs rank above every value, so they come first newest-first and last oldest-first;
+    # the cursor filter below relies on that order
+    if not is_nullable(model, field_name):
+        return (f'-{field_name}', '-pk') if descending else (field_name, 'pk')
+    if descending:
+        return F(field_name).desc(nulls_first=True), '-pk'
+    return F(field_name).asc(nulls_last=True), 'pk'
+
+
+class KeysetPagination:
+    # Cursor pagination over (date_field, id), newest first unless descending=False.
+    # The cursor carries the last row's key, so every page is a range scan on the
+    # (date, id) index no matter how deep it is. ?total=approx|exact adds 'total_entries'.
+    default_per_page = 20
+    max_per_page = 100
+
+    def __init__(self, date_field, descending=True):
+        self.date_field = date_field
+        self.descending = descending
+
+    def _encode(self, obj, direction):
+        value = getattr(obj, self.date_field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps([value, obj.pk, direction], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _decode(self, cursor):
+        try:
+            value, pk, direction = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if direction not in ('next', 'previous'):
+                raise ValueError
+            return value, int(pk), direction
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise ValidationError({'error': 'Invalid cursor'})
+
+    def _after(self, model, value, pk, downwards):
+        # Rows past the cursor's (value, pk) in keyset_ordering, where NULL ranks highest
+        lookup = 'lt' if downwards else 'gt'
+        if value is None:
+            after = Q(**{f'{self.date_field}__isnull': True, f'pk__{lookup}': pk})
+            if downwards:
+                after |= Q(**{f'{self.date_field}__isnull': False})
+            return after
+        after = Q(**{f'{self.date_field}__{lookup}': value}) | Q(**{self.date_field: value, f'pk__{lookup}': pk})
+        if not downwards and is_nullable(model, self.date_field):
+            after |= Q(**{f'{self.date_field}__isnull': True})
+        return after
+
+    def _per_page(self, request):
+        try:
+            per_page = int(request.query_params.get('per_page', getattr(settings, 'KEYSET_PAGE_SIZE', self.default_per_page)))
+        except ValueError:
+            raise ValidationError({'error': 'per_page must be an integer'})
+        return max(1, min(per_page, self.max_per_page))
+
+    def paginate_queryset(self, queryset, request):
+        per_page = self._per_page(request)
+        self.total = None
+        total_mode = request.query_params.get('total')
+        if total_mode == 'exact':
+            self.total = queryset.count()
+        elif total_mode == 'approx':
+            self.total = approximate_count(queryset)
+
+        cursor = request.query_params.get('cursor')
+        direction = 'next'
+        if cursor:
+            value, pk, direction = self._decode(cursor)
+        # Reading towards smaller keys: the next page of a descending list, or the previous page of an ascending one
+        downwards = (direction == 'next') == self.descending
+        if cursor:
+            queryset = queryset.filter(self._after(queryset.model, value, pk, downwards))
+        queryset = queryset.order_by(*keyset_ordering(queryset.model, self.date_field, downwards))
+
+        rows = list(queryset[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == 'previous':
+            rows.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows:
+            if direction == 'previous' or has_more:
+                self.next_cursor = self._encode(rows[-1], 'next')
+            if cursor and (direction == 'next' or has_more):
+                self.previous_cursor = self._encode(rows[0], 'previous')
+        return rows
+
+    def get_paginated_response(self, data):
+        response = {
+            'results': data,
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+        }
+        if self.total is not None:
+            response['total_entries'] = self.total
+        return Response(response, status=status.HTTP_200_OK)
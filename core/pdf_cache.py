@@ -0,0 +1,100 @@
+import hashlib
+import io
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import parse_etags
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+PDF_CACHE_DIR = 'pdf_cache'
+TITLE_STYLE = ParagraphStyle('title', fontName='Helvetica-Bold', fontSize=14, leading=18)
+BODY_STYLE = ParagraphStyle('body', fontName='Helvetica', fontSize=12, leading=16)
+
+
+def render_lines(lines):
+    # Plain data in, PDF bytes out, so it can also run in a worker process
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = [Paragraph(escape(line), TITLE_STYLE if i == 0 else BODY_STYLE) for i, line in enumerate(lines)]
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _rows(manager):
+    # Uses prefetched rows when the caller has prefetched them
+    rows = sorted(manager.all(), key=lambda row: row.pk)
+    return [[getattr(row, field.attname) for field in row._meta.concrete_fields] for row in rows]
+
+
+def document_version(instance, related=('items',), extra=()):
+    # Hash of every column of the document and of its related rows, so any edit
+    # to the document or one of its items produces a new version
+    payload = [
+        [getattr(instance, field.attname) for field in instance._meta.concrete_fields],
+        [_rows(getattr(instance, name)) for name in related],
+        list(extra),
+    ]
+    data = json.dumps(payload, default=str, sort_keys=True).encode()
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def document_etag(doc_type, instance, version):
+    return f'"{doc_type}-{instance.pk}-{version}"'
+
+
+def is_not_modified(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags or etag.removeprefix('W/') in etags
+
+
+def not_modified_response(etag):
+    response = HttpResponse(status=304)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cache_path(doc_type, pk, version):
+    return os.path.join(settings.MEDIA_ROOT, PDF_CACHE_DIR, doc_type, f'{pk}-{version}.pdf')
+
+
+def store_pdf(path, pk, content):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary name first so concurrent readers never see a partial file
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    # Older versions of the same document are never served again
+    prefix = f'{pk}-'
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith('.pdf') and os.path.join(directory, name) != path:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def cached_pdf_response(request, doc_type, instance, filename, render, related=('items',), extra=()):
+    version = document_version(instance, related, extra)
+    etag = document_etag(doc_type, instance, version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    path = cache_path(doc_type, instance.pk, version)
+    if not os.path.exists(path):
+        store_pdf(path, instance.pk, render())
+
+    response = FileResponse(open(path, 'rb'), content_type='application/pdf', as_attachment=True, filename=filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
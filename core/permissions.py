@@ -1,51 +1,155 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import permissions
 
+from .caching import shared_cache
+
+# Permission category for each view class, resolved once at import time
+VIEW_PERMISSION_CATEGORIES = {
+    'dashboard': ['DepartmentListView', 'DepartmentDetailView'],
+    'task': ['RoleView', 'RoleDetailView'],
+    'projectTracker': ['BranchListView', 'BranchDetailView'],
+    'onboarding': ['ManageUsersView', 'ManageUserDetailView', 'OnboardingListView', 'OnboardingDetailView'],
+    'inventory': [
+        'ProductListView', 'ProductDetailView', 'ProductImportView', 'CategoryListView', 'CategoryDetailView',
+        'TaxCodeListView', 'TaxCodeDetailView', 'UOMListView', 'UOMDetailView', 'WarehouseListView',
+        'WarehouseDetailView', 'SizeListView', 'SizeDetailView', 'ColorListView', 'ColorDetailView',
+        'SupplierListView', 'SupplierDetailView',
+    ],
+    'attendance': ['AttendanceView', 'CheckInOutView'],
+    'profile': ['ProfileView'],
+    # Appended last so the bit positions of existing categories do not move
+    'attendanceReports': ['OrganizationAttendanceView', 'AsyncOrganizationAttendanceView', 'AttendanceImportView'],
+}
+VIEW_CATEGORIES = {
+    view_name: category
+    for category, view_names in VIEW_PERMISSION_CATEGORIES.items()
+    for view_name in view_names
+}
+
+# Each category owns four bits of a role's mask: view, create, edit, delete
+CATEGORY_SHIFT = {category: index * 4 for index, category in enumerate(VIEW_PERMISSION_CATEGORIES)}
+ACTION_BITS = {'view': 1, 'create': 2, 'edit': 4, 'delete': 8}
+METHOD_ACTIONS = {'POST': 'create', 'PUT': 'edit', 'PATCH': 'edit', 'DELETE': 'delete'}
+METHOD_ACTIONS.update({method: 'view' for method in permissions.SAFE_METHODS})
+
+ROLE_MASK_CACHE_KEY = 'role_permission_mask:{}'
+USER_ROLE_CACHE_KEY = 'user_role:{}'
+# Bumped by every role or profile change. Cached entries are keyed by the generation they
+# were loaded under, so one bump retires them in all workers at once.
+GENERATION_CACHE_KEY = 'permission_generation'
+NO_ROLE = 0
+
+# Process-local copies of the shared cache entries: key -> (value, expires_at, generation)
+_local_cache = {}
+
+
+def compile_role_permissions(role_permissions):
+    mask = 0
+    for category, shift in CATEGORY_SHIFT.items():
+        category_permissions = (role_permissions or {}).get(category) or {}
+        for action, bit in ACTION_BITS.items():
+            if category_permissions.get(action, False):
+                mask |= bit << shift
+    return mask
+
+
+def _generation(cache):
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        # Evicted or never set: start from the clock so no earlier generation comes back
+        cache.add(GENERATION_CACHE_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def _cached(key, load):
+    cache = shared_cache()
+    if cache is None:
+        # Nothing could reach the other workers' copies when a role changes
+        return load()
+    generation = _generation(cache)
+    now = time.monotonic()
+    entry = _local_cache.get(key)
+    if entry and entry[1] > now and entry[2] == generation:
+        return entry[0]
+    shared_key = f'{key}:{generation}'
+    value = cache.get(shared_key)
+    if value is None:
+        value = load()
+        cache.set(shared_key, value, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300))
+    _local_cache[key] = (value, now + getattr(settings, 'PERMISSION_LOCAL_CACHE_TIMEOUT', 30), generation)
+    return value
+
+
+def _bump_generation():
+    cache = shared_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        cache.add(GENERATION_CACHE_KEY, time.time_ns(), None)
+
+
+def invalidate_permissions():
+    # After commit, so no worker can reload the old rows under the new generation
+    transaction.on_commit(_bump_generation)
+
+
+def invalidate_role_permissions(role_id):
+    invalidate_permissions()
+
+
+def invalidate_user_role(user_id):
+    invalidate_permissions()
+
+
+def get_role_permission_mask(role_id):
+    from .models import Role
+
+    def load():
+        role_permissions = Role.objects.filter(pk=role_id).values_list('permissions', flat=True).first()
+        return compile_role_permissions(role_permissions)
+
+    return _cached(ROLE_MASK_CACHE_KEY.format(role_id), load)
+
+
+def get_user_role_id(user):
+    # Reuse a profile that is already loaded on the user instead of the cache
+    if 'profile' in user._state.fields_cache:
+        profile = user._state.fields_cache['profile']
+        return profile.role_id if profile else None
+
+    from .models import Profile
+
+    def load():
+        return Profile.objects.filter(user_id=user.pk).values_list('role_id', flat=True).first() or NO_ROLE
+
+    return _cached(USER_ROLE_CACHE_KEY.format(user.pk), load) or None
+
+
 class RoleBasedPermission(permissions.BasePermission):
     def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+
         # Superusers have full access
         if request.user.is_superuser:
             return True
 
-        # Non-superusers must have a role
-        if not request.user.profile.role:
+        # Deny access by default for unmapped views
+        category = VIEW_CATEGORIES.get(view.__class__.__name__)
+        action = METHOD_ACTIONS.get(request.method)
+        if category is None or action is None:
             return False
 
-        # Get the user's role permissions
-        role_permissions = request.user.profile.role.permissions
-
-        # Map the view to a permission category
-        permission_category = None
-        if view.__class__.__name__ in ['DepartmentListView', 'DepartmentDetailView']:
-            permission_category = 'dashboard'
-        elif view.__class__.__name__ in ['RoleView', 'RoleDetailView']:
-            permission_category = 'task'
-        elif view.__class__.__name__ in ['BranchListView', 'BranchDetailView']:
-            permission_category = 'projectTracker'
-        elif view.__class__.__name__ in ['ManageUsersView', 'ManageUserDetailView', 'OnboardingListView', 'OnboardingDetailView']:
-            permission_category = 'onboarding'
-        elif view.__class__.__name__ in ['ProductListView', 'ProductDetailView', 'ProductImportView', 'CategoryListView', 'CategoryDetailView', 'TaxCodeListView', 'TaxCodeDetailView', 'UOMListView', 'UOMDetailView', 'WarehouseListView', 'WarehouseDetailView', 'SizeListView', 'SizeDetailView', 'ColorListView', 'ColorDetailView', 'SupplierListView', 'SupplierDetailView']:
-            permission_category = 'inventory'
-        elif view.__class__.__name__ in ['AttendanceView', 'CheckInOutView']:
-            permission_category = 'attendance'
-        elif view.__class__.__name__ in ['ProfileView']:
-            permission_category = 'profile'
-        else:
-            return False  # Deny access by default for unmapped views
-
-        # Check if the category exists in permissions
-        if permission_category not in role_permissions:
+        # Non-superusers must have a role
+        role_id = get_user_role_id(request.user)
+        if not role_id:
             return False
 
-        category_permissions = role_permissions[permission_category]
-
-        # Check specific permissions based on the request method
-        if request.method in permissions.SAFE_METHODS:  # GET, HEAD, OPTIONS
-            return category_permissions.get('view', False)
-        elif request.method == 'POST':
-            return category_permissions.get('create', False)
-        elif request.method in ['PUT', 'PATCH']:
-            return category_permissions.get('edit', False)
-        elif request.method == 'DELETE':
-            return category_permissions.get('delete', False)
-
-        return False
\ No newline at end of file
+        required = ACTION_BITS[action] << CATEGORY_SHIFT[category]
+        return bool(get_role_permission_mask(role_id) & required)
@@ -0,0 +1,166 @@
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Product, Category, TaxCode, UOM, Warehouse, Size, Color, Supplier
+from .search import index_objects
+
+REQUIRED_FIELDS = ['product_id', 'name', 'product_type', 'category', 'status', 'stock_level', 'unit_price']
+DIMENSIONS = {
+    'category': Category,
+    'tax_code': TaxCode,
+    'uom': UOM,
+    'warehouse': Warehouse,
+    'size': Size,
+    'color': Color,
+    'supplier': Supplier,
+}
+TEXT_FIELDS = ['description', 'weight', 'specifications', 'sub_category', 'related_products']
+# quantity is not imported: it is the on-hand total kept by the stock ledger
+NUMBER_FIELDS = {'unit_price': 0, 'discount': 0, 'stock_level': 0, 'reorder_level': 0}
+INTEGER_FIELDS = {'stock_level', 'reorder_level'}
+CHOICE_FIELDS = {
+    'product_type': [choice for choice, _ in Product._meta.get_field('product_type').choices],
+    'status': [choice for choice, _ in Product._meta.get_field('status').choices],
+    'product_usage': [choice for choice, _ in Product._meta.get_field('product_usage').choices],
+}
+DEFAULT_PRODUCT_USAGE = 'Both'
+CHUNK_SIZE = 1000
+
+
+def read_frames(file, chunk_size=CHUNK_SIZE):
+    # CSV files are streamed chunk by chunk; Excel workbooks have to be read whole
+    if file.name.endswith('.xlsx'):
+        yield pd.read_excel(file, dtype=str)
+    else:
+        yield from pd.read_csv(file, dtype=str, chunksize=chunk_size)
+
+
+def _clean(df):
+    df = df.reset_index(drop=True)
+    for column in df.columns:
+        df[column] = df[column].fillna('').astype(str).str.strip()
+    return df
+
+
+def _add_error(errors, mask, message):
+    for index in mask[mask].index:
+        errors.setdefault(index, []).append(message)
+
+
+def _resolve_dimension(values, model):
+    # One query per dimension: match by name, or by id for purely numeric values
+    names = values[values != ''].unique().tolist()
+    if not names:
+        return pd.Series(None, index=values.index, dtype=object)
+    ids = [int(name) for name in names if name.isdigit()]
+    by_name, by_id = {}, {}
+    for pk, name in model.objects.filter(Q(name__in=names) | Q(pk__in=ids)).values_list('id', 'name'):
+        by_name[name] = pk
+        by_id[str(pk)] = pk
+    return values.map(lambda value: by_name.get(value, by_id.get(value)))
+
+
+def _build_products(df):
+    dimensions = [field for field in DIMENSIONS if field in df]
+    resolved = {field: _resolve_dimension(df[field], DIMENSIONS[field]) for field in dimensions}
+    text_fields = [field for field in TEXT_FIELDS if field in df]
+    number_fields = [field for field in NUMBER_FIELDS if field in df]
+    products = []
+    for position, row in enumerate(df.to_dict('records')):
+        product = Product(
+            product_id=row['product_id'],
+            name=row['name'],
+            product_type=row['product_type'],
+            status=row['status'],
+            product_usage=row.get('product_usage') or DEFAULT_PRODUCT_USAGE,
+            **{field: row[field] for field in text_fields},
+            **{field: row[field] for field in number_fields},
+        )
+        # Names that do not match an existing record are kept as custom values
+        for field in dimensions:
+            pk = resolved[field].iat[position]
+            pk = None if pd.isna(pk) else int(pk)
+            if pk is None and row[field]:
+                setattr(product, f'is_custom_{field}', True)
+                setattr(product, f'custom_{field}', row[field])
+            else:
+                setattr(product, f'{field}_id', pk)
+        products.append(product)
+    return products
+
+
+def _update_fields(columns):
+    # An existing product only takes the columns the file has; the rest keep their values
+    fields = [field for field in ('name', 'product_type', 'status', 'product_usage') if field in columns]
+    fields += [field for field in TEXT_FIELDS + list(NUMBER_FIELDS) if field in columns]
+    for field in DIMENSIONS:
+        if field in columns:
+            fields += [field, f'is_custom_{field}', f'custom_{field}']
+    return fields
+
+
+def _write(products, columns):
+    options = {'update_conflicts': True, 'update_fields': _update_fields(columns)}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['product_id']
+    Product.objects.bulk_create(products, batch_size=CHUNK_SIZE, **options)
+    # bulk_create skips Product.save, so the search index is refreshed here
+    index_objects('product', Product.objects.filter(product_id__in=[product.product_id for product in products]))
+
+
+def import_products(frames):
+    report = {'valid_rows': 0, 'invalid_rows': 0, 'skipped_rows': 0, 'errors': [], 'skipped': []}
+    seen_product_ids = set()
+    seen_product_names = set()
+    offset = 0
+
+    with transaction.atomic():
+        for frame in frames:
+            df = _clean(frame)
+            errors = {}
+
+            missing = df[REQUIRED_FIELDS] == ''
+            for field in REQUIRED_FIELDS:
+                _add_error(errors, missing[field], f'{field} is required')
+            for field in NUMBER_FIELDS:
+                if field not in df:
+                    continue
+                numbers = pd.to_numeric(df[field].replace('', None), errors='coerce')
+                _add_error(errors, (df[field] != '') & numbers.isna(), f'{field} must be a number')
+                numbers = numbers.fillna(NUMBER_FIELDS[field])
+                if field in INTEGER_FIELDS:
+                    _add_error(errors, numbers % 1 != 0, f'{field} must be a whole number')
+                    numbers = numbers.where(numbers % 1 == 0, 0).astype('int64')
+                df[field] = numbers
+            for field, choices in CHOICE_FIELDS.items():
+                if field in df:
+                    _add_error(errors, (df[field] != '') & ~df[field].isin(choices), f'{field} must be one of {choices}')
+
+            candidates = df[~df.index.isin(list(errors))]
+            # First valid occurrence of a product id or name wins, across the whole file
+            duplicate = (
+                candidates['product_id'].duplicated() | candidates['name'].duplicated()
+                | candidates['product_id'].isin(seen_product_ids) | candidates['name'].isin(seen_product_names)
+            )
+            valid = candidates[~duplicate]
+            seen_product_ids.update(valid['product_id'])
+            seen_product_names.update(valid['name'])
+
+            for index in sorted(errors):
+                report['errors'].append({
+                    'row': offset + index + 2,
+                    'product_id': df.at[index, 'product_id'],
+                    'errors': errors[index],
+                })
+            for index in candidates[duplicate].index:
+                report['skipped'].append({'row': offset + index + 2, 'product_id': df.at[index, 'product_id']})
+
+            if not valid.empty:
+                _write(_build_products(valid), df.columns)
+            report['valid_rows'] += len(valid)
+            report['invalid_rows'] += len(errors)
+            report['skipped_rows'] += int(duplicate.sum())
+            offset += len(frame)
+
+    return report
@@ -0,0 +1,129 @@
+import re
+import time
+from statistics import median
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+# (view, query parameters) for the list and dashboard requests the frontend issues
+# most; each one is run and every SELECT it issues is explained
+AUDITED_REQUESTS = [
+    ('core.views.CustomerListView', {}),
+    ('core.views.CustomerListView', {'status': 'Active'}),
+    ('core.views.CustomerSummaryView', {}),
+    ('core.views.ProductListView', {}),
+    ('core.views.SupplierListView', {}),
+    ('core.views.TaskListView', {}),
+    ('core.views.TaskListView', {'status': 'In Progress'}),
+    ('core.views.DashboardTaskView', {}),
+    ('core.views.OnboardingListView', {}),
+    ('core.views.AttendanceView', {}),
+    ('crm.views.EnquiryListView', {}),
+    ('crm.views.QuotationListView', {}),
+    ('crm.views.QuotationListView', {'status': 'Draft'}),
+    ('crm.views.SalesOrderListView', {}),
+    ('crm.views.SalesOrderListView', {'status': 'Submitted'}),
+    ('crm.views.DeliveryNoteListView', {}),
+    ('crm.views.DeliveryNoteListView', {'status': 'Draft'}),
+    ('crm.views.InvoiceListView', {}),
+    ('crm.views.InvoiceListView', {'status': 'Draft'}),
+    ('crm.views.InvoiceListView', {'customer_id': '1'}),
+    ('crm.views.InvoiceReturnListView', {}),
+    ('crm.views.DeliveryNoteReturnListView', {}),
+    ('purchase.views.PurchaseOrderListView', {}),
+    ('purchase.views.PurchaseOrderListView', {'supplier': '1'}),
+    ('purchase.views.StockReceiptListView', {}),
+    ('finance.views.CreditNoteListView', {}),
+    ('finance.views.CreditNoteListView', {'customer_id': '1'}),
+    ('finance.views.DebitNoteListView', {}),
+]
+
+FULL_SCAN = 'full scan'
+FILESORT = 'filesort'
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+SQLITE_SORT = re.compile(r'^USE TEMP B-TREE FOR (ORDER|GROUP) BY')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_SORT = re.compile(r'(?:^|->\s+)(?:Incremental )?Sort\b(?! Key| Method)')
+
+
+def captured_queries(view_path, params, user):
+    # Runs the view inside a rolled back transaction and returns the distinct SELECTs it issued
+    view = import_string(view_path).as_view()
+    request = APIRequestFactory().get('/', params)
+    force_authenticate(request, user=user)
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as captured:
+            view(request)
+        transaction.set_rollback(True)
+    queries = []
+    for query in captured.captured_queries:
+        sql = query['sql']
+        if sql.lstrip().upper().startswith('SELECT') and sql not in queries:
+            queries.append(sql)
+    return queries
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def plan_findings(plan):
+    # (kind, table or plan line) for every full table scan and sort the plan needs
+    findings = []
+    if connection.vendor == 'sqlite':
+        for row in plan:
+            detail = row['detail']
+            match = SQLITE_SCAN.match(detail)
+            if match:
+                findings.append((FULL_SCAN, match.group(1)))
+            elif SQLITE_SORT.match(detail):
+                findings.append((FILESORT, detail))
+    elif connection.vendor == 'mysql':
+        for row in plan:
+            if row.get('type') == 'ALL':
+                findings.append((FULL_SCAN, row['table']))
+            if 'Using filesort' in (row.get('Extra') or ''):
+                findings.append((FILESORT, row['table']))
+    elif connection.vendor == 'postgresql':
+        for row in plan:
+            line = next(iter(row.values()))
+            match = POSTGRES_SCAN.search(line)
+            if match:
+                findings.append((FULL_SCAN, match.group(1)))
+            elif POSTGRES_SORT.search(line.strip()):
+                findings.append((FILESORT, line.strip()))
+    return findings
+
+
+def time_query(sql, repeat):
+    # Median wall time of `repeat` executions, in milliseconds
+    timings = []
+    with connection.cursor() as cursor:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+    return median(timings)
+
+
+def audit(user, requests=AUDITED_REQUESTS, repeat=0):
+    # One entry per audited request: the queries it issued with their plan, findings and timing
+    report = []
+    for view_path, params in requests:
+        queries = []
+        for sql in captured_queries(view_path, params, user):
+            plan = explain(sql)
+            queries.append({
+                'sql': sql,
+                'plan': plan,
+                'findings': plan_findings(plan),
+                'ms': time_query(sql, repeat) if repeat else None,
+            })
+        report.append({'view': view_path, 'params': params, 'queries': queries})
+    return report
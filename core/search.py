@@ -0,0 +1,206 @@
+import re
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import Customer, Product, SearchDocument, SearchGram, SearchToken, Supplier
+
+TOKEN_LENGTH = 40
+MAX_QUERY_WORDS = 5
+# Words shorter than this are only prefix-matched; fuzzy matching needs a few trigrams.
+# Only alphabetic words go into the fuzzy vocabulary: near-misses of ids and numbers mean nothing
+FUZZY_MIN_LENGTH = 4
+FUZZY_LENGTH_SLACK = 2
+FUZZY_MIN_RATIO = 0.75
+FUZZY_CANDIDATES = 50
+FUZZY_ALTERNATIVES = 5
+BATCH_SIZE = 1000
+
+
+def _join(*parts):
+    return ', '.join(str(part) for part in parts if part)
+
+
+def customer_document(customer):
+    title = f'{customer.first_name} {customer.last_name}'.strip()
+    subtitle = _join(customer.customer_id, customer.email, customer.company_name)
+    text = [title, customer.customer_id, customer.email, customer.phone_number, customer.company_name,
+            customer.city, customer.gst_tax_id]
+    return title, subtitle, text
+
+
+def product_document(product):
+    subtitle = _join(product.product_id, product.sub_category, product.status)
+    text = [product.name, product.product_id, product.sub_category, product.custom_category]
+    return product.name, subtitle, text
+
+
+def supplier_document(supplier):
+    subtitle = _join(supplier.contact_person, supplier.email)
+    text = [supplier.name, supplier.contact_person, supplier.email, supplier.phone_number]
+    return supplier.name, subtitle, text
+
+
+SEARCH_TYPES = {
+    'customer': (Customer, customer_document),
+    'product': (Product, product_document),
+    'supplier': (Supplier, supplier_document),
+}
+
+
+def tokenize(text):
+    words = re.findall(r'\w+', (text or '').lower())
+    return [word[:TOKEN_LENGTH] for word in words]
+
+
+def document_tokens(parts):
+    tokens = set()
+    for part in parts:
+        tokens.update(tokenize(part))
+        # Phone numbers and ids are also searchable without their separators
+        digits = re.sub(r'\D', '', part or '')
+        if len(digits) >= 4:
+            tokens.add(digits[:TOKEN_LENGTH])
+    return tokens
+
+
+def trigrams(token):
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _add_vocabulary(tokens):
+    SearchGram.objects.bulk_create(
+        [
+            SearchGram(gram=gram, token=token, length=len(token))
+            for token in tokens if token.isalpha() and len(token) >= FUZZY_MIN_LENGTH
+            for gram in trigrams(token)
+        ],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def index_object(kind, instance):
+    title, subtitle, parts = SEARCH_TYPES[kind][1](instance)
+    tokens = document_tokens(parts)
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(
+            kind=kind, object_id=instance.pk, defaults={'title': title[:255], 'subtitle': subtitle[:255]},
+        )
+        stored = set(document.tokens.values_list('token', flat=True))
+        document.tokens.exclude(token__in=tokens).delete()
+        SearchToken.objects.bulk_create([
+            SearchToken(document=document, kind=kind, token=token) for token in tokens - stored
+        ])
+        _add_vocabulary(tokens - stored)
+
+
+def index_objects(kind, queryset):
+    # Bulk (re)indexing for imports and the rebuild command
+    count, last_pk = 0, 0
+    while True:
+        instances = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not instances:
+            return count
+        last_pk = instances[-1].pk
+        entries = {instance.pk: SEARCH_TYPES[kind][1](instance) for instance in instances}
+        with transaction.atomic():
+            remove_objects(kind, list(entries))
+            documents = SearchDocument.objects.bulk_create([
+                SearchDocument(kind=kind, object_id=pk, title=title[:255], subtitle=subtitle[:255])
+                for pk, (title, subtitle, _) in entries.items()
+            ])
+            if any(document.pk is None for document in documents):
+                # Backends that cannot return ids from a bulk insert
+                ids = dict(SearchDocument.objects.filter(kind=kind, object_id__in=list(entries)).values_list('object_id', 'id'))
+                for document in documents:
+                    document.pk = ids[document.object_id]
+            tokens = []
+            for document in documents:
+                for token in document_tokens(entries[document.object_id][2]):
+                    tokens.append(SearchToken(document_id=document.pk, kind=kind, token=token))
+            SearchToken.objects.bulk_create(tokens, batch_size=BATCH_SIZE)
+            _add_vocabulary({token.token for token in tokens})
+        count += len(documents)
+
+
+def remove_objects(kind, object_ids):
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def similar_tokens(word):
+    # Vocabulary words of about the same length sharing enough trigrams, checked with difflib
+    grams = trigrams(word)
+    candidates = (
+        SearchGram.objects.filter(
+            gram__in=grams, length__gte=len(word) - FUZZY_LENGTH_SLACK, length__lte=len(word) + FUZZY_LENGTH_SLACK,
+        ).values('token').annotate(shared=Count('id')).filter(shared__gte=max(2, len(grams) // 2))
+        .order_by('-shared')[:FUZZY_CANDIDATES]
+    )
+    scored = [
+        (SequenceMatcher(None, word, row['token']).ratio(), row['token'])
+        for row in candidates if row['token'] != word
+    ]
+    return [token for ratio, token in sorted(scored, reverse=True) if ratio >= FUZZY_MIN_RATIO][:FUZZY_ALTERNATIVES]
+
+
+def _prefix(word):
+    # A range rather than LIKE so every backend can read it from the token index
+    return Q(token__gte=word, token__lt=word[:-1] + chr(ord(word[-1]) + 1))
+
+
+def _conditions(words, fuzzy):
+    conditions = []
+    for word in words:
+        alternatives = similar_tokens(word) if fuzzy and word.isalpha() and len(word) >= FUZZY_MIN_LENGTH else []
+        # Exact spellings replace the prefix in the fuzzy pass: OR-ing the two would stop
+        # the database from reading either from the index
+        conditions.append(Q(token__in=[word, *alternatives]) if alternatives else _prefix(word))
+    return conditions
+
+
+def _matching_tokens(kind, words, conditions):
+    # Every word must match some token of the document. The longest word drives an
+    # index range scan on (kind, token, document); the others are checked per document
+    driver = max(range(len(words)), key=lambda i: len(words[i]))
+    tokens = SearchToken.objects.filter(conditions[driver], kind=kind)
+    for i, condition in enumerate(conditions):
+        if i != driver:
+            tokens = tokens.filter(Exists(SearchToken.objects.filter(condition, document_id=OuterRef('document_id'))))
+    return tokens
+
+
+def search_ids(kind, query):
+    # Subquery of object ids matching the query, for filtering other querysets
+    words = tokenize(query)[:MAX_QUERY_WORDS]
+    if not words:
+        return SearchDocument.objects.none().values('object_id')
+    return SearchDocument.objects.filter(
+        kind=kind, id__in=_matching_tokens(kind, words, _conditions(words, False)).values('document_id'),
+    ).values('object_id')
+
+
+def search_filter(kind, field='id'):
+    # A ListQuery filter matching `field` against the search index
+    return lambda queryset, value: queryset.filter(**{f'{field}__in': search_ids(kind, value)})
+
+
+def search(kind, query, limit=10, fuzzy=True):
+    words = tokenize(query)[:MAX_QUERY_WORDS]
+    if not words:
+        return []
+    document_ids = []
+    for use_fuzzy in (False, True) if fuzzy else (False,):
+        tokens = _matching_tokens(kind, words, _conditions(words, use_fuzzy)).order_by('token', 'document_id')
+        for document_id in tokens.values_list('document_id', flat=True)[:limit * 4]:
+            if document_id not in document_ids:
+                document_ids.append(document_id)
+        # Fuzzy matching only fills in when prefixes found too little
+        if len(document_ids) >= limit:
+            break
+    documents = SearchDocument.objects.in_bulk(document_ids[:limit])
+    return [
+        {'type': kind, 'id': documents[pk].object_id, 'title': documents[pk].title, 'subtitle': documents[pk].subtitle}
+        for pk in document_ids[:limit] if pk in documents
+    ]
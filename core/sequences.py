@@ -0,0 +1,153 @@
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+# series -> (default number format, model whose ids seed a fresh unscoped counter)
+# Formats can use {number}, {date}, {branch} and {fiscal_year}; override them per
+# deployment with settings.DOCUMENT_NUMBER_FORMATS, e.g.
+#   DOCUMENT_NUMBER_FORMATS = {'invoice': 'INV/{branch}/{fiscal_year}/{number:04d}'}
+# Using {branch} or {fiscal_year} gives that series its own counter per branch / year.
+DOCUMENT_SERIES = {
+    'enquiry': ('ENQ{number:03d}', 'crm.Enquiry'),
+    'quotation': ('QUO{number:03d}', 'crm.Quotation'),
+    'sales_order': ('SO{number:04d}', 'crm.SalesOrder'),
+    'delivery_note': ('DN-{number:04d}', 'crm.DeliveryNote'),
+    'invoice': ('INV-{number:04d}', 'crm.Invoice'),
+    'invoice_return': ('INVR-{number:04d}', 'crm.InvoiceReturn'),
+    'delivery_note_return': ('DNR-{number:04d}', 'crm.DeliveryNoteReturn'),
+    'credit_note': ('CRN-{number:04d}', 'finance.CreditNote'),
+    'debit_note': ('DBN-{number:04d}', 'finance.DebitNote'),
+    'purchase_order': ('PO-{date:%Y%m%d}-{number:03d}', 'purchase.PurchaseOrder'),
+    'stock_receipt': ('GRN-{date:%Y%m%d}-{number:04d}', 'purchase.StockReceipt'),
+    'stock_return': ('SRN-{date:%Y%m%d}-{number:04d}', 'purchase.StockReturn'),
+    'candidate': ('STA{number:04d}', 'core.Candidate'),
+    'product': ('CVB{number:03d}', 'core.Product'),
+    'customer': ('CUS{number:04d}', 'core.Customer'),
+}
+
+# Per-process blocks of reserved numbers: (series, scope) -> [next_value, last_value]
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def fiscal_year(on):
+    start_month = getattr(settings, 'FISCAL_YEAR_START_MONTH', 4)
+    start = on.year if on.month >= start_month else on.year - 1
+    if start_month == 1:
+        return str(start)
+    return f'{start}-{str(start + 1)[-2:]}'
+
+
+def _number_format(series):
+    if series not in DOCUMENT_SERIES:
+        raise ValueError(f"Unknown document series '{series}'")
+    overrides = getattr(settings, 'DOCUMENT_NUMBER_FORMATS', {})
+    return overrides.get(series, DOCUMENT_SERIES[series][0])
+
+
+def _seed_value(series, scope):
+    # A brand new unscoped counter continues after the rows that were numbered
+    # by the old "latest id + 1" scheme, so existing numbers are never reissued.
+    if scope:
+        return 0
+    model = apps.get_model(DOCUMENT_SERIES[series][1])
+    return model.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _update_returning():
+    # PostgreSQL and SQLite 3.35+ can return the counter from the UPDATE itself; MySQL
+    # and MariaDB cannot, so there the new value is read back under the same row lock.
+    return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_rows_from_bulk_insert
+
+
+def _increment(series, scope, count):
+    # The counter's new last_value, or None when its row does not exist yet
+    if _update_returning():
+        quote = connection.ops.quote_name
+        last_value = quote('last_value')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {quote(DocumentSequence._meta.db_table)} SET {last_value} = {last_value} + %s '
+                f'WHERE {quote("series")} = %s AND {quote("scope")} = %s RETURNING {last_value}',
+                [count, series, scope],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    counter = DocumentSequence.objects.filter(series=series, scope=scope)
+    if not counter.update(last_value=F('last_value') + count):
+        return None
+    return counter.values_list('last_value', flat=True).get()
+
+
+def _reserve(series, scope, count):
+    # Incrementing in the database: concurrent callers serialise on the counter
+    # row for the length of one UPDATE instead of racing on a MAX() query.
+    with transaction.atomic():
+        last = _increment(series, scope, count)
+        if last is None:
+            DocumentSequence.objects.get_or_create(
+                series=series, scope=scope,
+                defaults={'last_value': lambda: _seed_value(series, scope)},
+            )
+            last = _increment(series, scope, count)
+    return list(range(last - count + 1, last + 1))
+
+
+def _take(series, scope, count):
+    block_size = getattr(settings, 'DOCUMENT_SEQUENCE_BLOCK_SIZE', 1)
+    # Inside an outer transaction the reservation must roll back with the caller,
+    # so it is never served from (or added to) the process-wide block cache.
+    if block_size <= 1 or connection.in_atomic_block:
+        return _reserve(series, scope, count)
+
+    key = (series, scope)
+    values = []
+    with _blocks_lock:
+        block = _blocks.get(key)
+        while len(values) < count:
+            if not block or block[0] > block[1]:
+                reserved = _reserve(series, scope, max(block_size, count - len(values)))
+                block = [reserved[0], reserved[-1]]
+            take = min(count - len(values), block[1] - block[0] + 1)
+            values.extend(range(block[0], block[0] + take))
+            block[0] += take
+        _blocks[key] = block
+    return values
+
+
+def allocate_document_numbers(series, count, branch=None, on=None):
+    """Reserve ``count`` consecutive document numbers for ``series`` with one counter update."""
+    if count <= 0:
+        return []
+    number_format = _number_format(series)
+    on = on or timezone.localdate()
+    context = {
+        'date': on,
+        'branch': getattr(branch, 'name', branch) or '' if '{branch' in number_format else '',
+        'fiscal_year': fiscal_year(on) if '{fiscal_year' in number_format else '',
+    }
+    scope = '/'.join(part for part in (context['branch'], context['fiscal_year']) if part)
+    return [number_format.format(number=value, **context) for value in _take(series, scope, count)]
+
+
+def next_document_number(series, branch=None, on=None):
+    return allocate_document_numbers(series, 1, branch=branch, on=on)[0]
+
+
+def insert_numbered_documents(model, number_field, documents, batch_size=None):
+    """Bulk insert documents numbered by allocate_document_numbers() and set their ids."""
+    model.objects.bulk_create(documents, batch_size=batch_size)
+    if documents and documents[0].pk is None:
+        # Backends that cannot return ids from a bulk insert: look them up by document number
+        ids = dict(model.objects.filter(
+            **{f'{number_field}__in': [getattr(document, number_field) for document in documents]}
+        ).values_list(number_field, 'id'))
+        for document in documents:
+            document.pk = ids[getattr(document, number_field)]
+    return documents
@@ -332,11 +332,13 @@ class ProductSerializer(serializers.ModelSerializer):
             'product_usage', 'related_products', 'is_custom_related_products', 'custom_related_products',
             'image', 'sub_category',
         ]
+        # On-hand quantity is moved by stock documents through core.stock only
+        read_only_fields = ['quantity']
 
     def validate(self, data):
         # Make all non-image fields required, except related_products when is_custom_related_products is true
         required_fields = [
-            'name', 'product_type', 'description', 'unit_price', 'discount', 'quantity',
+            'name', 'product_type', 'description', 'unit_price', 'discount',
             'stock_level', 'reorder_level', 'weight', 'specifications', 'status',
             'product_usage', 'sub_category'
         ]
@@ -525,10 +527,16 @@ from rest_framework import serializers
 from .models import Attendance, GovernmentHoliday
 
 class AttendanceSerializer(serializers.ModelSerializer):
+    check_in_times = serializers.SerializerMethodField()
+
     class Meta:
         model = Attendance
         fields = ['id', 'date', 'check_in_times', 'total_hours']
 
+    def get_check_in_times(self, obj):
+        # Sorted in Python so a prefetched punch list is used as is
+        return [punch.ts.isoformat() for punch in sorted(obj.punches.all(), key=lambda punch: (punch.ts, punch.id))]
+
 class CheckInOutSerializer(serializers.Serializer):
     date = serializers.DateField()
     is_check_in = serializers.BooleanField()
@@ -577,6 +585,7 @@ class TaskSummarySerializer(serializers.Serializer):
 class TaskDataSerializer(serializers.Serializer):
     taskData = TaskSerializer(many=True)
     taskSummary = TaskSummarySerializer()
+    totalTasks = serializers.IntegerField()
 
 class DashboardAttendanceSerializer(serializers.Serializer):
     dateData = serializers.ListField(child=serializers.DictField())
@@ -586,6 +595,7 @@ from .models import Customer
 
 from rest_framework import serializers
 from .models import Customer, Candidate
+from .sequences import next_document_number
 
 class CustomerSerializer(serializers.ModelSerializer):
     assigned_sales_rep = serializers.PrimaryKeyRelatedField(
@@ -614,13 +624,12 @@ class CustomerSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def _generate_customer_id(self):
-        last_customer = Customer.objects.order_by('-id').first()
-        if last_customer:
-            last_id = int(last_customer.customer_id.replace('CUS', '')) + 1
-        else:
-            last_id = 1
-        return f'CUS{last_id:04d}'
+        return next_document_number('customer')
 
 
- 
+from .models import OutboundEmail
 
+class OutboundEmailSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OutboundEmail
+        fields = ['id', 'subject', 'to', 'status', 'attempts', 'max_attempts', 'next_attempt_at', 'last_error', 'created_at', 'sent_at']
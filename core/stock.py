@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Product, StockLevel, StockMovement
+
+
+def locked_status(instance, field):
+    # The stored status of a document, with its row locked until the posting transaction
+    # ends so two concurrent transitions of the same document cannot both post it
+    if instance.pk is None:
+        return None
+    return (
+        type(instance)._default_manager.select_for_update()
+        .filter(pk=instance.pk).values_list(field, flat=True).first()
+    )
+
+
+def _bump_level(product_id, warehouse_id, quantity):
+    levels = StockLevel.objects.filter(product_id=product_id, warehouse_id=warehouse_id)
+    if levels.update(on_hand=F('on_hand') + quantity):
+        return
+    # First movement for this product and warehouse. The unique key does not cover a NULL
+    # warehouse, so the product row is locked to stop two posters creating the level twice
+    list(Product.objects.select_for_update().filter(pk=product_id).values_list('pk', flat=True))
+    if not levels.update(on_hand=F('on_hand') + quantity):
+        StockLevel.objects.create(product_id=product_id, warehouse_id=warehouse_id, on_hand=quantity)
+
+
+def post_document(document_type, document_id, lines):
+    # Bring the ledger of one document to `lines`, the (product_id, warehouse_id, quantity)
+    # rows it should hold: its lines while posted, nothing once cancelled. Only the
+    # difference is written, so re-posting is a no-op and un-posting reverses the document.
+    wanted = defaultdict(int)
+    for product_id, warehouse_id, quantity in lines:
+        if product_id and quantity:
+            wanted[(product_id, warehouse_id)] += quantity
+    with transaction.atomic():
+        posted = (
+            StockMovement.objects.filter(document_type=document_type, document_id=document_id)
+            .values('product_id', 'warehouse_id').annotate(total=Sum('quantity')).order_by()
+        )
+        for row in posted:
+            wanted[(row['product_id'], row['warehouse_id'])] -= row['total']
+        # Fixed (product, warehouse) order keeps concurrent postings from deadlocking
+        keys = sorted((key for key, delta in wanted.items() if delta), key=lambda key: (key[0], key[1] or 0))
+        if not keys:
+            return []
+        movements = StockMovement.objects.bulk_create([
+            StockMovement(
+                product_id=product_id, warehouse_id=warehouse_id, quantity=wanted[(product_id, warehouse_id)],
+                document_type=document_type, document_id=document_id,
+            )
+            for product_id, warehouse_id in keys
+        ])
+        product_totals = defaultdict(int)
+        for movement in movements:
+            _bump_level(movement.product_id, movement.warehouse_id, movement.quantity)
+            product_totals[movement.product_id] += movement.quantity
+        # Product.quantity stays the total on hand across warehouses for the existing screens
+        for product_id, delta in product_totals.items():
+            if delta:
+                Product.objects.filter(pk=product_id).update(quantity=F('quantity') + delta)
+    return movements
+
+
+def sync_document_stock(document, document_type, previous_status, status):
+    # Called from a stock document's save() inside its transaction, after locked_status()
+    posted = document.STOCK_POSTED_STATUSES
+    if previous_status in posted or status in posted:
+        post_document(document_type, document.pk, document.stock_lines() if status in posted else [])
+
+
+def sync_line_stock(document, document_type, status_field):
+    # Called from a line's save() or delete() inside its transaction: while the document is
+    # posted, its ledger follows its lines. The stored status is read under the same row
+    # lock a status change takes, so a line edit and a transition cannot interleave.
+    if locked_status(document, status_field) in document.STOCK_POSTED_STATUSES:
+        post_document(document_type, document.pk, document.stock_lines())
+
+
+def stock_levels(product_id, warehouse_id=None):
+    levels = StockLevel.objects.filter(product_id=product_id)
+    if warehouse_id is not None:
+        levels = levels.filter(warehouse_id=warehouse_id)
+    return [
+        {'warehouse': row['warehouse_id'], 'warehouse_name': row['warehouse__name'], 'on_hand': row['on_hand']}
+        for row in levels.values('warehouse_id', 'warehouse__name', 'on_hand').order_by('warehouse_id')
+    ]
@@ -1,3 +1,219 @@
-from django.test import TestCase
+import io
+from datetime import date, datetime, time
+from decimal import Decimal
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .async_views import AsyncAPIView
+from .attendance import record_punch
+from .attendance_import import import_punches
+from . import permissions as role_permissions
+from . import sequences
+from .models import Attendance, AttendancePunch, Department, DocumentSequence, Product, Profile, Role
+from .permissions import RoleBasedPermission, VIEW_CATEGORIES
+from .product_import import import_products
+from .sequences import allocate_document_numbers, next_document_number
+from .serializers import ProductSerializer
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='clerk', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        # Warm the cached token
+        self.assertEqual(self.client.get('/api/task-summary/').status_code, 200)
+
+    def test_deactivated_user_is_rejected_at_once(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/task-summary/').status_code, 401)
+
+    def test_deleted_user_is_rejected_at_once(self):
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/task-summary/').status_code, 401)
+
+    def test_deleted_token_is_rejected_at_once(self):
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/task-summary/').status_code, 401)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_not_used(self):
+        self.assertEqual(self.client.get('/api/task-summary/').status_code, 200)
+        # A change whose invalidation only reached another worker's memory
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/task-summary/').status_code, 401)
+
+
+class RolePermissionCacheTests(TestCase):
+    def setUp(self):
+        department = Department.objects.create(code='OPS', department_name='Operations')
+        self.role = Role.objects.create(department=department, role='Clerk', permissions={'attendanceReports': {'view': True}})
+        user = User.objects.create_user(username='clerk')
+        Profile.objects.create(user=user, role=self.role)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_revoked_permission_is_denied_on_the_next_request(self):
+        self.assertEqual(self.client.get('/api/dashboard/attendance/organization/').status_code, 200)
+        # The process-local copies another worker would still hold
+        other_worker = dict(role_permissions._local_cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.permissions = {'attendanceReports': {'view': False}}
+            self.role.save()
+        role_permissions._local_cache.update(other_worker)
+        self.assertEqual(self.client.get('/api/dashboard/attendance/organization/').status_code, 403)
+
+
+class ListingFieldSelectionTests(TestCase):
+    def test_every_declared_field_can_be_selected(self):
+        from finance.serializers import CreditNoteSerializer, DebitNoteSerializer
+        from purchase.serializers import PurchaseOrderSerializer, StockReceiptSerializer
+        from .serializers import CustomerSerializer, ProductSerializer, SupplierSerializer, TaskSerializer
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='viewer'))
+        for url, serializer_class in [
+            ('/api/products/', ProductSerializer),
+            ('/api/suppliers/', SupplierSerializer),
+            ('/api/tasks/', TaskSerializer),
+            ('/api/customers/', CustomerSerializer),
+            ('/credit-notes/', CreditNoteSerializer),
+            ('/debit-notes/', DebitNoteSerializer),
+            ('/purchase-orders/', PurchaseOrderSerializer),
+            ('/stock-receipts/', StockReceiptSerializer),
+        ]:
+            for name in serializer_class().fields:
+                with self.subTest(url=url, field=name):
+                    self.assertEqual(client.get(url, {'fields': name}).status_code, 200)
+
+
+class ProductImportTests(TestCase):
+    def run_import(self, text):
+        return import_products([pd.read_csv(io.StringIO(text), dtype=str)])
+
+    def test_reimport_only_updates_columns_in_the_file(self):
+        Product.objects.create(
+            product_id='P-1', name='Widget', product_type='Goods', status='Active', product_usage='Sale',
+            unit_price=10, quantity=7, stock_level=20, reorder_level=5, custom_color='Red', is_custom_color=True,
+        )
+        report = self.run_import(
+            'product_id,name,product_type,category,status,stock_level,unit_price,quantity\n'
+            'P-1,Widget,Goods,Tools,Active,30,12.50,999\n'
+        )
+        self.assertEqual(report['valid_rows'], 1)
+        product = Product.objects.get(product_id='P-1')
+        self.assertEqual((product.stock_level, product.unit_price), (30, 12.5))
+        # quantity belongs to the stock ledger; reorder_level and colour were not in the file
+        self.assertEqual((product.quantity, product.reorder_level, product.custom_color), (7, 5, 'Red'))
+
+    def test_fractional_integer_fields_are_rejected(self):
+        report = self.run_import(
+            'product_id,name,product_type,category,status,stock_level,unit_price\n'
+            'P-2,Bolt,Goods,Tools,Active,2.5,1\n'
+        )
+        self.assertEqual(report['invalid_rows'], 1)
+        self.assertEqual(report['errors'][0]['errors'], ['stock_level must be a whole number'])
+        self.assertFalse(Product.objects.filter(product_id='P-2').exists())
+
+
+class ProductQuantityTests(TestCase):
+    def test_plain_saves_leave_the_ledger_quantity_alone(self):
+        product = Product.objects.create(
+            product_id='P-3', name='Gear', product_type='Goods', status='Active', product_usage='Sale',
+            unit_price=5, quantity=4, stock_level=10,
+        )
+        # a stock posting lands while another request holds a loaded copy
+        Product.objects.filter(pk=product.pk).update(quantity=F('quantity') + 6)
+        product.name = 'Gear v2'
+        product.quantity = 0
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.quantity), ('Gear v2', 10))
+
+    def test_quantity_is_read_only_in_the_api(self):
+        self.assertTrue(ProductSerializer().fields['quantity'].read_only)
+
+
+class AttendanceImportTests(TestCase):
+    def test_earlier_imported_punch_retypes_the_recorded_ones(self):
+        user = User.objects.create_user(username='guard')
+        Profile.objects.create(user=user, employee_id='E-7')
+        day = date(2025, 3, 3)
+        # checked in through the API at 09:00, then the terminal export brings an 08:55 tap
+        record_punch(user, day, is_check_in=True, now=timezone.make_aware(datetime(2025, 3, 3, 9, 0)))
+        report = import_punches([{'employee_id': 'E-7', 'timestamp': '2025-03-03T08:55:00'}])
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(
+            list(AttendancePunch.objects.order_by('ts').values_list('ts__time', 'punch_type')),
+            [(time(8, 55), 'in'), (time(9, 0), 'out')],
+        )
+        self.assertEqual(Attendance.objects.get(user=user, date=day).total_hours, Decimal('0.08'))
+        # the day is closed, so the next tap is a check-in again
+        record_punch(user, day, is_check_in=True, now=timezone.make_aware(datetime(2025, 3, 3, 13, 0)))
+
+
+class DocumentSequenceTests(TestCase):
+    def create_product(self, product_id):
+        return Product.objects.create(
+            product_id=product_id, name='Nut', product_type='Goods', status='Active', product_usage='Sale', unit_price=1,
+        )
+
+    def test_allocated_numbers_are_unique_and_consecutive(self):
+        numbers = allocate_document_numbers('customer', 3) + [next_document_number('customer') for _ in range(3)]
+        self.assertEqual(numbers, [f'CUS{value:04d}' for value in range(1, 7)])
+
+    def test_reservation_is_a_single_statement_once_the_counter_exists(self):
+        next_document_number('customer')
+        with CaptureQueriesContext(connection) as context:
+            next_document_number('customer')
+        expected = 1 if sequences._update_returning() else 2
+        self.assertEqual(len([query for query in context if 'SAVEPOINT' not in query['sql']]), expected)
+
+    def test_fresh_counter_continues_after_existing_rows(self):
+        last = max(self.create_product(f'OLD-{i}').pk for i in range(3))
+        self.assertEqual(next_document_number('product'), f'CVB{last + 1:03d}')
+        self.assertEqual(DocumentSequence.objects.get(series='product', scope='').last_value, last + 1)
+
+    @override_settings(DOCUMENT_NUMBER_FORMATS={'invoice': 'INV/{branch}/{fiscal_year}/{number:03d}'})
+    def test_branches_and_fiscal_years_count_separately(self):
+        march, april = date(2025, 3, 31), date(2025, 4, 1)
+        self.assertEqual(
+            [
+                next_document_number('invoice', branch='North', on=march),
+                next_document_number('invoice', branch='North', on=march),
+                next_document_number('invoice', branch='South', on=march),
+                next_document_number('invoice', branch='North', on=april),
+            ],
+            ['INV/North/2024-25/001', 'INV/North/2024-25/002', 'INV/South/2024-25/001', 'INV/North/2025-26/001'],
+        )
+        self.assertEqual(
+            set(DocumentSequence.objects.values_list('scope', 'last_value')),
+            {('North/2024-25', 2), ('South/2024-25', 1), ('North/2025-26', 1)},
+        )
+
+
+class AsyncViewPermissionTests(TestCase):
+    def test_async_variants_share_the_permission_category_of_their_sync_view(self):
+        # RoleBasedPermission maps views by class name, so an unmapped async variant
+        # would deny every non-superuser once the project runs under ASGI
+        import crm.views, finance.views, purchase.views, core.views  # noqa: F401 - register the subclasses
+        pending, checked = list(AsyncAPIView.__subclasses__()), []
+        while pending:
+            view = pending.pop()
+            pending.extend(view.__subclasses__())
+            if RoleBasedPermission in view.permission_classes:
+                sync_name = view.__name__[len('Async'):]
+                self.assertIsNotNone(VIEW_CATEGORIES.get(sync_name), sync_name)
+                self.assertEqual(VIEW_CATEGORIES.get(view.__name__), VIEW_CATEGORIES[sync_name], view.__name__)
+                checked.append(view)
+        self.assertTrue(checked)
@@ -0,0 +1,46 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, Round
+
+CENT = Decimal('0.01')
+# Percentages are applied as a multiplication so the database never does integer division
+PERCENT = Decimal('0.01')
+
+
+def amount(value):
+    return Decimal(str(value or 0)).quantize(CENT, ROUND_HALF_UP)
+
+
+def line_tax(tax, total):
+    # Tax carried by one line, rounded per line so the running total never drifts
+    return (amount(tax) * amount(total) / 100).quantize(CENT, ROUND_HALF_UP)
+
+
+def line_sums(prefix=''):
+    # Database-side equivalents of summing total and line_tax() over a set of lines
+    return {
+        'line_total': Coalesce(Sum(f'{prefix}total'), Decimal('0')),
+        'line_tax': Coalesce(Sum(Round(F(f'{prefix}tax') * F(f'{prefix}total') * PERCENT, 2)), Decimal('0')),
+    }
+
+
+def stored_line(instance, parent_field, *fields):
+    # The line as it is in the database before this save/delete, or None for a new line
+    if instance.pk is None:
+        return None
+    return type(instance)._default_manager.filter(pk=instance.pk).values_list(f'{parent_field}_id', *fields).first()
+
+
+def line_deltas(previous, current):
+    # previous/current are (parent_id, total, tax) rows, None when the line does not
+    # exist on that side; returns {parent_id: [total_delta, tax_delta]}
+    deltas = {}
+    for row, sign in ((previous, -1), (current, 1)):
+        if row is None or row[0] is None:
+            continue
+        parent_id, total, tax = row
+        delta = deltas.setdefault(parent_id, [Decimal('0'), Decimal('0')])
+        delta[0] += sign * amount(total)
+        delta[1] += sign * line_tax(tax, total)
+    return {parent_id: delta for parent_id, delta in deltas.items() if any(delta)}
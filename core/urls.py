@@ -1,11 +1,13 @@
 from django.urls import path
 from . import views
+from .async_views import run_mode_view
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.LoginView.as_view(), name='login'),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('departments/', views.DepartmentListView.as_view(), name='department-list'),
     path('departments/<int:pk>/', views.DepartmentDetailView.as_view(), name='department-detail'),
@@ -17,6 +19,7 @@ urlpatterns = [
     path('branches/<int:pk>/', views.BranchDetailView.as_view(), name='branch-detail'),
     path('products/', views.ProductListView.as_view(), name='product-list'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('products/<int:pk>/stock/', views.ProductStockView.as_view(), name='product-stock'),
     path('products/import/', views.ProductImportView.as_view(), name='product-import'),
     path('categories/', views.CategoryListView.as_view(), name='category-list'),
     path('categories/<int:pk>/', views.CategoryDetailView.as_view(), name='category-detail'),
@@ -36,13 +39,15 @@ urlpatterns = [
     path('onboarding/<int:pk>/', views.OnboardingDetailView.as_view(), name='onboarding-detail'),
     path('attendance/', views.AttendanceView.as_view(), name='attendance'),
     path('attendance/check-in-out/', views.CheckInOutView.as_view(), name='check-in-out'),
+    path('attendance/import/', views.AttendanceImportView.as_view(), name='attendance-import'),
     path('attendance/holidays/', views.GovernmentHolidayView.as_view(), name='holidays'),
     path('tasks/', views.TaskListView.as_view(), name='task-list'),
     path('tasks/<int:pk>/', views.TaskDetailView.as_view(), name='task-detail'),
-    path('task-summary/', views.TaskSummaryView.as_view(), name='task-summary'),
+    path('task-summary/', run_mode_view(views.TaskSummaryView, views.AsyncTaskSummaryView), name='task-summary'),
     path('user-list/',views.UserListView.as_view(), name = 'user-list'),
-    path('dashboard/tasks/', views.DashboardTaskView.as_view(), name='dashboard-tasks'),
-    path('dashboard/attendance/', views.DashboardAttendanceView.as_view(), name='dashboard-attendance'),
+    path('dashboard/tasks/', run_mode_view(views.DashboardTaskView, views.AsyncDashboardTaskView), name='dashboard-tasks'),
+    path('dashboard/attendance/', run_mode_view(views.DashboardAttendanceView, views.AsyncDashboardAttendanceView), name='dashboard-attendance'),
+    path('dashboard/attendance/organization/', run_mode_view(views.OrganizationAttendanceView, views.AsyncOrganizationAttendanceView), name='organization-attendance'),
     path('forgot-password/', views.ForgotPasswordView.as_view(), name='forgot-password'),
     path('reset-password/<str:token>/', views.ResetPasswordView.as_view(), name='reset-password'),
     path('customers/', views.CustomerListView.as_view(), name='customer_list'),
@@ -50,6 +55,9 @@ urlpatterns = [
     path('customers/summary/', views.CustomerSummaryView.as_view(), name='customer_summary'),
     path('customers/duplicates/', views.CustomerDuplicatesView.as_view(), name='customer_duplicates'),
     path('customers/merge/', views.CustomerMergeView.as_view(), name='customer_merge'),
+    path('emails/<int:pk>/', views.OutboundEmailStatusView.as_view(), name='outbound_email_status'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('search/<str:kind>/', views.SearchView.as_view(), name='search_kind'),
    
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
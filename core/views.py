@@ -11,6 +11,8 @@ from .serializers import (
 )
 from .models import Department, Role, User, Branch
 from .permissions import RoleBasedPermission  # Import the custom permission
+from .authentication import invalidate_auth_cache
+from .outbox import queue_email
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.crypto import get_random_string
@@ -79,6 +81,14 @@ class LoginView(APIView):
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        invalidate_auth_cache(request.user.id)
+        Token.objects.filter(user=request.user).delete()
+        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
 class ForgotPasswordView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -98,7 +108,7 @@ class ForgotPasswordView(APIView):
                 subject = 'Password Reset Request'
                 message = f'Click the link to reset your password: {reset_link}'
                 from_email = settings.EMAIL_HOST_USER
-                send_mail(subject, message, from_email, [email], fail_silently=False)
+                queue_email(subject, message, [email], from_email=from_email)
 
                 return Response({'redirect': '/check-email', 'email': email}, status=status.HTTP_200_OK)
             except (User.DoesNotExist, Profile.DoesNotExist):
@@ -373,6 +383,7 @@ class ProfileView(APIView):
                     password_serializer = ProfileChangePasswordSerializer(data=password_data)
                     if password_serializer.is_valid():
                         password_serializer.update(request.user, password_serializer.validated_data)
+                        invalidate_auth_cache(request.user.id)
                     else:
                         return Response(password_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -438,18 +449,8 @@ class ManageUsersView(APIView):
             Your Admin Team
             """
             from_email = settings.DEFAULT_FROM_EMAIL
-            try:
-                send_mail(
-                    subject,
-                    message,
-                    from_email,
-                    [user.email],
-                    fail_silently=False,
-                )
-                logger.info(f"Email sent to {user.email}")
-            except Exception as e:
-                logger.error(f"Failed to send email to {user.email}: {str(e)}")
-                return Response({'error': 'User created but email failed to send'}, status=status.HTTP_201_CREATED)
+            queue_email(subject, message, [user.email], from_email=from_email, user=request.user)
+            logger.info(f"Credentials email queued for {user.email}")
 
             return Response(ManageUserSerializer(user).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -493,9 +494,24 @@ from rest_framework import status, permissions
 from .models import Product, Category, TaxCode, UOM, Warehouse, Size, Color, Supplier
 from .serializers import ProductSerializer, CategorySerializer, TaxCodeSerializer, UOMSerializer, WarehouseSerializer, SizeSerializer, ColorSerializer, SupplierSerializer
 from django.core.paginator import Paginator
+from django.db.models import ProtectedError
 import pandas as pd
 from django.core.files.storage import default_storage
 from .permissions import RoleBasedPermission  # Assuming this exists
+from .product_import import REQUIRED_FIELDS, import_products, read_frames
+from .stock import stock_levels
+from .listing import ListQuery
+from .search import search_filter
+import itertools
+
+PRODUCT_LISTING = ListQuery(
+    filters={
+        'q': search_filter('product'), 'status': 'status', 'product_type': 'product_type',
+        'category': 'category_id', 'supplier': 'supplier_id', 'warehouse': 'warehouse_id',
+    },
+    sorts=('id', 'name', 'unit_price', 'stock_level'),
+    descending=False,
+)
 
 class ProductListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -503,15 +519,14 @@ class ProductListView(APIView):
     def get(self, request):
         page = int(request.query_params.get('page', 1))
         per_page = int(request.query_params.get('per_page', 10))
-        products = Product.objects.all()
-        paginator = Paginator(products, per_page)
+        listing = PRODUCT_LISTING.apply(Product.objects.all(), request, ProductSerializer)
+        paginator = Paginator(listing.queryset, per_page)
         page_obj = paginator.get_page(page)
-        serializer = ProductSerializer(page_obj, many=True)
         return Response({
-            'products': serializer.data,
+            'products': listing.serialize(page_obj),
             'total_pages': paginator.num_pages,
             'current_page': page,
-            'total_entries': products.count(),
+            'total_entries': paginator.count,
         }, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -557,6 +572,22 @@ class ProductDetailView(APIView):
         except Product.DoesNotExist:
             return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class ProductStockView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        if not Product.objects.filter(pk=pk).exists():
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        warehouse = request.query_params.get('warehouse')
+        if warehouse is not None and not warehouse.isdigit():
+            return Response({'error': 'warehouse must be a warehouse id'}, status=status.HTTP_400_BAD_REQUEST)
+        levels = stock_levels(pk, warehouse)
+        return Response({
+            'product': pk,
+            'on_hand': sum(level['on_hand'] for level in levels),
+            'warehouses': levels,
+        }, status=status.HTTP_200_OK)
+
 class ProductImportView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -567,46 +598,17 @@ class ProductImportView(APIView):
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        df = pd.read_excel(file) if file.name.endswith('.xlsx') else pd.read_csv(file)
-        required_fields = ['product_id', 'name', 'product_type', 'category', 'status', 'stock_level', 'unit_price']
-        missing_fields = [field for field in required_fields if field not in df.columns]
+        frames = read_frames(file)
+        try:
+            first = next(frames)
+        except (StopIteration, ValueError, pd.errors.ParserError):
+            return Response({'error': 'Could not read the uploaded file'}, status=status.HTTP_400_BAD_REQUEST)
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in first.columns]
         if missing_fields:
             return Response({'error': f'Missing required fields: {missing_fields}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        valid_rows = []
-        invalid_rows = []
-        skipped_rows = []
-
-        seen_product_ids = set()
-        seen_product_names = set()
-
-        for index, row in df.iterrows():
-            if not all(row[field] for field in required_fields):
-                invalid_rows.append(index)
-                continue
-
-            product_id = str(row['product_id'])
-            product_name = str(row['name'])
-            if product_id in seen_product_ids or product_name in seen_product_names:
-                skipped_rows.append(index)
-                continue
-
-            seen_product_ids.add(product_id)
-            seen_product_names.add(product_name)
-            valid_rows.append(row.to_dict())
-
-        for row in valid_rows:
-            serializer = ProductSerializer(data=row)
-            if serializer.is_valid():
-                serializer.save()
-            else:
-                invalid_rows.append(row)
-
-        return Response({
-            'valid_rows': len(valid_rows),
-            'invalid_rows': len(invalid_rows),
-            'skipped_rows': len(skipped_rows)
-        }, status=status.HTTP_201_CREATED)
+        report = import_products(itertools.chain([first], frames))
+        return Response(report, status=status.HTTP_201_CREATED)
 
 class CategoryListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -845,6 +847,8 @@ class WarehouseDetailView(APIView):
             warehouse = Warehouse.objects.get(pk=pk)
             warehouse.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
+        except ProtectedError:
+            return Response({'error': 'Warehouse has stock movements and cannot be deleted'}, status=status.HTTP_400_BAD_REQUEST)
         except Warehouse.DoesNotExist:
             return Response({'error': 'Warehouse not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -968,21 +972,26 @@ class ColorDetailView(APIView):
         except Color.DoesNotExist:
             return Response({'error': 'Color not found'}, status=status.HTTP_404_NOT_FOUND)
 
+SUPPLIER_LISTING = ListQuery(
+    filters={'q': search_filter('supplier')},
+    sorts=('id', 'name'),
+    descending=False,
+)
+
 class SupplierListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         page = int(request.query_params.get('page', 1))
         per_page = int(request.query_params.get('per_page', 10))
-        suppliers = Supplier.objects.all()
-        paginator = Paginator(suppliers, per_page)
+        listing = SUPPLIER_LISTING.apply(Supplier.objects.all(), request, SupplierSerializer)
+        paginator = Paginator(listing.queryset, per_page)
         page_obj = paginator.get_page(page)
-        serializer = SupplierSerializer(page_obj, many=True)
         return Response({
-            'suppliers': serializer.data,
+            'suppliers': listing.serialize(page_obj),
             'total_pages': paginator.num_pages,
             'current_page': page,
-            'total_entries': suppliers.count(),
+            'total_entries': paginator.count,
         }, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -1198,16 +1207,21 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import permissions
 from django.utils import timezone
-from .models import Attendance, GovernmentHoliday
+from .models import Attendance, AttendancePunch, GovernmentHoliday
 from .serializers import AttendanceSerializer, CheckInOutSerializer, GovernmentHolidaySerializer
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from .attendance import PunchError, record_punch
+from .attendance_import import REQUIRED_FIELDS as PUNCH_FIELDS, import_punches, read_csv
 
 class AttendanceView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         user = request.user
-        attendance_data = Attendance.objects.filter(user=user).order_by('date')
+        attendance_data = Attendance.objects.filter(user=user).prefetch_related(
+            Prefetch('punches', queryset=AttendancePunch.objects.order_by('ts', 'id'))
+        ).order_by('date')
         serializer = AttendanceSerializer(attendance_data, many=True)
         return Response(serializer.data)
 
@@ -1228,41 +1242,40 @@ class CheckInOutView(APIView):
             if date > current_date:
                 return Response({"error": "Cannot check-in/out for future dates"}, status=status.HTTP_400_BAD_REQUEST)
 
-            attendance, created = Attendance.objects.get_or_create(
-                user=user,
-                date=date,
-                defaults={'check_in_times': [], 'total_hours': 0.0}
-            )
-
-            check_in_times = attendance.check_in_times
-            now = timezone.now().isoformat()
-
-            if is_check_in:
-                if len(check_in_times) % 2 == 0:  # Even: Allow check-in
-                    check_in_times.append(now)
-                else:
-                    return Response({"error": "Already checked in. Check out first."}, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                if len(check_in_times) % 2 == 1:  # Odd: Allow check-out
-                    check_in_times.append(now)
-                else:
-                    return Response({"error": "Not checked in yet."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Calculate total hours
-            total_hours = 0.0
-            times = [timezone.datetime.fromisoformat(t) for t in check_in_times]
-            for i in range(0, len(times) - 1, 2):
-                if i + 1 < len(times):
-                    total_hours += (times[i + 1] - times[i]).total_seconds() / 3600
-
-            attendance.check_in_times = check_in_times
-            attendance.total_hours = round(total_hours, 2)
-            attendance.save()
+            try:
+                attendance = record_punch(user, date, is_check_in)
+            except PunchError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             serializer = AttendanceSerializer(attendance)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class AttendanceImportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, RoleBasedPermission]
+
+    def post(self, request):
+        # Either a CSV upload or a JSON list of {"employee_id", "timestamp"} punches
+        file = request.FILES.get('file')
+        if file:
+            rows = read_csv(file)
+            try:
+                missing_fields = [field for field in PUNCH_FIELDS if field not in (rows.fieldnames or [])]
+            except UnicodeDecodeError:
+                return Response({'error': 'Could not read the uploaded file'}, status=status.HTTP_400_BAD_REQUEST)
+            if missing_fields:
+                return Response({'error': f'Missing required fields: {missing_fields}'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('punches') if isinstance(request.data, dict) else request.data
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return Response({'error': 'Provide a CSV file or a list of punches'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_punches(rows)
+        except UnicodeDecodeError:
+            return Response({'error': 'Could not read the uploaded file'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
+
 class GovernmentHolidayView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -1280,6 +1293,14 @@ from django.core.paginator import Paginator
 from .models import Task
 from .serializers import TaskSerializer, UserSerializer
 from django.contrib.auth.models import User
+from .async_views import AsyncAPIView
+from .dashboard import atask_summary, task_summary
+
+TASK_LISTING = ListQuery(
+    filters={'status': 'status', 'priority': 'priority', 'due_from': 'due_date__gte', 'due_to': 'due_date__lte'},
+    sorts=('due_date', 'created_at', 'start_date'),
+    descending=False,
+)
 
 class TaskListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1287,15 +1308,14 @@ class TaskListView(APIView):
     def get(self, request):
         page = int(request.query_params.get('page', 1))
         per_page = int(request.query_params.get('per_page', 10))
-        tasks = Task.objects.filter(assigned_to=request.user).order_by('due_date')
-        paginator = Paginator(tasks, per_page)
+        listing = TASK_LISTING.apply(Task.objects.filter(assigned_to=request.user), request, TaskSerializer)
+        paginator = Paginator(listing.queryset, per_page)
         page_obj = paginator.get_page(page)
-        serializer = TaskSerializer(page_obj, many=True)
         return Response({
-            'tasks': serializer.data,
+            'tasks': listing.serialize(page_obj),
             'total_pages': paginator.num_pages,
             'current_page': page,
-            'total_entries': tasks.count(),
+            'total_entries': paginator.count,
         }, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -1339,14 +1359,13 @@ class TaskSummaryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        tasks = Task.objects.filter(assigned_to=request.user)
-        summary = {
-            'not_started': tasks.filter(status='Not Started').count(),
-            'in_progress': tasks.filter(status='In Progress').count(),
-            'completed': tasks.filter(status='Completed').count(),
-            'awaiting_feedback': tasks.filter(status='Awaiting Feedback').count(),
-        }
-        return Response(summary, status=status.HTTP_200_OK)
+        return Response(task_summary(request.user.id), status=status.HTTP_200_OK)
+
+class AsyncTaskSummaryView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        return Response(await atask_summary(request.user.id), status=status.HTTP_200_OK)
 
 class UserListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1363,72 +1382,128 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import TaskDataSerializer, DashboardAttendanceSerializer, TaskSerializer, AttendanceSerializer
-from .models import Task, Attendance
-from django.db.models import Count, Q
+from .models import Task, Attendance, AttendanceMonth, DepartmentAttendanceMonth
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
-from django.db.models.functions import ExtractMonth
+from .dashboard import task_summary
+
+DASHBOARD_TASK_LIMIT = 10
+MAX_DASHBOARD_TASK_LIMIT = 50
 
 class DashboardTaskView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Fetch all tasks for the authenticated user
-        tasks = Task.objects.filter(assigned_to=request.user).order_by('id')
-        
-        # Aggregate task summary
-        task_summary = {
-            'not_started': tasks.filter(status='Not Started').count(),
-            'in_progress': tasks.filter(status='In Progress').count(),
-            'completed': tasks.filter(status='Completed').count(),
-            'awaiting_feedback': tasks.filter(status='Awaiting Feedback').count(),
-        }
+        # Only the most recent tasks are sent; the full history is paged through TaskListView
+        try:
+            limit = min(max(int(request.query_params.get('limit', DASHBOARD_TASK_LIMIT)), 1), MAX_DASHBOARD_TASK_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        tasks = Task.objects.filter(assigned_to=request.user).select_related('assigned_to').order_by('-id')[:limit]
+        summary = task_summary(request.user.id)
 
         # Prepare task data
         task_data = {
-            'taskData': TaskSerializer(tasks, many=True).data,
-            'taskSummary': task_summary,
+            'taskData': tasks,
+            'taskSummary': summary,
+            'totalTasks': sum(summary.values()),
         }
 
         serializer = TaskDataSerializer(task_data)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+class AsyncDashboardTaskView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', DASHBOARD_TASK_LIMIT)), 1), MAX_DASHBOARD_TASK_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        tasks = [
+            task async for task in
+            Task.objects.filter(assigned_to=request.user).select_related('assigned_to').order_by('-id')[:limit]
+        ]
+        summary = await atask_summary(request.user.id)
+        serializer = TaskDataSerializer({'taskData': tasks, 'taskSummary': summary, 'totalTasks': sum(summary.values())})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def month_breakdown(rows):
+    # rows: (month, present, absent) from the monthly rollups; months without a row are zero
+    by_month = {month: (present, absent) for month, present, absent in rows}
+    return [
+        {'month': name, 'present': by_month.get(month, (0, 0))[0], 'absent': by_month.get(month, (0, 0))[1]}
+        for month, name in enumerate(MONTH_NAMES, start=1)
+    ]
+
+
+def requested_year(request):
+    year = request.query_params.get('year')
+    return int(year) if year and year.isdigit() else timezone.now().year
+
+
 class DashboardAttendanceView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Aggregate attendance data by month for the authenticated user
-        today = timezone.now()
-        attendance_data = Attendance.objects.filter(user=request.user, date__year=today.year).values('date').annotate(
-            month=ExtractMonth('date')
-        ).values(
-            'month'
-        ).annotate(
-            present=Count('id', filter=Q(total_hours__gt=0)),  # Present if hours worked
-            absent=Count('id', filter=Q(total_hours=0))  # Absent if no hours
-        ).order_by('month')
-
-        # Map month numbers to names and format data
-        month_names = {
-            1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-            7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
-        }
-        date_data = [
-            {
-                'month': month_names.get(row['month'], 'Unknown'),
-                'present': row['present'],
-                'absent': row['absent']
-            } for row in attendance_data
+        # Twelve precomputed rows per user and year, kept current by CheckInOutView
+        rows = AttendanceMonth.objects.filter(user=request.user, year=requested_year(request)).values_list(
+            'month', 'present_days', 'absent_days'
+        )
+        serializer = DashboardAttendanceSerializer({'dateData': month_breakdown(rows)})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AsyncDashboardAttendanceView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        rows = [
+            row async for row in AttendanceMonth.objects.filter(user=request.user, year=requested_year(request))
+            .values_list('month', 'present_days', 'absent_days')
         ]
+        serializer = DashboardAttendanceSerializer({'dateData': month_breakdown(rows)})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
-        # Fill in missing months with 0s
-        for month in range(1, 13):
-            month_name = month_names[month]
-            if not any(d['month'] == month_name for d in date_data):
-                date_data.append({'month': month_name, 'present': 0, 'absent': 0})
+def organization_months(request):
+    # (monthly totals queryset, None), or (None, error) when a branch/department filter is not an id
+    months = DepartmentAttendanceMonth.objects.filter(year=requested_year(request))
+    for field in ('branch', 'department'):
+        value = request.query_params.get(field)
+        if value:
+            if not value.isdigit():
+                return None, f'{field} must be an id'
+            months = months.filter(**{f'{field}_id': value})
+    return months.values('month').annotate(present=Sum('present_days'), absent=Sum('absent_days')).order_by(), None
 
-        date_data.sort(key=lambda x: list(month_names.values()).index(x['month']))
 
-        serializer = DashboardAttendanceSerializer({'dateData': date_data})
+class OrganizationAttendanceView(APIView):
+    permission_classes = [permissions.IsAuthenticated, RoleBasedPermission]
+
+    def get(self, request):
+        rows, error = organization_months(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = DashboardAttendanceSerializer({
+            'dateData': month_breakdown((row['month'], row['present'], row['absent']) for row in rows)
+        })
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class AsyncOrganizationAttendanceView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, RoleBasedPermission]
+
+    async def get(self, request):
+        rows, error = organization_months(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = DashboardAttendanceSerializer({
+            'dateData': month_breakdown([(row['month'], row['present'], row['absent']) async for row in rows])
+        })
         return Response(serializer.data, status=status.HTTP_200_OK)
     
 # views.py
@@ -1438,24 +1513,33 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.core.paginator import Paginator
 from django.db.models import Count
-from .models import Customer, Candidate
+from .models import Customer, Candidate, CustomerCluster
+from .merge import CustomerMergeError, merge_customers
 from .serializers import CustomerSerializer
 
+CUSTOMER_LISTING = ListQuery(
+    filters={
+        'q': search_filter('customer'), 'status': 'status', 'customer_type': 'customer_type',
+        'sales_rep': 'assigned_sales_rep_id',
+    },
+    sorts=('last_edit_date', 'first_name', 'customer_id'),
+    descending=False,
+)
+
 class CustomerListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         page = int(request.query_params.get('page', 1))
         per_page = int(request.query_params.get('per_page', 10))
-        customers = Customer.objects.all().order_by('last_edit_date')
-        paginator = Paginator(customers, per_page)
+        listing = CUSTOMER_LISTING.apply(Customer.objects.all(), request, CustomerSerializer)
+        paginator = Paginator(listing.queryset, per_page)
         page_obj = paginator.get_page(page)
-        serializer = CustomerSerializer(page_obj, many=True)
         return Response({
-            'customers': serializer.data,
+            'customers': listing.serialize(page_obj),
             'total_pages': paginator.num_pages,
             'current_page': page,
-            'total_entries': customers.count(),
+            'total_entries': paginator.count,
         }, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -1514,70 +1598,95 @@ class CustomerDuplicatesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Identify duplicates based on first_name and last_name
-        duplicates = (
-            Customer.objects.values('first_name', 'last_name')
-            .annotate(count=Count('id'))
-            .filter(count__gt=1)
+        # Clusters are maintained as customers are saved (see core.dedupe); this only reads them
+        clusters = CustomerCluster.objects.select_related('customer').order_by(
+            'cluster', 'customer__last_edit_date', 'customer_id'
         )
+        groups = {}
+        for row in clusters:
+            groups.setdefault(row.cluster, []).append(row.customer)
 
-        duplicate_groups = []
-        for item in duplicates:
-            first_name = item['first_name']
-            last_name = item['last_name']
-            matching_customers = Customer.objects.filter(first_name=first_name, last_name=last_name)
-            if matching_customers.count() > 1:
-                primary = matching_customers.order_by('last_edit_date').first()  # Use earliest last_edit_date as primary
-                duplicates = matching_customers.exclude(id=primary.id)
-                serializer = CustomerSerializer(primary)
-                duplicates_serializer = CustomerSerializer(duplicates, many=True)
-                group = {
-                    'primary': serializer.data,
-                    'duplicates': duplicates_serializer.data
-                }
-                duplicate_groups.append(group)
-
+        # The earliest edited customer of each cluster is proposed as the primary
+        duplicate_groups = [
+            {
+                'primary': CustomerSerializer(members[0]).data,
+                'duplicates': CustomerSerializer(members[1:], many=True).data,
+            }
+            for members in groups.values()
+        ]
         return Response(duplicate_groups, status=status.HTTP_200_OK)
 
 class CustomerMergeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        primary_id = request.data.get('primary_id')
-        duplicate_ids = request.data.get('duplicate_ids', [])
-
-        if not primary_id or not duplicate_ids:
+        # Either one merge ({primary_id, duplicate_ids}) or many ({merges: [...]}) in one transaction
+        merges = request.data.get('merges')
+        if merges is None:
+            merges = [{'primary_id': request.data.get('primary_id'), 'duplicate_ids': request.data.get('duplicate_ids', [])}]
+        try:
+            groups = [(int(merge['primary_id']), [int(pk) for pk in merge['duplicate_ids']]) for merge in merges]
+        except (TypeError, ValueError, KeyError):
+            groups = []
+        if not groups or not all(duplicate_ids for _, duplicate_ids in groups):
             return Response(
                 {'error': 'Primary ID and duplicate IDs are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            primary = Customer.objects.get(id=primary_id)
-            duplicates = Customer.objects.filter(id__in=duplicate_ids)
-
-            if not duplicates.exists():
-                return Response(
-                    {'error': 'No valid duplicates provided'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Merge logic: Keep primary record, delete duplicates
-            serializer = CustomerSerializer(primary)
-            duplicates.delete()
-
-            return Response(
-                {'merged_record': serializer.data},
-                status=status.HTTP_200_OK
-            )
+            audits = merge_customers(groups, user=request.user)
+        except CustomerMergeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Customer.DoesNotExist:
             return Response(
                 {'error': 'Primary record or duplicates not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
+
+        merged = [
+            {'merged_record': CustomerSerializer(audit.primary).data, 'moved_records': audit.moved_records}
+            for audit in audits
+        ]
+        if 'merges' in request.data:
+            return Response({'merged': merged}, status=status.HTTP_200_OK)
+        return Response(merged[0], status=status.HTTP_200_OK)
+
+from .models import OutboundEmail
+from .serializers import OutboundEmailSerializer
+
+class OutboundEmailStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            email = OutboundEmail.objects.get(pk=pk)
+            if not request.user.is_superuser and email.created_by_id != request.user.id:
+                return Response({'error': 'Email not found'}, status=status.HTTP_404_NOT_FOUND)
+            serializer = OutboundEmailSerializer(email)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except OutboundEmail.DoesNotExist:
+            return Response({'error': 'Email not found'}, status=status.HTTP_404_NOT_FOUND)
+
+from .search import SEARCH_TYPES, search
+
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+class SearchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, kind=None):
+        # Typeahead over the search index: ?q=... for one type, or for all of them when no type is given
+        kinds = [kind] if kind else list(SEARCH_TYPES)
+        if any(k not in SEARCH_TYPES for k in kinds):
+            return Response({'error': f'Unknown search type {kind}'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(int(request.query_params.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        query = request.query_params.get('q', '')
+        fuzzy = request.query_params.get('fuzzy', 'true').lower() != 'false'
+        results = {k: search(k, query, limit=max(limit, 1), fuzzy=fuzzy) for k in kinds}
+        return Response(results, status=status.HTTP_200_OK)
+
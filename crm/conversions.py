@@ -0,0 +1,128 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from core.sequences import allocate_document_numbers, insert_numbered_documents
+from core.totals import amount, line_tax
+from .models import SalesOrder, SalesOrderItem, DeliveryNote, DeliveryNoteItem, Invoice, InvoiceItem, OrderSummary
+
+CONVERTIBLE_STATUSES = ['Submitted', 'Submitted(PD)']
+# Sales orders store rupees as 'IND'; invoices use the ISO code
+INVOICE_CURRENCIES = {'IND': 'INR'}
+
+
+def conversion_queryset():
+    # Two queries: the orders with their customers, then every line with its product
+    return SalesOrder.objects.select_related('customer').prefetch_related(
+        Prefetch('items', queryset=SalesOrderItem.objects.select_related('product__uom', 'product__tax_code').order_by('id'))
+    )
+
+
+def _customer_name(customer):
+    return f'{customer.first_name} {customer.last_name}'.strip()
+
+
+def _uom(item):
+    product = item.product
+    if item.uom or product is None:
+        return item.uom
+    return product.uom.name if product.uom else product.custom_uom or ''
+
+
+def _tax_rate(product):
+    if product is None or product.tax_code is None:
+        return Decimal('0')
+    return Decimal(str(product.tax_code.percentage))
+
+
+def convert_to_delivery_notes(sales_orders):
+    sales_orders = list(sales_orders)
+    today = timezone.localdate()
+    with transaction.atomic():
+        numbers = allocate_document_numbers('delivery_note', len(sales_orders))
+        delivery_notes = insert_numbered_documents(DeliveryNote, 'DN_ID', [
+            DeliveryNote(
+                DN_ID=number,
+                delivery_date=today,
+                sales_order_reference=sales_order,
+                customer_name=_customer_name(sales_order.customer),
+                delivery_type='Regular',
+                destination_address=sales_order.customer.address,
+                delivery_status='Draft',
+            )
+            for number, sales_order in zip(numbers, sales_orders)
+        ])
+        DeliveryNoteItem.objects.bulk_create([
+            DeliveryNoteItem(delivery_note=delivery_note, product=item.product, quantity=item.quantity, uom=_uom(item))
+            for delivery_note, sales_order in zip(delivery_notes, sales_orders)
+            for item in sales_order.items.all()
+        ])
+    return delivery_notes
+
+
+def _invoice_lines(invoice, sales_order):
+    lines = []
+    for item in sales_order.items.all():
+        tax = _tax_rate(item.product)
+        total = amount(item.quantity * item.unit_price * (1 - item.discount / 100) * (1 + tax / 100))
+        lines.append(InvoiceItem(
+            invoice=invoice, product=item.product, quantity=item.quantity, uom=_uom(item),
+            unit_price=item.unit_price, tax=tax, discount=item.discount, total=total,
+        ))
+    return lines
+
+
+def _summary(invoice, lines, sales_order):
+    # Same arithmetic as InvoiceItem.save and OrderSummary.save, without re-reading the
+    # invoice lines; grand_total is left for the database to round, as a save does
+    subtotal = sum((line.total for line in lines), Decimal('0'))
+    tax_summary = sum((line_tax(line.tax, line.total) for line in lines), Decimal('0'))
+    grand_total = subtotal - subtotal * sales_order.global_discount / 100 + tax_summary + sales_order.shipping_charges
+    return OrderSummary(
+        invoice=invoice, subtotal=subtotal, global_discount=sales_order.global_discount,
+        tax_summary=tax_summary, shipping_charges=sales_order.shipping_charges, rounding_adjustment=Decimal('0'),
+        credit_note_applied=Decimal('0'), amount_paid=Decimal('0'),
+        grand_total=grand_total, balance_due=grand_total,
+    )
+
+
+def convert_to_invoices(sales_orders):
+    sales_orders = list(sales_orders)
+    today = timezone.localdate()
+    with transaction.atomic():
+        numbers = allocate_document_numbers('invoice', len(sales_orders))
+        invoices = [
+            Invoice(
+                INVOICE_ID=number,
+                invoice_date=today,
+                due_date=today + timedelta(days=30),
+                sales_order_reference=sales_order,
+                customer=sales_order.customer,
+                billing_address=sales_order.customer.address,
+                shipping_address=sales_order.customer.address,
+                email_id=sales_order.customer.email,
+                phone_number=sales_order.customer.phone_number,
+                payment_terms='Net 30',
+                currency=INVOICE_CURRENCIES.get(sales_order.currency, sales_order.currency),
+            )
+            for number, sales_order in zip(numbers, sales_orders)
+        ]
+        lines = [_invoice_lines(invoice, sales_order) for invoice, sales_order in zip(invoices, sales_orders)]
+        for invoice, invoice_lines in zip(invoices, lines):
+            invoice.invoice_total = sum((line.total for line in invoice_lines), Decimal('0'))
+        insert_numbered_documents(Invoice, 'INVOICE_ID', invoices)
+        InvoiceItem.objects.bulk_create([line for invoice_lines in lines for line in invoice_lines])
+        OrderSummary.objects.bulk_create([
+            _summary(invoice, invoice_lines, sales_order)
+            for invoice, invoice_lines, sales_order in zip(invoices, lines, sales_orders)
+        ])
+    return invoices
+
+
+CONVERSIONS = {
+    'delivery_note': convert_to_delivery_notes,
+    'invoice': convert_to_invoices,
+}
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_deliverynotereturn_deliverynotereturnattachment_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deliverynote',
+            name='DN_ID',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='deliverynotereturn',
+            name='DNR_ID',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='INVOICE_ID',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='invoicereturn',
+            name='INVOICE_RETURN_ID',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_documentsequence'),
+        ('crm', '0003_alter_deliverynote_dn_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliverynote',
+            index=models.Index(fields=['delivery_date', 'id'], name='crm_dn_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverynotereturn',
+            index=models.Index(fields=['dnr_date', 'id'], name='crm_dnr_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='crm_enquiry_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['invoice_date', 'id'], name='crm_invoice_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoicereturn',
+            index=models.Index(fields=['invoice_return_date', 'id'], name='crm_invr_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='crm_quotation_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['sales_rep', 'created_at', 'id'], name='crm_so_rep_created_idx'),
+        ),
+    ]
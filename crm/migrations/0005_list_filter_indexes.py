@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_list_filter_indexes'),
+        ('crm', '0004_deliverynote_crm_dn_date_id_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliverynote',
+            index=models.Index(fields=['delivery_status', 'delivery_date', 'id'], name='crm_dn_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverynotereturn',
+            index=models.Index(fields=['status', 'dnr_date', 'id'], name='crm_dnr_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverynotereturn',
+            index=models.Index(fields=['customer', 'dnr_date', 'id'], name='crm_dnr_cust_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['invoice_status', 'invoice_date', 'id'], name='crm_invoice_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['customer', 'invoice_date', 'id'], name='crm_invoice_cust_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoicereturn',
+            index=models.Index(fields=['status', 'invoice_return_date', 'id'], name='crm_invr_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoicereturn',
+            index=models.Index(fields=['customer', 'invoice_return_date', 'id'], name='crm_invr_cust_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['user', 'status', 'created_at', 'id'], name='crm_quot_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['sales_rep', 'status', 'created_at', 'id'], name='crm_so_rep_status_idx'),
+        ),
+    ]
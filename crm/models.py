@@ -41,6 +41,11 @@ class Enquiry(models.Model):
     ])
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='crm_enquiry_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.enquiry_id} - {self.first_name} {self.last_name}"
 
@@ -83,6 +88,12 @@ class Quotation(models.Model):
     shippingCharges = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='crm_quotation_user_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at', 'id'], name='crm_quot_user_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.quotation_id} - {self.customer_name}"
 
@@ -145,7 +156,13 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from core.models import Customer, Product, Branch
+from core.sequences import next_document_number
+from core.stock import locked_status, post_document, sync_document_stock, sync_line_stock
+from core.totals import PERCENT, amount, line_deltas, line_sums, stored_line
 from purchase.models import SerialNumber
+from purchase.serial_stock import release_item_serials, sync_delivery_serials, sync_return_serials
+from django.db import transaction
+from django.db.models import F
 
 User = get_user_model()
 
@@ -177,11 +194,15 @@ class SalesOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sales_rep', 'created_at', 'id'], name='crm_so_rep_created_idx'),
+            models.Index(fields=['sales_rep', 'status', 'created_at', 'id'], name='crm_so_rep_status_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.sales_order_id:
-            last_order = SalesOrder.objects.order_by('id').last()
-            new_num = last_order.id + 1 if last_order else 1
-            self.sales_order_id = f'SO{new_num:04d}'
+            self.sales_order_id = next_document_number('sales_order')
         super().save(*args, **kwargs)
 
 class SalesOrderItem(models.Model):
@@ -212,9 +233,7 @@ class SalesOrderHistory(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 def generate_dn_id():
-    last_dn = DeliveryNote.objects.order_by('-id').first()
-    new_id = f'DN-{str(last_dn.id + 1).zfill(4) if last_dn else "0001"}' if last_dn else "DN-0001"
-    return new_id
+    return next_document_number('delivery_note')
 
 class DeliveryNoteAttachment(models.Model):
     delivery_note = models.ForeignKey('DeliveryNote', on_delete=models.CASCADE, related_name='attachments')
@@ -227,7 +246,7 @@ class DeliveryNoteRemark(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 class DeliveryNote(models.Model):
-    DN_ID = models.CharField(max_length=20, unique=True, editable=False, default=generate_dn_id)
+    DN_ID = models.CharField(max_length=20, unique=True, editable=False)
     delivery_date = models.DateField(default=timezone.now)
     sales_order_reference = models.ForeignKey(SalesOrder, on_delete=models.SET_NULL, null=True, blank=True)
     customer_name = models.CharField(max_length=100, blank=True)
@@ -236,6 +255,36 @@ class DeliveryNote(models.Model):
     delivery_status = models.CharField(max_length=20, choices=[('Draft', 'Draft'), ('Partially Delivered', 'Partially Delivered'), ('Delivered', 'Delivered'), ('Returned', 'Returned'), ('Cancelled', 'Cancelled')], default='Draft')
     partially_delivered = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['delivery_date', 'id'], name='crm_dn_date_id_idx'),
+            models.Index(fields=['delivery_status', 'delivery_date', 'id'], name='crm_dn_status_date_idx'),
+        ]
+
+    # Delivered quantities have left stock while the note is in one of these statuses;
+    # goods coming back are posted by the DeliveryNoteReturn, not by the 'Returned' status
+    STOCK_POSTED_STATUSES = ('Partially Delivered', 'Delivered', 'Returned')
+
+    def save(self, *args, **kwargs):
+        if not self.DN_ID:
+            self.DN_ID = generate_dn_id()
+        with transaction.atomic():
+            previous_status = locked_status(self, 'delivery_status')
+            super().save(*args, **kwargs)
+            sync_document_stock(self, 'delivery_note', previous_status, self.delivery_status)
+            if previous_status is not None and previous_status != self.delivery_status:
+                sync_delivery_serials(self.pk, self.delivery_status, self.STOCK_POSTED_STATUSES)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            post_document('delivery_note', self.pk, [])
+            sync_delivery_serials(self.pk, None, self.STOCK_POSTED_STATUSES)
+            return super().delete(*args, **kwargs)
+
+    def stock_lines(self):
+        lines = self.items.values_list('product_id', 'product__warehouse_id', 'quantity')
+        return [(product_id, warehouse_id, -quantity) for product_id, warehouse_id, quantity in lines]
+
 class DeliveryNoteItem(models.Model):
     delivery_note = models.ForeignKey(DeliveryNote, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
@@ -246,9 +295,17 @@ class DeliveryNoteItem(models.Model):
 
     def save(self, *args, **kwargs):
         if self.product:
-            self.product_id = self.product.product_id
-            self.uom = self.product.uom
-        super().save(*args, **kwargs)
+            self.uom = self.product.uom or ''
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sync_line_stock(self.delivery_note, 'delivery_note', 'delivery_status')
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            release_item_serials(self.pk)
+            result = super().delete(*args, **kwargs)
+            sync_line_stock(self.delivery_note, 'delivery_note', 'delivery_status')
+            return result
 
 class DeliveryNoteCustomerAcknowledgement(models.Model):
     delivery_note = models.OneToOneField(DeliveryNote, on_delete=models.CASCADE, related_name='acknowledgement')
@@ -258,9 +315,7 @@ class DeliveryNoteCustomerAcknowledgement(models.Model):
 
 # New Invoice models
 def generate_invoice_id():
-    last_invoice = Invoice.objects.order_by('-id').first()
-    new_id = f'INV-{str(last_invoice.id + 1).zfill(4) if last_invoice else "0001"}' if last_invoice else "INV-0001"
-    return new_id
+    return next_document_number('invoice')
 
 class InvoiceAttachment(models.Model):
     invoice = models.ForeignKey('Invoice', on_delete=models.CASCADE, related_name='attachments')
@@ -273,7 +328,7 @@ class InvoiceRemark(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 class Invoice(models.Model):
-    INVOICE_ID = models.CharField(max_length=20, unique=True, editable=False, default=generate_invoice_id)
+    INVOICE_ID = models.CharField(max_length=20, unique=True, editable=False)
     invoice_date = models.DateField(default=timezone.now)
     due_date = models.DateField(blank=True, null=True)
     sales_order_reference = models.ForeignKey(SalesOrder, on_delete=models.SET_NULL, null=True, blank=True)
@@ -295,9 +350,21 @@ class Invoice(models.Model):
     payment_status = models.CharField(max_length=20, choices=[('Paid', 'Paid'), ('Partial', 'Partial'), ('Unpaid', 'Unpaid')], default='Unpaid')
     invoice_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['invoice_date', 'id'], name='crm_invoice_date_id_idx'),
+            models.Index(fields=['invoice_status', 'invoice_date', 'id'], name='crm_invoice_status_date_idx'),
+            models.Index(fields=['customer', 'invoice_date', 'id'], name='crm_invoice_cust_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.invoice_total:
-            self.invoice_total = sum(item.total for item in self.items.all()) or 0
+        if not self.INVOICE_ID:
+            self.INVOICE_ID = generate_invoice_id()
+        if self.pk:
+            # invoice_total is kept up to date by InvoiceItem; never write back a stale copy
+            stored_total = Invoice.objects.filter(pk=self.pk).values_list('invoice_total', flat=True).first()
+            if stored_total is not None:
+                self.invoice_total = stored_total
         super().save(*args, **kwargs)
 
 class InvoiceItem(models.Model):
@@ -314,13 +381,23 @@ class InvoiceItem(models.Model):
 
     def save(self, *args, **kwargs):
         if self.product:
-            self.product_id = self.product.product_id
-            self.uom = self.product.uom
+            self.uom = self.product.uom or ''
             self.unit_price = self.product.unit_price or 0.00
             self.tax = self.product.tax or 0.00
             self.discount = self.product.discount or 0.00
-        self.total = self.quantity * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100)
-        super().save(*args, **kwargs)
+        # Rounded here as the line deltas are, so the stored line and the running totals agree
+        self.total = amount(self.quantity * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100))
+        with transaction.atomic():
+            previous = stored_line(self, 'invoice', 'total', 'tax')
+            super().save(*args, **kwargs)
+            OrderSummary.apply_line_deltas(line_deltas(previous, (self.invoice_id, self.total, self.tax)))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = stored_line(self, 'invoice', 'total', 'tax')
+            result = super().delete(*args, **kwargs)
+            OrderSummary.apply_line_deltas(line_deltas(previous, None))
+        return result
 
 class OrderSummary(models.Model):
     invoice = models.OneToOneField(Invoice, on_delete=models.CASCADE, related_name='summary')
@@ -335,13 +412,34 @@ class OrderSummary(models.Model):
     balance_due = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
     def save(self, *args, **kwargs):
-        invoice = self.invoice
-        self.subtotal = sum(item.total for item in invoice.items.all())
-        self.tax_summary = sum(item.tax * item.total / 100 for item in invoice.items.all())
+        # subtotal and tax_summary are maintained by InvoiceItem; only a new summary sums the lines
+        stored = OrderSummary.objects.filter(pk=self.pk).values_list('subtotal', 'tax_summary').first() if self.pk else None
+        if stored is None:
+            sums = self.invoice.items.aggregate(**line_sums())
+            stored = (sums['line_total'], sums['line_tax'])
+        self.subtotal, self.tax_summary = stored
         self.grand_total = self.subtotal - (self.subtotal * self.global_discount / 100) + self.tax_summary + self.shipping_charges + self.rounding_adjustment - self.credit_note_applied
         self.balance_due = self.grand_total - self.amount_paid
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def derived_totals():
+        grand_total = (
+            F('subtotal') - F('subtotal') * F('global_discount') * PERCENT + F('tax_summary')
+            + F('shipping_charges') + F('rounding_adjustment') - F('credit_note_applied')
+        )
+        return {'grand_total': grand_total, 'balance_due': grand_total - F('amount_paid')}
+
+    @staticmethod
+    def apply_line_deltas(deltas):
+        # Runs inside the line's transaction: add the line's change to its invoice and
+        # summary, then derive grand_total/balance_due from the updated columns
+        for invoice_id, (total_delta, tax_delta) in deltas.items():
+            Invoice.objects.filter(pk=invoice_id).update(invoice_total=F('invoice_total') + total_delta)
+            summaries = OrderSummary.objects.filter(invoice_id=invoice_id)
+            if summaries.update(subtotal=F('subtotal') + total_delta, tax_summary=F('tax_summary') + tax_delta):
+                summaries.update(**OrderSummary.derived_totals())
+
 
 
 from django.db import models
@@ -354,8 +452,7 @@ from .models import Invoice, SalesOrder
 User = get_user_model()
 
 def generate_invoice_return_id():
-    last_return = InvoiceReturn.objects.order_by('-id').first()
-    return f'INVR-{str(last_return.id + 1).zfill(4) if last_return else "0001"}' if last_return else "INVR-0001"
+    return next_document_number('invoice_return')
 
 class InvoiceReturnAttachment(models.Model):
     invoice_return = models.ForeignKey('InvoiceReturn', on_delete=models.CASCADE, related_name='attachments')
@@ -386,8 +483,19 @@ class InvoiceReturnItem(models.Model):
             self.unit_price = self.product.unit_price or 0.00
             self.tax = self.product.tax or 0.00
             self.discount = self.product.discount or 0.00
-        self.total = self.returned_qty * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100)
-        super().save(*args, **kwargs)
+        # Rounded here as the line deltas are, so the stored line and the running totals agree
+        self.total = amount(self.returned_qty * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100))
+        with transaction.atomic():
+            previous = stored_line(self, 'invoice_return', 'total', 'tax')
+            super().save(*args, **kwargs)
+            InvoiceReturnSummary.apply_line_deltas(line_deltas(previous, (self.invoice_return_id, self.total, self.tax)))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = stored_line(self, 'invoice_return', 'total', 'tax')
+            result = super().delete(*args, **kwargs)
+            InvoiceReturnSummary.apply_line_deltas(line_deltas(previous, None))
+        return result
 
 class InvoiceReturnSummary(models.Model):
     invoice_return = models.OneToOneField('InvoiceReturn', on_delete=models.CASCADE, related_name='summary')
@@ -399,12 +507,30 @@ class InvoiceReturnSummary(models.Model):
     amount_to_refund = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, editable=False)
 
     def save(self, *args, **kwargs):
-        invoice_return = self.invoice_return
-        self.return_subtotal = sum(item.total for item in invoice_return.items.all())
+        # return_subtotal is maintained by InvoiceReturnItem; only a new summary sums the lines
+        stored = InvoiceReturnSummary.objects.filter(pk=self.pk).values_list('return_subtotal', flat=True).first() if self.pk else None
+        if stored is None:
+            stored = self.invoice_return.items.aggregate(**line_sums())['line_total']
+        self.return_subtotal = stored
         self.global_discount_amount = self.return_subtotal * (self.global_discount / 100)
         self.amount_to_refund = self.return_subtotal - self.global_discount_amount + self.rounding_adjustment
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def derived_totals():
+        discount_amount = F('return_subtotal') * F('global_discount') * PERCENT
+        return {
+            'global_discount_amount': discount_amount,
+            'amount_to_refund': F('return_subtotal') - discount_amount + F('rounding_adjustment'),
+        }
+
+    @staticmethod
+    def apply_line_deltas(deltas):
+        for invoice_return_id, (total_delta, _) in deltas.items():
+            summaries = InvoiceReturnSummary.objects.filter(invoice_return_id=invoice_return_id)
+            if summaries.update(return_subtotal=F('return_subtotal') + total_delta):
+                summaries.update(**InvoiceReturnSummary.derived_totals())
+
 class InvoiceReturnHistory(models.Model):
     invoice_return = models.ForeignKey('InvoiceReturn', on_delete=models.CASCADE, related_name='history')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -418,7 +544,7 @@ class InvoiceReturnComment(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 class InvoiceReturn(models.Model):
-    INVOICE_RETURN_ID = models.CharField(max_length=20, unique=True, editable=False, default=generate_invoice_return_id)
+    INVOICE_RETURN_ID = models.CharField(max_length=20, unique=True, editable=False)
     invoice_return_date = models.DateField(default=timezone.now)
     sales_order_reference = models.ForeignKey(SalesOrder, on_delete=models.SET_NULL, null=True, blank=True)
     customer_reference_no = models.CharField(max_length=50, blank=True)
@@ -430,6 +556,18 @@ class InvoiceReturn(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['invoice_return_date', 'id'], name='crm_invr_date_id_idx'),
+            models.Index(fields=['status', 'invoice_return_date', 'id'], name='crm_invr_status_date_idx'),
+            models.Index(fields=['customer', 'invoice_return_date', 'id'], name='crm_invr_cust_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.INVOICE_RETURN_ID:
+            self.INVOICE_RETURN_ID = generate_invoice_return_id()
+        super().save(*args, **kwargs)
+
 
 
 from django.db import models
@@ -442,8 +580,7 @@ from .models import InvoiceReturn, SalesOrder
 User = get_user_model()
 
 def generate_delivery_note_return_id():
-    last_return = DeliveryNoteReturn.objects.order_by('-id').first()
-    return f'DNR-{str(last_return.id + 1).zfill(4) if last_return else "0001"}' if last_return else "DNR-0001"
+    return next_document_number('delivery_note_return')
 
 class DeliveryNoteReturnAttachment(models.Model):
     delivery_note_return = models.ForeignKey('DeliveryNoteReturn', on_delete=models.CASCADE, related_name='attachments')
@@ -467,7 +604,15 @@ class DeliveryNoteReturnItem(models.Model):
     def save(self, *args, **kwargs):
         if self.product:
             self.uom = self.product.uom or ''
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sync_line_stock(self.delivery_note_return, 'delivery_note_return', 'status')
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            sync_line_stock(self.delivery_note_return, 'delivery_note_return', 'status')
+            return result
 
 class DeliveryNoteReturnHistory(models.Model):
     delivery_note_return = models.ForeignKey('DeliveryNoteReturn', on_delete=models.CASCADE, related_name='history')
@@ -482,7 +627,7 @@ class DeliveryNoteReturnComment(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 class DeliveryNoteReturn(models.Model):
-    DNR_ID = models.CharField(max_length=20, unique=True, editable=False, default=generate_delivery_note_return_id)
+    DNR_ID = models.CharField(max_length=20, unique=True, editable=False)
     dnr_date = models.DateField(default=timezone.now)
     invoice_return_reference = models.ForeignKey(InvoiceReturn, on_delete=models.SET_NULL, null=True, blank=True)
     customer_reference_no = models.CharField(max_length=50, blank=True)
@@ -492,4 +637,33 @@ class DeliveryNoteReturn(models.Model):
     contact_person = models.CharField(max_length=100, blank=True)
     status = models.CharField(max_length=20, choices=[('Draft', 'Draft'), ('Submitted', 'Submitted'), ('Cancelled', 'Cancelled')], default='Draft')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dnr_date', 'id'], name='crm_dnr_date_id_idx'),
+            models.Index(fields=['status', 'dnr_date', 'id'], name='crm_dnr_status_date_idx'),
+            models.Index(fields=['customer', 'dnr_date', 'id'], name='crm_dnr_cust_date_idx'),
+        ]
+
+    STOCK_POSTED_STATUSES = ('Submitted',)
+
+    def save(self, *args, **kwargs):
+        if not self.DNR_ID:
+            self.DNR_ID = generate_delivery_note_return_id()
+        with transaction.atomic():
+            previous_status = locked_status(self, 'status')
+            super().save(*args, **kwargs)
+            sync_document_stock(self, 'delivery_note_return', previous_status, self.status)
+            was_posted = previous_status in self.STOCK_POSTED_STATUSES
+            if was_posted != (self.status in self.STOCK_POSTED_STATUSES):
+                sync_return_serials(self.pk, not was_posted)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            post_document('delivery_note_return', self.pk, [])
+            sync_return_serials(self.pk, False)
+            return super().delete(*args, **kwargs)
+
+    def stock_lines(self):
+        return self.items.values_list('product_id', 'product__warehouse_id', 'returned_qty')
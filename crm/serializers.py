@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Enquiry, EnquiryItem
 from core.models import Candidate
+from core.sequences import next_document_number
 
 class EnquiryItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,7 +23,7 @@ class EnquirySerializer(serializers.ModelSerializer):
         ]
 
     def get_grand_total(self, obj):
-        return sum(item.total_amount for item in obj.items.all()) if obj.items.exists() else 0
+        return sum(item.total_amount for item in obj.items.all())
 
 class EnquiryCreateSerializer(serializers.ModelSerializer):
     items = EnquiryItemSerializer(many=True, required=False)
@@ -44,12 +45,7 @@ class EnquiryCreateSerializer(serializers.ModelSerializer):
         return enquiry
 
     def _generate_enquiry_id(self):
-        last_enquiry = Enquiry.objects.order_by('-id').first()
-        if last_enquiry:
-            last_id = int(last_enquiry.enquiry_id.replace('ENQ', '')) + 1
-        else:
-            last_id = 1
-        return f'ENQ{last_id:03d}'  # e.g., ENQ001, ENQ002
+        return next_document_number('enquiry')  # e.g., ENQ001, ENQ002
     
 
 from rest_framework import serializers
@@ -75,7 +71,7 @@ class QuotationAttachmentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = QuotationAttachment
-        fields = ['id', 'file', 'uploaded_by', 'timestamp']
+        fields = ['id', 'file', 'uploaded_by']
 
 class QuotationCommentSerializer(serializers.ModelSerializer):
     person_name = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), default=serializers.CurrentUserDefault())
@@ -159,12 +155,7 @@ class QuotationCreateSerializer(serializers.ModelSerializer):
         return quotation
 
     def _generate_quotation_id(self):
-        last_quotation = Quotation.objects.order_by('-id').first()
-        if last_quotation:
-            last_id = int(last_quotation.quotation_id.replace('QUO', '')) + 1
-        else:
-            last_id = 1
-        return f'QUO{last_id:03d}'
+        return next_document_number('quotation')
     
 
 from rest_framework import serializers
@@ -503,4 +494,4 @@ class DeliveryNoteReturnSerializer(serializers.ModelSerializer):
             DeliveryNoteReturnAttachment.objects.create(delivery_note_return=delivery_note_return, **attachment_data)
         for remark_data in remarks_data:
             DeliveryNoteReturnRemark.objects.create(delivery_note_return=delivery_note_return, **remark_data)
-        return delivery_note_return
\ No newline at end of file
+        return delivery_note_return
\ No newline at end of file
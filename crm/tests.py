@@ -1,3 +1,357 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.management.commands.reconcile_totals import CHECKS, find_drift
+from core.models import Customer, Product, StockLevel, TaxCode, UOM, Warehouse
+from .conversions import conversion_queryset, convert_to_invoices
+from .models import (
+    Enquiry, EnquiryItem, Quotation, QuotationItem, QuotationComment, SalesOrder, SalesOrderItem,
+    SalesOrderComment, SalesOrderHistory, DeliveryNote, DeliveryNoteItem, Invoice, InvoiceItem, OrderSummary,
+    InvoiceReturn, InvoiceReturnItem, InvoiceReturnSummary, DeliveryNoteReturn, DeliveryNoteReturnItem
+)
+
+
+class QueryCountTests(TestCase):
+    # Each list/detail endpoint must run the same number of queries however many
+    # documents (and nested rows) the response contains.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rep', password='secret')
+        cls.customer = Customer.objects.create(
+            first_name='Asha', customer_type='Business', status='Active', email='asha@example.com',
+            phone_number='9000000000', street='1 Main St', city='Chennai', state='TN', zip_code='600001',
+            country='India',
+        )
+        cls.uom = UOM.objects.create(name='Nos', items=1)
+        cls.product = Product.objects.create(
+            name='Widget', product_type='Goods', unit_price=10, status='Active', product_usage='Sales',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_enquiry(self):
+        enquiry = Enquiry.objects.create(
+            enquiry_id=f'ENQ-T{Enquiry.objects.count()}', user=self.user, first_name='Ravi', email='ravi@example.com',
+            phone_number=900000000, city='Chennai', state='TN', postal='600001', country='India',
+            enquiry_type='Product', source='Web', enquiry_status='New',
+        )
+        EnquiryItem.objects.bulk_create([
+            EnquiryItem(enquiry=enquiry, item_code=f'I{i}', product_description='Widget', cost_price=5,
+                        selling_price=10, quantity=1, total_amount=10)
+            for i in range(2)
+        ])
+        return enquiry
+
+    def create_quotation(self):
+        quotation = Quotation.objects.create(
+            quotation_id=f'QUO-T{Quotation.objects.count()}', user=self.user, customer_name=self.customer,
+            quotation_type='Standard', quotation_date=date(2025, 1, 1), expiry_date=date(2025, 2, 1),
+            currency='IND', expected_delivery=date(2025, 1, 15), status='Draft',
+        )
+        QuotationItem.objects.bulk_create([
+            QuotationItem(quotation=quotation, product_id=self.product, product_name='Widget', uom=self.uom,
+                          unit_price=10, tax=0, quantity=1, total=10)
+            for _ in range(2)
+        ])
+        QuotationComment.objects.create(quotation=quotation, person_name=self.user, comment='Looks good')
+        return quotation
+
+    def create_sales_order(self):
+        sales_order = SalesOrder.objects.create(
+            sales_rep=self.user, order_type='Standard', customer=self.customer, currency='IND',
+        )
+        SalesOrderItem.objects.bulk_create([
+            SalesOrderItem(sales_order=sales_order, product=self.product, quantity=1, unit_price=10)
+            for _ in range(2)
+        ])
+        SalesOrderComment.objects.create(sales_order=sales_order, user=self.user, comment='Urgent')
+        SalesOrderHistory.objects.create(sales_order=sales_order, user=self.user, action='Created')
+        return sales_order
+
+    def create_delivery_note(self):
+        delivery_note = DeliveryNote.objects.create(sales_order_reference=self.create_sales_order())
+        DeliveryNoteItem.objects.bulk_create([
+            DeliveryNoteItem(delivery_note=delivery_note, product=self.product, quantity=1) for _ in range(2)
+        ])
+        return delivery_note
+
+    def create_invoice(self):
+        invoice = Invoice.objects.create(customer=self.customer, invoice_total=20)
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=invoice, product=self.product, quantity=1, unit_price=10, total=10)
+            for _ in range(2)
+        ])
+        zero = Decimal('0')
+        OrderSummary.objects.create(
+            invoice=invoice, global_discount=zero, shipping_charges=zero, rounding_adjustment=zero,
+            credit_note_applied=zero, amount_paid=zero,
+        )
+        return invoice
+
+    def create_invoice_return(self):
+        invoice_return = InvoiceReturn.objects.create(
+            sales_order_reference=self.create_sales_order(), customer=self.customer,
+        )
+        InvoiceReturnItem.objects.bulk_create([
+            InvoiceReturnItem(invoice_return=invoice_return, product=self.product, returned_qty=1)
+            for _ in range(2)
+        ])
+        InvoiceReturnSummary.objects.create(
+            invoice_return=invoice_return, global_discount=Decimal('0'), rounding_adjustment=Decimal('0'),
+        )
+        return invoice_return
+
+    def create_delivery_note_return(self):
+        delivery_note_return = DeliveryNoteReturn.objects.create(
+            invoice_return_reference=self.create_invoice_return(), customer=self.customer,
+        )
+        DeliveryNoteReturnItem.objects.bulk_create([
+            DeliveryNoteReturnItem(delivery_note_return=delivery_note_return, product=self.product, returned_qty=1)
+            for _ in range(2)
+        ])
+        return delivery_note_return
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assertListQueries(self, url, create, expected):
+        create()
+        self.assertEqual(self.count_queries(url), expected)
+        for _ in range(3):
+            create()
+        self.assertEqual(self.count_queries(url), expected)
+
+    def assertDetailQueries(self, url_pattern, create, expected):
+        self.assertEqual(self.count_queries(url_pattern.format(create().pk)), expected)
+
+    def test_enquiry_endpoints(self):
+        self.assertListQueries('/enquiries/', self.create_enquiry, 2)
+        self.assertDetailQueries('/enquiries/{}/', self.create_enquiry, 2)
+
+    def test_quotation_endpoints(self):
+        self.assertListQueries('/quotations/', self.create_quotation, 7)
+        self.assertDetailQueries('/quotations/{}/', self.create_quotation, 7)
+
+    def test_sales_order_endpoints(self):
+        self.assertListQueries('/sales-orders/', self.create_sales_order, 5)
+        self.assertDetailQueries('/sales-orders/{}/', self.create_sales_order, 5)
+        self.assertDetailQueries('/sales-orders/{}/comments/', self.create_sales_order, 2)
+        self.assertDetailQueries('/sales-orders/{}/history/', self.create_sales_order, 2)
+
+    def test_delivery_note_endpoints(self):
+        self.assertListQueries('/delivery-notes/', self.create_delivery_note, 6)
+        self.assertDetailQueries('/delivery-notes/{}/', self.create_delivery_note, 6)
+
+    def test_invoice_endpoints(self):
+        self.assertListQueries('/invoices/', self.create_invoice, 5)
+        self.assertDetailQueries('/invoices/{}/', self.create_invoice, 5)
+
+    def test_invoice_return_endpoints(self):
+        self.assertListQueries('/invoice-returns/', self.create_invoice_return, 12)
+        self.assertDetailQueries('/invoice-returns/{}/', self.create_invoice_return, 12)
+
+    def test_delivery_note_return_endpoints(self):
+        self.assertListQueries('/delivery-note-returns/', self.create_delivery_note_return, 19)
+        self.assertDetailQueries('/delivery-note-returns/{}/', self.create_delivery_note_return, 19)
+
+    def test_every_field_can_be_selected(self):
+        for url, create in [
+            ('/enquiries/', self.create_enquiry),
+            ('/quotations/', self.create_quotation),
+            ('/sales-orders/', self.create_sales_order),
+            ('/delivery-notes/', self.create_delivery_note),
+            ('/invoices/', self.create_invoice),
+            ('/invoice-returns/', self.create_invoice_return),
+            ('/delivery-note-returns/', self.create_delivery_note_return),
+        ]:
+            create()
+            full = self.client.get(url).data['results'][0]
+            for name in full:
+                with self.subTest(url=url, field=name):
+                    response = self.client.get(url, {'fields': name})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.data['results'][0], {name: full[name]})
+
+    def test_document_pdfs(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for url_pattern, create in [
+            ('/sales-orders/{}/pdf/', self.create_sales_order),
+            ('/delivery-notes/{}/pdf/', self.create_delivery_note),
+            ('/invoices/{}/pdf/', self.create_invoice),
+            ('/invoice-returns/{}/pdf/', self.create_invoice_return),
+            ('/delivery-note-returns/{}/pdf/', self.create_delivery_note_return),
+        ]:
+            response = self.client.get(url_pattern.format(create().pk))
+            self.assertEqual(response.status_code, 200, url_pattern)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+
+
+class DeliveryNoteStockTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        uom = UOM.objects.create(name='Nos', items=1)
+        cls.warehouse = Warehouse.objects.create(name='Main')
+        cls.product = Product.objects.create(
+            name='Widget', product_type='Goods', unit_price=10, status='Active', product_usage='Sales',
+            uom=uom, warehouse=cls.warehouse,
+        )
+
+    def on_hand(self):
+        return StockLevel.objects.get(product=self.product, warehouse=self.warehouse).on_hand
+
+    def test_delivered_items_leave_stock(self):
+        note = DeliveryNote.objects.create(customer_name='Asha')
+        item = DeliveryNoteItem.objects.create(delivery_note=note, product=self.product, quantity=3)
+        item.refresh_from_db()
+        self.assertEqual((item.product_id, item.uom), (self.product.pk, 'Nos'))
+        self.assertFalse(StockLevel.objects.exists())
+
+        note.delivery_status = 'Delivered'
+        note.save()
+        self.assertEqual(self.on_hand(), -3)
+
+        # lines added or removed while delivered move stock straight away
+        extra = DeliveryNoteItem.objects.create(delivery_note=note, product=self.product, quantity=2)
+        self.assertEqual(self.on_hand(), -5)
+        extra.delete()
+        self.assertEqual(self.on_hand(), -3)
+
+        note.delivery_status = 'Cancelled'
+        note.save()
+        self.assertEqual(self.on_hand(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+
+
+class IncrementalTotalsTests(TestCase):
+    # Line saves and deletes adjust the stored totals by their difference only; after
+    # any mix of them the totals must equal what reconcile_totals recomputes from the lines
+
+    def assertMatchesFullRecompute(self):
+        for label, (queryset, prefix, fields) in CHECKS.items():
+            with self.subTest(label):
+                self.assertEqual(list(find_drift(queryset, prefix, fields)), [])
+                model = queryset.model
+                if hasattr(model, 'derived_totals'):
+                    stored = list(model.objects.order_by('pk').values())
+                    model.objects.update(**model.derived_totals())
+                    self.assertEqual(list(model.objects.order_by('pk').values()), stored)
+
+    def test_invoice_lines(self):
+        invoice = Invoice.objects.create()
+        OrderSummary.objects.create(
+            invoice=invoice, global_discount=Decimal('10'), shipping_charges=Decimal('25'),
+            rounding_adjustment=Decimal('0.40'), credit_note_applied=Decimal('5'), amount_paid=Decimal('50'),
+        )
+        lines = [
+            InvoiceItem.objects.create(invoice=invoice, quantity=3, unit_price=Decimal('19.99'), tax=Decimal('18'), discount=Decimal('5')),
+            InvoiceItem.objects.create(invoice=invoice, quantity=1, unit_price=Decimal('0.15'), tax=Decimal('0'), discount=Decimal('70')),
+            InvoiceItem.objects.create(invoice=invoice, quantity=7, unit_price=Decimal('2.35'), tax=Decimal('12.5'), discount=Decimal('0')),
+        ]
+        self.assertMatchesFullRecompute()
+
+        lines[0].quantity = 5
+        lines[0].tax = Decimal('5')
+        lines[0].save()
+        lines[1].unit_price = Decimal('0.25')
+        lines[1].save()
+        self.assertMatchesFullRecompute()
+
+        lines[2].delete()
+        self.assertMatchesFullRecompute()
+        # moving a line to another invoice takes its amounts along
+        other = Invoice.objects.create()
+        OrderSummary.objects.create(
+            invoice=other, global_discount=Decimal('0'), shipping_charges=Decimal('0'), rounding_adjustment=Decimal('0'),
+            credit_note_applied=Decimal('0'), amount_paid=Decimal('0'),
+        )
+        lines[0].invoice = other
+        lines[0].save()
+        self.assertMatchesFullRecompute()
+        self.assertEqual(OrderSummary.objects.get(invoice=invoice).subtotal, InvoiceItem.objects.get(invoice=invoice).total)
+
+    def test_invoice_return_lines(self):
+        invoice_return = InvoiceReturn.objects.create()
+        InvoiceReturnSummary.objects.create(
+            invoice_return=invoice_return, global_discount=Decimal('7.5'), rounding_adjustment=Decimal('-0.10'),
+        )
+        kept = InvoiceReturnItem.objects.create(
+            invoice_return=invoice_return, returned_qty=2, unit_price=Decimal('45.10'), tax=Decimal('18'), discount=Decimal('3'),
+        )
+        dropped = InvoiceReturnItem.objects.create(invoice_return=invoice_return, returned_qty=1, unit_price=Decimal('9.99'),
+                                                  tax=Decimal('0'), discount=Decimal('0'))
+        self.assertMatchesFullRecompute()
+        kept.returned_qty = 1
+        kept.save()
+        dropped.delete()
+        self.assertMatchesFullRecompute()
+
+
+class InvoiceConversionTotalsTests(TestCase):
+    def test_bulk_conversion_matches_saving_each_line(self):
+        user = User.objects.create_user(username='rep')
+        customer = Customer.objects.create(
+            first_name='Asha', customer_type='Business', status='Active', email='asha@example.com',
+            phone_number='9000000000', street='1 Main St', city='Chennai', state='TN', zip_code='600001',
+            country='India',
+        )
+        gst = TaxCode.objects.create(name='GST 18', percentage=18)
+        taxed = Product.objects.create(name='Widget', product_type='Goods', unit_price=10, status='Active', product_usage='Sales', tax_code=gst)
+        untaxed = Product.objects.create(name='Manual', product_type='Goods', unit_price=1, status='Active', product_usage='Sales')
+        orders = []
+        for global_discount, shipping_charges, lines in [
+            (Decimal('7.5'), Decimal('40.25'), [(taxed, 3, '19.99', '5'), (untaxed, 1, '0.15', '70')]),
+            (Decimal('0'), Decimal('0'), [(taxed, 7, '2.35', '0'), (taxed, 1, '0.25', '0')]),
+        ]:
+            order = SalesOrder.objects.create(
+                sales_rep=user, order_type='Standard', customer=customer, currency='IND', status='Submitted',
+                global_discount=global_discount, shipping_charges=shipping_charges,
+            )
+            for product, quantity, unit_price, discount in lines:
+                SalesOrderItem.objects.create(
+                    sales_order=order, product=product, quantity=quantity, unit_price=Decimal(unit_price), discount=Decimal(discount),
+                )
+            orders.append(order)
+
+        converted = convert_to_invoices(conversion_queryset().filter(pk__in=[order.pk for order in orders]).order_by('pk'))
+
+        zero = Decimal('0')
+        for order, invoice in zip(orders, converted):
+            saved = Invoice.objects.create(customer=customer, invoice_total=zero)
+            for item in order.items.order_by('id'):
+                InvoiceItem(
+                    invoice=saved, quantity=item.quantity, unit_price=item.unit_price, discount=item.discount,
+                    tax=Decimal(str(item.product.tax_code.percentage)) if item.product.tax_code else zero,
+                ).save()
+            OrderSummary.objects.create(
+                invoice=saved, global_discount=order.global_discount, shipping_charges=order.shipping_charges,
+                rounding_adjustment=zero, credit_note_applied=zero, amount_paid=zero,
+            )
+            with self.subTest(sales_order=order.pk):
+                self.assertEqual(
+                    list(invoice.items.order_by('id').values_list('total', flat=True)),
+                    list(saved.items.order_by('id').values_list('total', flat=True)),
+                )
+                totals = ['invoice__invoice_total', 'subtotal', 'tax_summary', 'grand_total', 'balance_due']
+                self.assertEqual(
+                    OrderSummary.objects.filter(invoice=invoice).values(*totals).get(),
+                    OrderSummary.objects.filter(invoice=saved).values(*totals).get(),
+                )
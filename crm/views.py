@@ -4,14 +4,32 @@ from rest_framework import status, permissions
 from .models import Enquiry, EnquiryItem
 from .serializers import EnquirySerializer, EnquiryCreateSerializer
 from django.core.exceptions import ObjectDoesNotExist
+from asgiref.sync import sync_to_async
+from core.outbox import aqueue_email, queue_email
+from core.async_views import AsyncAPIView, AsyncDocumentEmailView
+from django.db.models import Prefetch
+from core.listing import ListQuery
+from core.search import search_filter
+from core.pdf_cache import cached_pdf_response, render_lines, document_version, document_etag, is_not_modified, not_modified_response
+
+# Prefetch plans: the querysets list and detail responses are serialized from,
+# so each document loads its nested items/comments/history in a fixed number of queries.
+def enquiry_queryset():
+    return Enquiry.objects.prefetch_related('items')
+
+ENQUIRY_LISTING = ListQuery(
+    filters={'status': 'enquiry_status', 'priority': 'priority', 'urgency': 'urgency_level'},
+    sorts=('created_at',),
+)
 
 class EnquiryListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        enquiries = Enquiry.objects.filter(user=request.user).order_by('-created_at')
-        serializer = EnquirySerializer(enquiries, many=True)
-        return Response(serializer.data)
+        listing = ENQUIRY_LISTING.apply(enquiry_queryset().filter(user=request.user), request, EnquirySerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def delete(self, request, pk):
         try:
@@ -27,7 +45,7 @@ class NewEnquiryView(APIView):
     def get(self, request, pk=None):
         if pk:
             try:
-                enquiry = Enquiry.objects.get(id=pk, user=request.user)
+                enquiry = enquiry_queryset().get(id=pk, user=request.user)
                 serializer = EnquirySerializer(enquiry)
                 return Response(serializer.data)
             except ObjectDoesNotExist:
@@ -68,13 +86,25 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 import io
 
+def quotation_queryset():
+    return Quotation.objects.prefetch_related('items__product_id', 'attachments', 'comments', 'history', 'revisions')
+
+QUOTATION_LISTING = ListQuery(
+    filters={
+        'status': 'status', 'customer': search_filter('customer', 'customer_name_id'), 'customer_id': 'customer_name_id',
+        'date_from': 'quotation_date__gte', 'date_to': 'quotation_date__lte',
+    },
+    sorts=('created_at', 'quotation_date', 'expiry_date'),
+)
+
 class QuotationListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        quotations = Quotation.objects.filter(user=request.user).order_by('-created_at')
-        serializer = QuotationSerializer(quotations, many=True)
-        return Response(serializer.data)
+        listing = QUOTATION_LISTING.apply(quotation_queryset().filter(user=request.user), request, QuotationSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = QuotationCreateSerializer(data=request.data, context={'request': request})
@@ -96,7 +126,7 @@ class QuotationDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            quotation = Quotation.objects.get(id=pk, user=request.user)
+            quotation = quotation_queryset().get(id=pk, user=request.user)
             serializer = QuotationSerializer(quotation)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -165,6 +195,41 @@ class QuotationAttachmentView(APIView):
         except ObjectDoesNotExist:
             return Response({'error': 'Attachment or Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class AsyncQuotationAttachmentView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def post(self, request, pk):
+        try:
+            quotation = await Quotation.objects.aget(id=pk, user=request.user)
+        except ObjectDoesNotExist:
+            return Response({'error': 'Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
+        attachment = QuotationAttachment(quotation=quotation, uploaded_by=request.user)
+        # Parsing the multipart body and writing the file to storage touch only the disk,
+        # so they run in the thread pool and leave the sync thread to database work
+        upload = await sync_to_async(request.FILES.get, thread_sensitive=False)('file')
+        if upload:
+            await sync_to_async(attachment.file.save, thread_sensitive=False)(upload.name, upload, save=False)
+        await attachment.asave()
+        serializer = QuotationAttachmentSerializer(attachment)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    async def get(self, request, pk):
+        try:
+            quotation = await Quotation.objects.aget(id=pk, user=request.user)
+        except ObjectDoesNotExist:
+            return Response({'error': 'Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
+        attachments = [attachment async for attachment in quotation.attachments.all()]
+        serializer = QuotationAttachmentSerializer(attachments, many=True)
+        return Response(serializer.data)
+
+    async def delete(self, request, pk, attachment_id):
+        try:
+            attachment = await QuotationAttachment.objects.aget(id=attachment_id, quotation_id=pk, quotation__user=request.user)
+        except ObjectDoesNotExist:
+            return Response({'error': 'Attachment or Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
+        await attachment.adelete()
+        return Response({'message': 'Attachment deleted'}, status=status.HTTP_204_NO_CONTENT)
+
 class QuotationCommentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -259,21 +324,23 @@ class QuotationPDFView(APIView):
     def get(self, request, pk):
         try:
             quotation = Quotation.objects.get(id=pk, user=request.user)
+            # The client renders this PDF itself, so only the conditional GET applies here
+            etag = document_etag('quotation', quotation, document_version(
+                quotation, related=('items', 'attachments', 'comments', 'history', 'revisions')
+            ))
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
             serializer = QuotationSerializer(quotation)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
         except ObjectDoesNotExist:
             return Response({'error': 'Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': f'PDF data fetch failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-class QuotationEmailView(APIView):
-      permission_classes = [permissions.IsAuthenticated]
-
-      def post(self, request, pk):
-          try:
-              quotation = Quotation.objects.get(id=pk, user=request.user)
-              email = request.data.get('email')
-              html_content = request.data.get('html_content', """
+QUOTATION_EMAIL_HTML = """
                   <html>
                       <body>
                           <h2>Quotation Details</h2>
@@ -284,20 +351,47 @@ class QuotationEmailView(APIView):
                           <p>Thank you for your business!</p>
                       </body>
                   </html>
-                  """.format(quotation=quotation, grand_total=QuotationSerializer(quotation).data.get('grand_total', 0)))
+                  """
+
+class QuotationEmailView(APIView):
+      permission_classes = [permissions.IsAuthenticated]
+
+      def post(self, request, pk):
+          try:
+              quotation = Quotation.objects.get(id=pk, user=request.user)
+              email = request.data.get('email')
+              html_content = request.data.get('html_content', QUOTATION_EMAIL_HTML.format(
+                  quotation=quotation, grand_total=QuotationSerializer(quotation).data.get('grand_total', 0)))
 
               if not email:
                   return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
 
               subject = f'Quotation {quotation.quotation_id}'
-              msg = EmailMessage(subject, html_content, to=[email])
-              msg.content_subtype = 'html'
-              msg.send()
-              return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+              queued_email = queue_email(subject, html_content, [email], html=True, user=request.user)
+              return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
           except ObjectDoesNotExist:
               return Response({'error': 'Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
           except Exception as e:
               return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class AsyncQuotationEmailView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def post(self, request, pk):
+        try:
+            quotation = await Quotation.objects.select_related('customer_name').aget(id=pk, user=request.user)
+        except ObjectDoesNotExist:
+            return Response({'error': 'Quotation not found'}, status=status.HTTP_404_NOT_FOUND)
+        email = request.data.get('email')
+        if not email:
+            return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
+        html_content = request.data.get('html_content')
+        if html_content is None:
+            # The grand total is serialized from the quotation's items, loaded on the sync thread
+            grand_total = await sync_to_async(lambda: QuotationSerializer(quotation).data.get('grand_total', 0))()
+            html_content = QUOTATION_EMAIL_HTML.format(quotation=quotation, grand_total=grand_total)
+        queued_email = await aqueue_email(f'Quotation {quotation.quotation_id}', html_content, [email], html=True, user=request.user)
+        return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
           
 
 
@@ -316,15 +410,43 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 import io
 from django.utils import timezone
+from .conversions import CONVERSIONS, CONVERTIBLE_STATUSES, conversion_queryset, convert_to_delivery_notes, convert_to_invoices
+
+def sales_order_prefetches(prefix=''):
+    return [
+        f'{prefix}items__product',
+        Prefetch(f'{prefix}comments', queryset=SalesOrderComment.objects.select_related('user')),
+        Prefetch(f'{prefix}history', queryset=SalesOrderHistory.objects.select_related('user')),
+    ]
+
+def sales_order_queryset():
+    return SalesOrder.objects.select_related('customer', 'sales_rep').prefetch_related(*sales_order_prefetches())
+
+def delivery_note_queryset():
+    return DeliveryNote.objects.select_related('acknowledgement').prefetch_related(
+        'items__product', 'items__serial_numbers', 'attachments', 'remarks'
+    )
+
+def invoice_queryset():
+    return Invoice.objects.select_related('summary').prefetch_related('items__product', 'attachments', 'remarks')
 
 # Existing SalesOrder views
+SALES_ORDER_LISTING = ListQuery(
+    filters={
+        'status': 'status', 'customer': search_filter('customer', 'customer_id'), 'customer_id': 'customer_id',
+        'date_from': 'order_date__gte', 'date_to': 'order_date__lte',
+    },
+    sorts=('created_at', 'order_date', 'due_date'),
+)
+
 class SalesOrderListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        sales_orders = SalesOrder.objects.filter(sales_rep=request.user).order_by('-created_at')
-        serializer = SalesOrderSerializer(sales_orders, many=True)
-        return Response(serializer.data)
+        listing = SALES_ORDER_LISTING.apply(sales_order_queryset().filter(sales_rep=request.user), request, SalesOrderSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = SalesOrderCreateSerializer(data=request.data, context={'request': request})
@@ -346,7 +468,7 @@ class SalesOrderDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            sales_order = SalesOrder.objects.get(id=pk, sales_rep=request.user)
+            sales_order = sales_order_queryset().get(id=pk, sales_rep=request.user)
             serializer = SalesOrderSerializer(sales_order)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -365,8 +487,10 @@ class SalesOrderDetailView(APIView):
             elif action == 'cancel':
                 sales_order.status = 'Cancelled'
             elif action == 'convert_to_delivery':
+                sales_order = conversion_queryset().get(id=sales_order.id)
                 return Response(self.convert_to_delivery_note(sales_order))
             elif action == 'convert_to_invoice':
+                sales_order = conversion_queryset().get(id=sales_order.id)
                 return Response(self.convert_to_invoice(sales_order))
             else:
                 serializer = SalesOrderCreateSerializer(sales_order, data=request.data, partial=True, context={'request': request})
@@ -381,60 +505,38 @@ class SalesOrderDetailView(APIView):
             return Response({'error': 'Sales Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
     def convert_to_delivery_note(self, sales_order):
-        delivery_data = {
-            'delivery_date': timezone.now().date(),
-            'sales_order_reference': sales_order.id,
-            'customer_name': sales_order.customer.name,
-            'delivery_type': 'Regular',
-            'destination_address': sales_order.customer.address,
-            'delivery_status': 'Draft',
-        }
-        serializer = DeliveryNoteSerializer(data=delivery_data)
-        if serializer.is_valid():
-            delivery_note = serializer.save()
-            for item in sales_order.items.all():
-                item_data = {
-                    'product': item.product.id,
-                    'quantity': item.quantity,
-                }
-                item_serializer = DeliveryNoteItemSerializer(data=item_data)
-                if item_serializer.is_valid():
-                    delivery_item = item_serializer.save()
-                    delivery_note.items.add(delivery_item)
-            return DeliveryNoteSerializer(delivery_note).data
-        return serializer.errors
+        delivery_note, = convert_to_delivery_notes([sales_order])
+        return DeliveryNoteSerializer(delivery_note_queryset().get(id=delivery_note.id)).data
 
     def convert_to_invoice(self, sales_order):
-        invoice_data = {
-            'invoice_date': timezone.now().date(),
-            'due_date': timezone.now().date() + timezone.timedelta(days=30),
-            'sales_order_reference': sales_order.id,
-            'customer': sales_order.customer.id,
-            'billing_address': sales_order.customer.address,
-            'shipping_address': sales_order.customer.address,
-            'email_id': sales_order.customer.email,
-            'phone_number': sales_order.customer.phone_number,
-            'payment_terms': 'Net 30',
-            'currency': sales_order.currency,
-        }
-        serializer = InvoiceSerializer(data=invoice_data)
-        if serializer.is_valid():
-            invoice = serializer.save()
-            for item in sales_order.items.all():
-                item_data = {
-                    'product': item.product.id,
-                    'quantity': item.quantity,
-                    'unit_price': item.unit_price,
-                    'discount': item.discount,
-                }
-                item_serializer = InvoiceItemSerializer(data=item_data)
-                if item_serializer.is_valid():
-                    invoice_item = item_serializer.save()
-                    invoice.items.add(invoice_item)
-            summary_data = {'invoice': invoice.id, 'subtotal': sum(i.total for i in invoice.items.all())}
-            OrderSummarySerializer().create(summary_data)
-            return InvoiceSerializer(invoice).data
-        return serializer.errors
+        invoice, = convert_to_invoices([sales_order])
+        return InvoiceSerializer(invoice_queryset().get(id=invoice.id)).data
+
+
+class SalesOrderConvertView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        target = request.data.get('target')
+        ids = request.data.get('ids')
+        if target not in CONVERSIONS:
+            return Response({'error': f'target must be one of {list(CONVERSIONS)}'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+            return Response({'error': 'ids must be a non-empty list of sales order ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        sales_orders = list(conversion_queryset().filter(
+            id__in=ids, sales_rep=request.user, status__in=CONVERTIBLE_STATUSES
+        ).order_by('id'))
+        converted_ids = {sales_order.id for sales_order in sales_orders}
+        documents = CONVERSIONS[target](sales_orders)
+        number_field = 'DN_ID' if target == 'delivery_note' else 'INVOICE_ID'
+        return Response({
+            'converted': [
+                {'sales_order': sales_order.id, 'id': document.id, 'number': getattr(document, number_field)}
+                for sales_order, document in zip(sales_orders, documents)
+            ],
+            'skipped': [pk for pk in ids if pk not in converted_ids],
+        }, status=status.HTTP_201_CREATED)
 
 class SalesOrderCommentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -452,7 +554,7 @@ class SalesOrderCommentView(APIView):
     def get(self, request, pk):
         try:
             sales_order = SalesOrder.objects.get(id=pk, sales_rep=request.user)
-            comments = sales_order.comments.all()
+            comments = sales_order.comments.select_related('user')
             serializer = SalesOrderCommentSerializer(comments, many=True)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -464,30 +566,30 @@ class SalesOrderHistoryView(APIView):
     def get(self, request, pk):
         try:
             sales_order = SalesOrder.objects.get(id=pk, sales_rep=request.user)
-            history = sales_order.history.all()
+            history = sales_order.history.select_related('user')
             serializer = SalesOrderHistorySerializer(history, many=True)
             return Response(serializer.data)
         except ObjectDoesNotExist:
             return Response({'error': 'Sales Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
+def sales_order_pdf_lines(sales_order):
+    return [
+        f"Sales Order ID: {sales_order.sales_order_id}",
+        f"Date: {sales_order.order_date}",
+        f"Customer: {sales_order.customer}",
+    ]
+
+
 class SalesOrderPDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
         try:
             sales_order = SalesOrder.objects.get(id=pk, sales_rep=request.user)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"Sales Order ID: {sales_order.sales_order_id}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {sales_order.order_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Customer: {sales_order.customer.name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="sales_order_{sales_order.sales_order_id}.pdf"'
-            return response
+            lines = sales_order_pdf_lines(sales_order)
+            return cached_pdf_response(
+                request, 'sales_order', sales_order, f'sales_order_{sales_order.sales_order_id}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Sales Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -502,21 +604,36 @@ class SalesOrderEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Sales Order {sales_order.sales_order_id}'
             html_message = render_to_string('sales_order_email_template.html', {'sales_order': sales_order})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Sales Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class AsyncSalesOrderEmailView(AsyncDocumentEmailView):
+    model = SalesOrder
+    template = 'sales_order_email_template.html'
+    context_name = 'sales_order'
+    subject = 'Sales Order {document.sales_order_id}'
+    label = 'Sales Order'
+    owner_field = 'sales_rep'
+
 # Existing DeliveryNote views
+DELIVERY_NOTE_LISTING = ListQuery(
+    filters={
+        'status': 'delivery_status', 'sales_order': 'sales_order_reference_id',
+        'date_from': 'delivery_date__gte', 'date_to': 'delivery_date__lte',
+    },
+    sorts=('delivery_date',),
+)
+
 class DeliveryNoteListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        delivery_notes = DeliveryNote.objects.all().order_by('-delivery_date')
-        serializer = DeliveryNoteSerializer(delivery_notes, many=True)
-        return Response(serializer.data)
+        listing = DELIVERY_NOTE_LISTING.apply(delivery_note_queryset(), request, DeliveryNoteSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = DeliveryNoteSerializer(data=request.data)
@@ -530,7 +647,7 @@ class DeliveryNoteDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            delivery_note = DeliveryNote.objects.get(id=pk)
+            delivery_note = delivery_note_queryset().get(id=pk)
             serializer = DeliveryNoteSerializer(delivery_note)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -609,50 +726,60 @@ class DeliveryNoteItemView(APIView):
             return Response({'error': 'Delivery Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
 from purchase.models import SerialNumber
-from purchase.serializers import SerialNumber,SerialNumberSerializer
+from purchase.serializers import SerialNumber,SerialNumberSerializer, SerialStockSerializer
+from purchase.serial_stock import AVAILABLE_STATUSES, SerialStockError, available_serials, reserve_serials
+from core.pagination import KeysetPagination
+
 class DeliveryNoteSerialNumbersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk, item_pk):
         try:
             delivery_note_item = DeliveryNoteItem.objects.get(id=item_pk, delivery_note_id=pk)
-            available_serials = SerialNumber.objects.filter(product=delivery_note_item.product).exclude(
-                id__in=delivery_note_item.serial_numbers.values('id')
-            )[:delivery_note_item.quantity - delivery_note_item.serial_numbers.count()]
-            serializer = SerialNumberSerializer(available_serials, many=True)
-            return Response(serializer.data)
         except ObjectDoesNotExist:
             return Response({'error': 'Delivery Note Item or Serial Numbers not found'}, status=status.HTTP_404_NOT_FOUND)
+        # One status at a time keeps each page a range read on the (product, status, serial) index;
+        # ?status=returned lists units back from customer returns
+        serial_status = request.query_params.get('status', 'in_stock')
+        if serial_status not in AVAILABLE_STATUSES:
+            return Response({'error': f'status must be one of {list(AVAILABLE_STATUSES)}'}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = KeysetPagination('pk', descending=False)
+        page = paginator.paginate_queryset(available_serials(delivery_note_item.product_id).filter(status=serial_status), request)
+        response = paginator.get_paginated_response(SerialStockSerializer(page, many=True).data)
+        response.data['remaining'] = max(delivery_note_item.quantity - delivery_note_item.serial_numbers.count(), 0)
+        return response
 
     def post(self, request, pk, item_pk):
         try:
             delivery_note_item = DeliveryNoteItem.objects.get(id=item_pk, delivery_note_id=pk)
             serial_ids = request.data.get('serial_numbers', [])
             if len(serial_ids) <= delivery_note_item.quantity - delivery_note_item.serial_numbers.count():
-                delivery_note_item.serial_numbers.add(*serial_ids)
+                reserve_serials(delivery_note_item, serial_ids)
                 return Response({'message': 'Serial numbers added'}, status=status.HTTP_200_OK)
             return Response({'error': 'Exceeds quantity limit'}, status=status.HTTP_400_BAD_REQUEST)
+        except SerialStockError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except ObjectDoesNotExist:
             return Response({'error': 'Delivery Note Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
+def delivery_note_pdf_lines(delivery_note):
+    return [
+        f"DN ID: {delivery_note.DN_ID}",
+        f"Date: {delivery_note.delivery_date}",
+        f"Customer: {delivery_note.customer_name}",
+    ]
+
+
 class DeliveryNotePDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
         try:
             delivery_note = DeliveryNote.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"DN ID: {delivery_note.DN_ID}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {delivery_note.delivery_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Customer: {delivery_note.customer_name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="delivery_note_{delivery_note.DN_ID}.pdf"'
-            return response
+            lines = delivery_note_pdf_lines(delivery_note)
+            return cached_pdf_response(
+                request, 'delivery_note', delivery_note, f'delivery_note_{delivery_note.DN_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Delivery Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -667,21 +794,36 @@ class DeliveryNoteEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Delivery Note {delivery_note.DN_ID}'
             html_message = render_to_string('delivery_note_email_template.html', {'delivery_note': delivery_note})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Delivery Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class AsyncDeliveryNoteEmailView(AsyncDocumentEmailView):
+    model = DeliveryNote
+    template = 'delivery_note_email_template.html'
+    context_name = 'delivery_note'
+    subject = 'Delivery Note {document.DN_ID}'
+    label = 'Delivery Note'
+
 # New Invoice views
+INVOICE_LISTING = ListQuery(
+    filters={
+        'status': 'invoice_status', 'payment_status': 'payment_status',
+        'customer': search_filter('customer', 'customer_id'), 'customer_id': 'customer_id',
+        'date_from': 'invoice_date__gte', 'date_to': 'invoice_date__lte',
+    },
+    sorts=('invoice_date', 'due_date'),
+)
+
 class InvoiceListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        invoices = Invoice.objects.all().order_by('-invoice_date')
-        serializer = InvoiceSerializer(invoices, many=True)
-        return Response(serializer.data)
+        listing = INVOICE_LISTING.apply(invoice_queryset(), request, InvoiceSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = InvoiceSerializer(data=request.data)
@@ -695,7 +837,7 @@ class InvoiceDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            invoice = Invoice.objects.get(id=pk)
+            invoice = invoice_queryset().get(id=pk)
             serializer = InvoiceSerializer(invoice)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -745,24 +887,24 @@ class InvoiceItemView(APIView):
         except ObjectDoesNotExist:
             return Response({'error': 'Invoice not found'}, status=status.HTTP_404_NOT_FOUND)
 
+def invoice_pdf_lines(invoice):
+    return [
+        f"Invoice ID: {invoice.INVOICE_ID}",
+        f"Date: {invoice.invoice_date}",
+        f"Customer: {invoice.customer or ''}",
+    ]
+
+
 class InvoicePDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
         try:
             invoice = Invoice.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"Invoice ID: {invoice.INVOICE_ID}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {invoice.invoice_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Customer: {invoice.customer.name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="invoice_{invoice.INVOICE_ID}.pdf"'
-            return response
+            lines = invoice_pdf_lines(invoice)
+            return cached_pdf_response(
+                request, 'invoice', invoice, f'invoice_{invoice.INVOICE_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Invoice not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -777,12 +919,17 @@ class InvoiceEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Invoice {invoice.INVOICE_ID}'
             html_message = render_to_string('invoice_email_template.html', {'invoice': invoice})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Invoice not found'}, status=status.HTTP_404_NOT_FOUND)
+
+class AsyncInvoiceEmailView(AsyncDocumentEmailView):
+    model = Invoice
+    template = 'invoice_email_template.html'
+    context_name = 'invoice'
+    subject = 'Invoice {document.INVOICE_ID}'
+    label = 'Invoice'
         
 
 
@@ -800,25 +947,34 @@ import io
 from .models import InvoiceReturn, InvoiceReturnItem, InvoiceReturnAttachment, InvoiceReturnRemark, InvoiceReturnSummary, InvoiceReturnHistory, InvoiceReturnComment
 from .serializers import InvoiceReturnSerializer, InvoiceReturnItemSerializer, InvoiceReturnAttachmentSerializer, InvoiceReturnRemarkSerializer, InvoiceReturnSummarySerializer, InvoiceReturnHistorySerializer, InvoiceReturnCommentSerializer
 
+def invoice_return_select_related(prefix=''):
+    return [f'{prefix}customer', f'{prefix}summary', f'{prefix}sales_order_reference__customer', f'{prefix}sales_order_reference__sales_rep']
+
+def invoice_return_prefetches(prefix=''):
+    return [
+        f'{prefix}items__product', f'{prefix}items__serial_numbers', f'{prefix}attachments', f'{prefix}remarks',
+        f'{prefix}history', f'{prefix}comments', *sales_order_prefetches(f'{prefix}sales_order_reference__'),
+    ]
+
+def invoice_return_queryset():
+    return InvoiceReturn.objects.select_related(*invoice_return_select_related()).prefetch_related(*invoice_return_prefetches())
+
+INVOICE_RETURN_LISTING = ListQuery(
+    filters={
+        'status': 'status', 'customer': search_filter('customer', 'customer_id'), 'customer_id': 'customer_id',
+        'date_from': 'invoice_return_date__gte', 'date_to': 'invoice_return_date__lte',
+    },
+    sorts=('invoice_return_date',),
+)
+
 class InvoiceReturnListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        invoice_returns = InvoiceReturn.objects.all().order_by('-invoice_return_date')
-        status_filter = request.query_params.get('status', 'All')
-        customer_filter = request.query_params.get('customer', 'All')
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        if status_filter != 'All':
-            invoice_returns = invoice_returns.filter(status=status_filter)
-        if customer_filter != 'All':
-            invoice_returns = invoice_returns.filter(customer__name__icontains=customer_filter)
-        if date_from:
-            invoice_returns = invoice_returns.filter(invoice_return_date__gte=date_from)
-        if date_to:
-            invoice_returns = invoice_returns.filter(invoice_return_date__lte=date_to)
-        serializer = InvoiceReturnSerializer(invoice_returns, many=True)
-        return Response(serializer.data)
+        listing = INVOICE_RETURN_LISTING.apply(invoice_return_queryset(), request, InvoiceReturnSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = InvoiceReturnSerializer(data=request.data)
@@ -832,7 +988,7 @@ class InvoiceReturnDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            invoice_return = InvoiceReturn.objects.get(id=pk)
+            invoice_return = invoice_return_queryset().get(id=pk)
             serializer = InvoiceReturnSerializer(invoice_return)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -893,24 +1049,24 @@ class InvoiceReturnItemView(APIView):
         except ObjectDoesNotExist:
             return Response({'error': 'Invoice Return Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
+def invoice_return_pdf_lines(invoice_return):
+    return [
+        f"Invoice Return ID: {invoice_return.INVOICE_RETURN_ID}",
+        f"Date: {invoice_return.invoice_return_date}",
+        f"Customer: {invoice_return.customer or ''}",
+    ]
+
+
 class InvoiceReturnPDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
         try:
             invoice_return = InvoiceReturn.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"Invoice Return ID: {invoice_return.INVOICE_RETURN_ID}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {invoice_return.invoice_return_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Customer: {invoice_return.customer.name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="invoice_return_{invoice_return.INVOICE_RETURN_ID}.pdf"'
-            return response
+            lines = invoice_return_pdf_lines(invoice_return)
+            return cached_pdf_response(
+                request, 'invoice_return', invoice_return, f'invoice_return_{invoice_return.INVOICE_RETURN_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Invoice Return not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -925,12 +1081,17 @@ class InvoiceReturnEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Invoice Return {invoice_return.INVOICE_RETURN_ID}'
             html_message = render_to_string('invoice_return_email.html', {'invoice_return': invoice_return})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Invoice Return not found'}, status=status.HTTP_404_NOT_FOUND)
+
+class AsyncInvoiceReturnEmailView(AsyncDocumentEmailView):
+    model = InvoiceReturn
+    template = 'invoice_return_email.html'
+    context_name = 'invoice_return'
+    subject = 'Invoice Return {document.INVOICE_RETURN_ID}'
+    label = 'Invoice Return'
         
 
 
@@ -948,25 +1109,30 @@ import io
 from .models import DeliveryNoteReturn, DeliveryNoteReturnItem, DeliveryNoteReturnAttachment, DeliveryNoteReturnRemark, DeliveryNoteReturnHistory, DeliveryNoteReturnComment
 from .serializers import DeliveryNoteReturnSerializer, DeliveryNoteReturnItemSerializer, DeliveryNoteReturnAttachmentSerializer, DeliveryNoteReturnRemarkSerializer, DeliveryNoteReturnHistorySerializer, DeliveryNoteReturnCommentSerializer
 
+def delivery_note_return_queryset():
+    return DeliveryNoteReturn.objects.select_related(
+        *invoice_return_select_related('invoice_return_reference__')
+    ).prefetch_related(
+        'items__product', 'items__serial_numbers', 'attachments', 'remarks', 'history', 'comments',
+        *invoice_return_prefetches('invoice_return_reference__'),
+    )
+
+DELIVERY_NOTE_RETURN_LISTING = ListQuery(
+    filters={
+        'status': 'status', 'customer': search_filter('customer', 'customer_id'), 'customer_id': 'customer_id',
+        'date_from': 'dnr_date__gte', 'date_to': 'dnr_date__lte',
+    },
+    sorts=('dnr_date',),
+)
+
 class DeliveryNoteReturnListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        returns = DeliveryNoteReturn.objects.all().order_by('-dnr_date')
-        status_filter = request.query_params.get('status', 'All')
-        customer_filter = request.query_params.get('customer', 'All')
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        if status_filter != 'All':
-            returns = returns.filter(status=status_filter)
-        if customer_filter != 'All':
-            returns = returns.filter(customer__name__icontains=customer_filter)
-        if date_from:
-            returns = returns.filter(dnr_date__gte=date_from)
-        if date_to:
-            returns = returns.filter(dnr_date__lte=date_to)
-        serializer = DeliveryNoteReturnSerializer(returns, many=True)
-        return Response(serializer.data)
+        listing = DELIVERY_NOTE_RETURN_LISTING.apply(delivery_note_return_queryset(), request, DeliveryNoteReturnSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = DeliveryNoteReturnSerializer(data=request.data)
@@ -980,7 +1146,7 @@ class DeliveryNoteReturnDetailView(APIView):
 
     def get(self, request, pk):
         try:
-            return_obj = DeliveryNoteReturn.objects.get(id=pk)
+            return_obj = delivery_note_return_queryset().get(id=pk)
             serializer = DeliveryNoteReturnSerializer(return_obj)
             return Response(serializer.data)
         except ObjectDoesNotExist:
@@ -1039,24 +1205,24 @@ class DeliveryNoteReturnItemView(APIView):
         except ObjectDoesNotExist:
             return Response({'error': 'Delivery Note Return Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
+def delivery_note_return_pdf_lines(return_obj):
+    return [
+        f"DNR ID: {return_obj.DNR_ID}",
+        f"Date: {return_obj.dnr_date}",
+        f"Customer: {return_obj.customer or ''}",
+    ]
+
+
 class DeliveryNoteReturnPDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
         try:
             return_obj = DeliveryNoteReturn.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"DNR ID: {return_obj.DNR_ID}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {return_obj.dnr_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Customer: {return_obj.customer.name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="delivery_note_return_{return_obj.DNR_ID}.pdf"'
-            return response
+            lines = delivery_note_return_pdf_lines(return_obj)
+            return cached_pdf_response(
+                request, 'delivery_note_return', return_obj, f'delivery_note_return_{return_obj.DNR_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Delivery Note Return not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1071,9 +1237,14 @@ class DeliveryNoteReturnEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Delivery Note Return {return_obj.DNR_ID}'
             html_message = render_to_string('delivery_note_return_email.html', {'delivery_note_return': return_obj})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
-            return Response({'error': 'Delivery Note Return not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({'error': 'Delivery Note Return not found'}, status=status.HTTP_404_NOT_FOUND)
+
+class AsyncDeliveryNoteReturnEmailView(AsyncDocumentEmailView):
+    model = DeliveryNoteReturn
+    template = 'delivery_note_return_email.html'
+    context_name = 'delivery_note_return'
+    subject = 'Delivery Note Return {document.DNR_ID}'
+    label = 'Delivery Note Return'
\ No newline at end of file
@@ -3,6 +3,10 @@ ASGI config for erp_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with uvicorn workers through gunicorn, see gunicorn.conf.py:
+
+    gunicorn -c erp_project/gunicorn.conf.py erp_project.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'erp_project.settings')
+os.environ.setdefault('ERP_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
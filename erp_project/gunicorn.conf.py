@@ -0,0 +1,20 @@
+# Gunicorn settings for both run modes.
+#
+# ASGI (default), uvicorn workers serving the async email, attachment and dashboard views:
+#   gunicorn -c erp_project/gunicorn.conf.py erp_project.asgi:application
+# WSGI, classic sync workers:
+#   ERP_WORKER_CLASS=sync gunicorn -c erp_project/gunicorn.conf.py erp_project.wsgi:application
+#
+# Compare the two with `python manage.py load_test`.
+import multiprocessing
+import os
+
+bind = os.environ.get('ERP_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('ERP_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+workers = int(os.environ.get('ERP_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Sync workers serve one request per thread; ignored by uvicorn workers
+threads = int(os.environ.get('ERP_THREADS', 1))
+timeout = int(os.environ.get('ERP_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('ERP_ACCESS_LOG', '-')
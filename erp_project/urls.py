@@ -21,6 +21,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/',include('core.urls')),
     path('',include('crm.urls')),
+    path('',include('finance.urls')),
+    path('',include('purchase.urls')),
       
      
 
@@ -0,0 +1,112 @@
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from core.pdf_cache import cache_path, document_version, render_lines, store_pdf
+from crm.models import Invoice
+from crm.views import invoice_pdf_lines
+from .models import CreditNote, DebitNote
+
+
+def credit_note_pdf_lines(credit_note):
+    return [
+        f"Credit Note ID: {credit_note.CREDIT_NOTE_ID}",
+        f"Date: {credit_note.credit_note_date}",
+        f"Customer: {credit_note.customer or ''}",
+    ]
+
+
+def debit_note_pdf_lines(debit_note):
+    return [
+        f"Debit Note ID: {debit_note.DEBIT_NOTE_ID}",
+        f"Date: {debit_note.debit_note_date}",
+        f"Supplier: {debit_note.supplier or ''}",
+    ]
+
+
+# doc type -> (model, number field, date field, party field, status field, pdf lines)
+EXPORT_TYPES = {
+    'invoice': (Invoice, 'INVOICE_ID', 'invoice_date', 'customer', 'invoice_status', invoice_pdf_lines),
+    'credit_note': (CreditNote, 'CREDIT_NOTE_ID', 'credit_note_date', 'customer', 'invoice_status', credit_note_pdf_lines),
+    'debit_note': (DebitNote, 'DEBIT_NOTE_ID', 'debit_note_date', 'supplier', 'payment_status', debit_note_pdf_lines),
+}
+ITERATOR_CHUNK_SIZE = 200
+
+
+def export_queryset(doc_type, date_from=None, date_to=None, customer=None, supplier=None, status=None):
+    model, _, date_field, party_field, status_field, _ = EXPORT_TYPES[doc_type]
+    party = customer if party_field == 'customer' else supplier
+    queryset = model.objects.select_related(party_field).prefetch_related('items')
+    if date_from:
+        queryset = queryset.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{date_field}__lte': date_to})
+    if party:
+        queryset = queryset.filter(**{f'{party_field}_id': party})
+    if status:
+        queryset = queryset.filter(**{status_field: status})
+    return queryset.order_by(date_field, 'id')
+
+
+def _documents(doc_types, filters):
+    for doc_type in doc_types:
+        _, number_field, _, _, _, pdf_lines = EXPORT_TYPES[doc_type]
+        queryset = export_queryset(doc_type, **filters)
+        for document in queryset.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            lines = pdf_lines(document)
+            version = document_version(document, extra=lines)
+            name = f'{doc_type}/{doc_type}_{getattr(document, number_field)}.pdf'
+            yield name, document.pk, cache_path(doc_type, document.pk, version), lines
+
+
+def _rendered(documents, executor, window):
+    # Keeps at most `window` renders in flight so memory stays flat however many
+    # documents are selected; cached PDFs are read from disk instead of rendered
+    pending = deque()
+    for name, pk, path, lines in documents:
+        future = None if os.path.exists(path) else executor.submit(render_lines, lines)
+        pending.append((name, pk, path, future))
+        while len(pending) > window or (pending and pending[0][3] is None):
+            yield _finish(*pending.popleft())
+    while pending:
+        yield _finish(*pending.popleft())
+
+
+def _finish(name, pk, path, future):
+    if future is not None:
+        store_pdf(path, pk, future.result())
+    return name, path
+
+
+class _ZipStream:
+    # Write-only file object that hands each written chunk back to the generator
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+
+def stream_zip(doc_types, filters, workers=None):
+    workers = workers or getattr(settings, 'PDF_EXPORT_WORKERS', None) or os.cpu_count() or 1
+    stream = _ZipStream()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for name, path in _rendered(_documents(doc_types, filters), executor, workers * 2):
+                archive.write(path, name)
+                yield stream.drain()
+        yield stream.drain()
+    finally:
+        executor.shutdown(cancel_futures=True)
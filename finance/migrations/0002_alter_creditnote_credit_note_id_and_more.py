@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='creditnote',
+            name='CREDIT_NOTE_ID',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='debitnote',
+            name='DEBIT_NOTE_ID',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_documentsequence'),
+        ('crm', '0004_deliverynote_crm_dn_date_id_idx_and_more'),
+        ('finance', '0002_alter_creditnote_credit_note_id_and_more'),
+        ('purchase', '0002_stockreturn_stockreceiptitem_discount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditnote',
+            index=models.Index(fields=['credit_note_date', 'id'], name='finance_cn_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debitnote',
+            index=models.Index(fields=['debit_note_date', 'id'], name='finance_dbn_date_id_idx'),
+        ),
+    ]
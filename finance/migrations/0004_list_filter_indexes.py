@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_list_filter_indexes'),
+        ('crm', '0005_list_filter_indexes'),
+        ('finance', '0003_creditnote_finance_cn_date_id_idx_and_more'),
+        ('purchase', '0004_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditnote',
+            index=models.Index(fields=['invoice_status', 'credit_note_date', 'id'], name='finance_cn_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditnote',
+            index=models.Index(fields=['customer', 'credit_note_date', 'id'], name='finance_cn_cust_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debitnote',
+            index=models.Index(fields=['payment_status', 'debit_note_date', 'id'], name='finance_dbn_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debitnote',
+            index=models.Index(fields=['supplier', 'debit_note_date', 'id'], name='finance_dbn_supp_date_idx'),
+        ),
+    ]
@@ -4,16 +4,18 @@ from django.contrib.auth import get_user_model
 from core.models import Branch, Candidate, Department,Supplier
 from crm.models import Invoice,Customer, Product
 from purchase.models import PurchaseOrder
+from core.sequences import next_document_number
+from core.totals import amount, line_deltas, line_sums, stored_line
+from django.db import transaction
+from django.db.models import F
 
 User = get_user_model()
 
-def generate_credit_note_id():
-    last_cn = CreditNote.objects.order_by('-id').first()
-    return f'CRN-{str(last_cn.id + 1).zfill(4) if last_cn else "0001"}' if last_cn else "CRN-0001"
+def generate_credit_note_id(branch=None):
+    return next_document_number('credit_note', branch=branch)
 
-def generate_debit_note_id():
-    last_dn = DebitNote.objects.order_by('-id').first()
-    return f'DBN-{str(last_dn.id + 1).zfill(4) if last_dn else "0001"}' if last_dn else "DBN-0001"
+def generate_debit_note_id(branch=None):
+    return next_document_number('debit_note', branch=branch)
 
 class CreditNoteAttachment(models.Model):
     credit_note = models.ForeignKey('CreditNote', on_delete=models.CASCADE, related_name='attachments')
@@ -26,7 +28,7 @@ class CreditNoteRemark(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 class CreditNote(models.Model):
-    CREDIT_NOTE_ID = models.CharField(max_length=20, unique=True, editable=False, default=generate_credit_note_id)
+    CREDIT_NOTE_ID = models.CharField(max_length=20, unique=True, editable=False)
     credit_note_date = models.DateField(default=timezone.now)
     invoice_reference = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True)
     created_by = models.ForeignKey(Candidate, on_delete=models.SET_NULL, null=True, limit_choices_to={'department__department_name__icontains': 'sales'})
@@ -43,6 +45,18 @@ class CreditNote(models.Model):
     payment_status = models.CharField(max_length=20, choices=[('Paid', 'Paid'), ('Partial', 'Partial'), ('Unpaid', 'Unpaid')], default='Unpaid')
     invoice_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['credit_note_date', 'id'], name='finance_cn_date_id_idx'),
+            models.Index(fields=['invoice_status', 'credit_note_date', 'id'], name='finance_cn_status_date_idx'),
+            models.Index(fields=['customer', 'credit_note_date', 'id'], name='finance_cn_cust_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.CREDIT_NOTE_ID:
+            self.CREDIT_NOTE_ID = generate_credit_note_id(self.branch if self.branch_id else None)
+        super().save(*args, **kwargs)
+
 class CreditNoteItem(models.Model):
     credit_note = models.ForeignKey(CreditNote, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
@@ -61,8 +75,19 @@ class CreditNoteItem(models.Model):
             self.unit_price = self.product.unit_price or 0.00
             self.tax = self.product.tax or 0.00
             self.discount = self.product.discount or 0.00
-        self.total = self.returned_qty * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100)
-        super().save(*args, **kwargs)
+        # Rounded here as the line deltas are, so the stored line and the running totals agree
+        self.total = amount(self.returned_qty * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100))
+        with transaction.atomic():
+            previous = stored_line(self, 'credit_note', 'total', 'tax')
+            super().save(*args, **kwargs)
+            CreditNotePaymentRefund.apply_line_deltas(line_deltas(previous, (self.credit_note_id, self.total, self.tax)))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = stored_line(self, 'credit_note', 'total', 'tax')
+            result = super().delete(*args, **kwargs)
+            CreditNotePaymentRefund.apply_line_deltas(line_deltas(previous, None))
+        return result
 
 class CreditNotePaymentRefund(models.Model):
     credit_note = models.OneToOneField(CreditNote, on_delete=models.CASCADE, related_name='payment_refund')
@@ -79,7 +104,11 @@ class CreditNotePaymentRefund(models.Model):
         credit_note = self.credit_note
         self.balance_due_by_customer = credit_note.invoice_total - self.amount_paid_by_customer
         if credit_note.invoice_reference and credit_note.invoice_reference.summary:
-            self.invoice_return_amount = sum(item.total for item in credit_note.items.all())  # Simplified
+            # invoice_return_amount is maintained by CreditNoteItem; only a new refund sums the lines
+            stored = CreditNotePaymentRefund.objects.filter(pk=self.pk).values_list('invoice_return_amount', flat=True).first() if self.pk else None
+            if stored is None:
+                stored = credit_note.items.aggregate(**line_sums())['line_total']
+            self.invoice_return_amount = stored
             self.balance_to_refund = self.invoice_return_amount - self.refund_paid
             if self.refund_mode in ['Refund', 'Refund & Adjust'] and self.invoice_return_amount > 0:
                 self.editable = True
@@ -87,6 +116,20 @@ class CreditNotePaymentRefund(models.Model):
                 self.editable = False
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def derived_totals():
+        return {'balance_to_refund': F('invoice_return_amount') - F('refund_paid')}
+
+    @staticmethod
+    def apply_line_deltas(deltas):
+        # Only refunds whose credit note references a summarised invoice track the return amount
+        for credit_note_id, (total_delta, _) in deltas.items():
+            refunds = CreditNotePaymentRefund.objects.filter(
+                credit_note_id=credit_note_id, credit_note__invoice_reference__summary__isnull=False,
+            )
+            if refunds.update(invoice_return_amount=F('invoice_return_amount') + total_delta):
+                refunds.update(**CreditNotePaymentRefund.derived_totals())
+
 class DebitNoteAttachment(models.Model):
     debit_note = models.ForeignKey('DebitNote', on_delete=models.CASCADE, related_name='attachments')
     file = models.FileField(upload_to='debit_note_attachments/')
@@ -98,7 +141,7 @@ class DebitNoteRemark(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
 
 class DebitNote(models.Model):
-    DEBIT_NOTE_ID = models.CharField(max_length=20, unique=True, editable=False, default=generate_debit_note_id)
+    DEBIT_NOTE_ID = models.CharField(max_length=20, unique=True, editable=False)
     debit_note_date = models.DateField(default=timezone.now)
     po_reference = models.ForeignKey(PurchaseOrder, on_delete=models.SET_NULL, null=True, blank=True)
     created_by = models.ForeignKey(Candidate, on_delete=models.SET_NULL, null=True, limit_choices_to={'department__department_name__icontains': 'sales'})
@@ -114,6 +157,18 @@ class DebitNote(models.Model):
     credit_limit = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     purchase_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['debit_note_date', 'id'], name='finance_dbn_date_id_idx'),
+            models.Index(fields=['payment_status', 'debit_note_date', 'id'], name='finance_dbn_status_date_idx'),
+            models.Index(fields=['supplier', 'debit_note_date', 'id'], name='finance_dbn_supp_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.DEBIT_NOTE_ID:
+            self.DEBIT_NOTE_ID = generate_debit_note_id(self.branch if self.branch_id else None)
+        super().save(*args, **kwargs)
+
 class DebitNoteItem(models.Model):
     debit_note = models.ForeignKey(DebitNote, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
@@ -156,4 +211,4 @@ class DebitNotePaymentRecover(models.Model):
                 self.editable = True
             else:
                 self.editable = False
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
\ No newline at end of file
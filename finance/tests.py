@@ -1,3 +1,102 @@
-from django.test import TestCase
+import io
+from datetime import date
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.management.commands.reconcile_totals import CHECKS, find_drift
+from core.models import Supplier
+from crm.models import Invoice, OrderSummary
+from .models import CreditNote, CreditNoteItem, CreditNotePaymentRefund, DebitNote
+
+
+class DebitNoteListingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='accounts'))
+        due_dates = [None, date(2025, 3, 1), None, date(2025, 1, 1), date(2025, 3, 1), None, date(2025, 2, 1)]
+        self.notes = [DebitNote.objects.create(due_date=due_date) for due_date in due_dates]
+
+    def walk(self, sort, direction, params):
+        ids = []
+        while True:
+            response = self.client.get('/debit-notes/', {'sort': sort, 'per_page': 2, **params})
+            self.assertEqual(response.status_code, 200)
+            page = [row['id'] for row in response.data['results']]
+            ids = page + ids if direction == 'previous_cursor' else ids + page
+            if not response.data[direction]:
+                return ids, response.data
+            params = {'cursor': response.data[direction]}
+
+    def test_cursor_pages_through_null_sort_keys(self):
+        for sort in ('due_date', '-due_date'):
+            with self.subTest(sort=sort):
+                ids, last_page = self.walk(sort, 'next_cursor', {})
+                self.assertEqual(sorted(ids), sorted(note.pk for note in self.notes))
+                # Undated notes rank above every date: last oldest-first, first newest-first
+                undated = [note.pk for note in self.notes if note.due_date is None]
+                if sort == 'due_date':
+                    self.assertEqual(ids[-3:], undated)
+                else:
+                    self.assertEqual(ids[:3], undated[::-1])
+                back, _ = self.walk(sort, 'previous_cursor', {'cursor': last_page['previous_cursor']})
+                self.assertEqual(back + [row['id'] for row in last_page['results']], ids)
+
+
+class DocumentExportTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PDF_EXPORT_WORKERS=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='accounts'))
+
+    def test_export_streams_a_zip_of_pdfs(self):
+        supplier = Supplier.objects.create(name='Acme')
+        debit_notes = [DebitNote.objects.create(supplier=supplier) for _ in range(2)]
+        response = self.client.get('/documents/export/', {'types': 'debit_note', 'supplier': supplier.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(f'debit_note/debit_note_{note.DEBIT_NOTE_ID}.pdf' for note in debit_notes),
+        )
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+
+    def test_unknown_type_is_rejected(self):
+        response = self.client.get('/documents/export/', {'types': 'receipt'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CreditNoteRefundTotalsTests(TestCase):
+    def test_refund_amount_follows_line_changes(self):
+        zero = Decimal('0')
+        invoice = Invoice.objects.create()
+        OrderSummary.objects.create(
+            invoice=invoice, global_discount=zero, shipping_charges=zero, rounding_adjustment=zero,
+            credit_note_applied=zero, amount_paid=zero,
+        )
+        credit_note = CreditNote.objects.create(invoice_reference=invoice, invoice_total=zero)
+        refund = CreditNotePaymentRefund.objects.create(credit_note=credit_note, amount_paid_by_customer=zero, refund_paid=zero)
+        first = CreditNoteItem.objects.create(
+            credit_note=credit_note, returned_qty=3, unit_price=Decimal('12.15'), tax=Decimal('18'), discount=Decimal('2.5'),
+        )
+        second = CreditNoteItem.objects.create(
+            credit_note=credit_note, returned_qty=1, unit_price=Decimal('0.15'), tax=zero, discount=Decimal('70'),
+        )
+        first.returned_qty = 2
+        first.save()
+        second.delete()
+        queryset, prefix, fields = CHECKS['credit note refunds']
+        self.assertEqual(list(find_drift(queryset, prefix, fields)), [])
+        refund.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual((refund.invoice_return_amount, refund.balance_to_refund), (first.total, first.total))
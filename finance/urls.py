@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import CreditNoteListView, CreditNoteDetailView, CreditNoteItemView, CreditNotePDFView, CreditNoteEmailView, DebitNoteListView, DebitNoteDetailView, DebitNoteItemView, DebitNotePDFView, DebitNoteEmailView
+from core.async_views import run_mode_view
+from .views import CreditNoteListView, CreditNoteDetailView, CreditNoteItemView, CreditNotePDFView, CreditNoteEmailView, AsyncCreditNoteEmailView, DebitNoteListView, DebitNoteDetailView, DebitNoteItemView, DebitNotePDFView, DebitNoteEmailView, AsyncDebitNoteEmailView, DocumentExportView
 
 urlpatterns = [
     # CreditNote URLs
@@ -7,11 +8,13 @@ urlpatterns = [
     path('credit-notes/<int:pk>/', CreditNoteDetailView.as_view(), name='credit-note-detail'),
     path('credit-notes/<int:pk>/items/', CreditNoteItemView.as_view(), name='credit-note-items'),
     path('credit-notes/<int:pk>/pdf/', CreditNotePDFView.as_view(), name='credit-note-pdf'),
-    path('credit-notes/<int:pk>/email/', CreditNoteEmailView.as_view(), name='credit-note-email'),
+    path('credit-notes/<int:pk>/email/', run_mode_view(CreditNoteEmailView, AsyncCreditNoteEmailView), name='credit-note-email'),
     # DebitNote URLs
     path('debit-notes/', DebitNoteListView.as_view(), name='debit-note-list'),
     path('debit-notes/<int:pk>/', DebitNoteDetailView.as_view(), name='debit-note-detail'),
     path('debit-notes/<int:pk>/items/', DebitNoteItemView.as_view(), name='debit-note-items'),
     path('debit-notes/<int:pk>/pdf/', DebitNotePDFView.as_view(), name='debit-note-pdf'),
-    path('debit-notes/<int:pk>/email/', DebitNoteEmailView.as_view(), name='debit-note-email'),
+    path('debit-notes/<int:pk>/email/', run_mode_view(DebitNoteEmailView, AsyncDebitNoteEmailView), name='debit-note-email'),
+    # Bulk PDF export
+    path('documents/export/', DocumentExportView.as_view(), name='document-export'),
 ]
\ No newline at end of file
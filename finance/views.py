@@ -4,7 +4,14 @@ from rest_framework import status, permissions
 from .models import CreditNote, CreditNoteItem, CreditNoteAttachment, CreditNoteRemark, CreditNotePaymentRefund, DebitNote, DebitNoteItem, DebitNoteAttachment, DebitNoteRemark, DebitNotePaymentRecover
 from .serializers import CreditNoteSerializer, CreditNoteItemSerializer, CreditNoteAttachmentSerializer, CreditNoteRemarkSerializer, CreditNotePaymentRefundSerializer, DebitNoteSerializer, DebitNoteItemSerializer, DebitNoteAttachmentSerializer, DebitNoteRemarkSerializer, DebitNotePaymentRecoverSerializer
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse
+from core.outbox import queue_email
+from core.async_views import AsyncDocumentEmailView
+from core.listing import ListQuery
+from core.search import search_filter
+from core.pdf_cache import cached_pdf_response, render_lines
+from .exports import EXPORT_TYPES, credit_note_pdf_lines, debit_note_pdf_lines, stream_zip
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
@@ -13,13 +20,23 @@ from django.template.loader import render_to_string
 import io
 from django.utils import timezone
 
+CREDIT_NOTE_LISTING = ListQuery(
+    filters={
+        'status': 'invoice_status', 'payment_status': 'payment_status',
+        'customer': search_filter('customer', 'customer_id'), 'customer_id': 'customer_id',
+        'date_from': 'credit_note_date__gte', 'date_to': 'credit_note_date__lte',
+    },
+    sorts=('credit_note_date', 'due_date'),
+)
+
 class CreditNoteListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        credit_notes = CreditNote.objects.all().order_by('-credit_note_date')
-        serializer = CreditNoteSerializer(credit_notes, many=True)
-        return Response(serializer.data)
+        listing = CREDIT_NOTE_LISTING.apply(CreditNote.objects.all(), request, CreditNoteSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         # Ensure created_by is a valid Candidate from sales department
@@ -91,18 +108,10 @@ class CreditNotePDFView(APIView):
     def get(self, request, pk):
         try:
             credit_note = CreditNote.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"Credit Note ID: {credit_note.CREDIT_NOTE_ID}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {credit_note.credit_note_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Customer: {credit_note.customer.name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="credit_note_{credit_note.CREDIT_NOTE_ID}.pdf"'
-            return response
+            lines = credit_note_pdf_lines(credit_note)
+            return cached_pdf_response(
+                request, 'credit_note', credit_note, f'credit_note_{credit_note.CREDIT_NOTE_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Credit Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -117,20 +126,34 @@ class CreditNoteEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Credit Note {credit_note.CREDIT_NOTE_ID}'
             html_message = render_to_string('credit_note_email_template.html', {'credit_note': credit_note})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Credit Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class AsyncCreditNoteEmailView(AsyncDocumentEmailView):
+    model = CreditNote
+    template = 'credit_note_email_template.html'
+    context_name = 'credit_note'
+    subject = 'Credit Note {document.CREDIT_NOTE_ID}'
+    label = 'Credit Note'
+
+DEBIT_NOTE_LISTING = ListQuery(
+    filters={
+        'status': 'payment_status', 'supplier': 'supplier_id',
+        'date_from': 'debit_note_date__gte', 'date_to': 'debit_note_date__lte',
+    },
+    sorts=('debit_note_date', 'due_date'),
+)
+
 class DebitNoteListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        debit_notes = DebitNote.objects.all().order_by('-debit_note_date')
-        serializer = DebitNoteSerializer(debit_notes, many=True)
-        return Response(serializer.data)
+        listing = DEBIT_NOTE_LISTING.apply(DebitNote.objects.all(), request, DebitNoteSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         request_data = request.data.copy()
@@ -201,18 +224,10 @@ class DebitNotePDFView(APIView):
     def get(self, request, pk):
         try:
             debit_note = DebitNote.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = [
-                Paragraph(f"Debit Note ID: {debit_note.DEBIT_NOTE_ID}", style={'fontName': 'Helvetica-Bold', 'fontSize': 14}),
-                Paragraph(f"Date: {debit_note.debit_note_date}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-                Paragraph(f"Supplier: {debit_note.supplier.name}", style={'fontName': 'Helvetica', 'fontSize': 12}),
-            ]
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="debit_note_{debit_note.DEBIT_NOTE_ID}.pdf"'
-            return response
+            lines = debit_note_pdf_lines(debit_note)
+            return cached_pdf_response(
+                request, 'debit_note', debit_note, f'debit_note_{debit_note.DEBIT_NOTE_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Debit Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -227,9 +242,45 @@ class DebitNoteEmailView(APIView):
                 return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
             subject = f'Debit Note {debit_note.DEBIT_NOTE_ID}'
             html_message = render_to_string('debit_note_email_template.html', {'debit_note': debit_note})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
-            return Response({'error': 'Debit Note not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({'error': 'Debit Note not found'}, status=status.HTTP_404_NOT_FOUND)
+
+class AsyncDebitNoteEmailView(AsyncDocumentEmailView):
+    model = DebitNote
+    template = 'debit_note_email_template.html'
+    context_name = 'debit_note'
+    subject = 'Debit Note {document.DEBIT_NOTE_ID}'
+    label = 'Debit Note'
+
+class DocumentExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        if params.get('types'):
+            doc_types = [doc_type.strip() for doc_type in params['types'].split(',') if doc_type.strip()]
+        elif params.get('customer'):
+            doc_types = ['invoice', 'credit_note']
+        elif params.get('supplier'):
+            doc_types = ['debit_note']
+        else:
+            doc_types = list(EXPORT_TYPES)
+        unknown = [doc_type for doc_type in doc_types if doc_type not in EXPORT_TYPES]
+        if unknown or not doc_types:
+            return Response({'error': f'types must be any of {list(EXPORT_TYPES)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {'customer': params.get('customer'), 'supplier': params.get('supplier'), 'status': params.get('status')}
+        for field in ('date_from', 'date_to'):
+            value = params.get(field)
+            filters[field] = parse_date(value) if value else None
+            if value and filters[field] is None:
+                return Response({'error': f'{field} must be a date (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        for field in ('customer', 'supplier'):
+            if filters[field] and not filters[field].isdigit():
+                return Response({'error': f'{field} must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(stream_zip(doc_types, filters), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="documents.zip"'
+        return response
@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     PurchaseOrder, PurchaseOrderItem, PurchaseOrderHistory, PurchaseOrderComment,
     StockReceipt, StockReceiptItem, StockReceiptAttachment, StockReceiptRemark,
-    SerialNumber, BatchNumber, BatchSerialNumber, StockReturn, StockReturnItem,
+    SerialNumber, SerialStock, BatchNumber, BatchSerialNumber, StockReturn, StockReturnItem,
     StockReturnAttachment, StockReturnRemark, SerialNumberReturn
 )
 
@@ -62,6 +62,13 @@ class SerialNumberAdmin(admin.ModelAdmin):
     search_fields = ('serial_no',)
     autocomplete_fields = ['stock_receipt_item']
 
+@admin.register(SerialStock)
+class SerialStockAdmin(admin.ModelAdmin):
+    list_display = ('serial_no', 'product', 'warehouse', 'status', 'delivery_note_item', 'updated_at')
+    list_filter = ('status', 'warehouse')
+    search_fields = ('serial_no', 'product__name')
+    raw_id_fields = ('serial_number', 'delivery_note_item')
+
 @admin.register(BatchNumber)
 class BatchNumberAdmin(admin.ModelAdmin):
     list_display = ('stock_receipt_item', 'batch_no', 'batch_qty', 'mfg_date', 'expiry_date')
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from purchase.reorder import draft_purchase_orders, plan_reorders
+
+
+class Command(BaseCommand):
+    help = 'Draft one purchase order per supplier for products below their reorder level'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the shortfalls without drafting orders')
+        parser.add_argument('--supplier', type=int, action='append', help='Only reorder from this supplier id (repeatable)')
+        parser.add_argument('--lead-days', type=int, default=7, help='Days from today to the expected delivery date')
+        parser.add_argument('--currency', default='INR', help='Currency of the drafted orders')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        plan, unassigned = plan_reorders(options['supplier'])
+        lines = sum(len(rows) for rows in plan.values())
+        self.stdout.write(f'{lines} product(s) below reorder level across {len(plan)} supplier(s) '
+                          f'in {time.monotonic() - started:.1f}s')
+        for (supplier_id, supplier_name), rows in sorted(plan.items()):
+            self.stdout.write(f'  {supplier_name} (#{supplier_id}): {len(rows)} line(s), '
+                              f"{sum(row['order_qty'] for row in rows)} unit(s)")
+            if options['verbosity'] > 1:
+                for row in rows:
+                    self.stdout.write(f"    {row['name']} (#{row['id']}): on hand {row['quantity']}, "
+                                      f"on order {row['on_order']}, reorder at {row['reorder_level']} -> order {row['order_qty']}")
+        if unassigned:
+            self.stdout.write(self.style.WARNING(f'{len(unassigned)} product(s) below reorder level have no supplier'))
+            if options['verbosity'] > 1:
+                for row in unassigned:
+                    self.stdout.write(f"    {row['name']} (#{row['id']}): order {row['order_qty']}")
+
+        if options['dry_run'] or not plan:
+            return
+        orders = draft_purchase_orders(plan, lead_days=options['lead_days'], currency=options['currency'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Drafted {len(orders)} purchase order(s): {', '.join(order.PO_ID for order in orders)} "
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from purchase.serial_stock import rebuild_serial_stock
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the status of every receipt serial from its deliveries and customer returns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_serial_stock(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the status of {created} serial(s)'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_documentsequence'),
+        ('purchase', '0002_stockreturn_stockreceiptitem_discount_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['PO_date', 'id'], name='purchase_po_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreceipt',
+            index=models.Index(fields=['received_date', 'id'], name='purchase_grn_date_id_idx'),
+        ),
+    ]
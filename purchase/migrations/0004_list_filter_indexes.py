@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_list_filter_indexes'),
+        ('purchase', '0003_purchaseorder_purchase_po_date_id_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'PO_date', 'id'], name='purchase_po_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier', 'PO_date', 'id'], name='purchase_po_supp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreceipt',
+            index=models.Index(fields=['status', 'received_date', 'id'], name='purchase_grn_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreceipt',
+            index=models.Index(fields=['supplier', 'received_date', 'id'], name='purchase_grn_supp_date_idx'),
+        ),
+    ]
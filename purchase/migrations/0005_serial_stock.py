@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_stock_ledger'),
+        ('crm', '0005_list_filter_indexes'),
+        ('purchase', '0004_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialStock',
+            fields=[
+                ('serial_number', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock', serialize=False, to='purchase.serialnumber')),
+                ('serial_no', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('in_stock', 'In Stock'), ('reserved', 'Reserved'), ('delivered', 'Delivered'), ('returned', 'Returned')], default='in_stock', max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('delivery_note_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='serial_stock', to='crm.deliverynoteitem')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='serial_stock', to='core.product')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Serial Stock',
+                'verbose_name_plural': 'Serial Stock',
+                'indexes': [models.Index(fields=['product', 'status', 'serial_number'], name='purchase_serial_avail_idx')],
+            },
+        ),
+    ]
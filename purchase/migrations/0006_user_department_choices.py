@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchase', '0005_serial_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockreceipt',
+            name='qc_done_by',
+            field=models.ForeignKey(blank=True, limit_choices_to={'profile__department__department_name': 'Sales'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='qc_receipts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='stockreceipt',
+            name='received_by',
+            field=models.ForeignKey(blank=True, limit_choices_to={'profile__department__department_name': 'Sales'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_receipts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='stockreturn',
+            name='return_initiated_by',
+            field=models.ForeignKey(blank=True, limit_choices_to={'profile__department__department_name': 'Sales'}, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
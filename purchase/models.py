@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from core.models import Supplier, Product
+from core.sequences import next_document_number
+from core.stock import locked_status, post_document, sync_document_stock, sync_line_stock
 
 def get_default_po_date():
     return timezone.now().date()
@@ -30,11 +33,16 @@ class PurchaseOrder(models.Model):
     total_order_value = models.DecimalField(max_digits=10, decimal_places=2)
     upload_file_path = models.FileField(upload_to='upload/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['PO_date', 'id'], name='purchase_po_date_id_idx'),
+            models.Index(fields=['status', 'PO_date', 'id'], name='purchase_po_status_date_idx'),
+            models.Index(fields=['supplier', 'PO_date', 'id'], name='purchase_po_supp_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.PO_ID:
-            last_po = PurchaseOrder.objects.order_by('-id').first()
-            new_id = f'PO-{timezone.now().strftime("%Y%m%d")}-{str(last_po.id + 1).zfill(3) if last_po else "001"}'
-            self.PO_ID = new_id
+            self.PO_ID = next_document_number('purchase_order')
         super().save(*args, **kwargs)
 
 class PurchaseOrderItem(models.Model):
@@ -90,20 +98,39 @@ class StockReceipt(models.Model):
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True)
     supplier_dn_no = models.CharField(max_length=100, blank=True)
     supplier_invoice_no = models.CharField(max_length=100, blank=True)
-    received_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='received_receipts', limit_choices_to={'department__department_name': 'Sales'})
-    qc_done_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='qc_receipts', limit_choices_to={'department__department_name': 'Sales'})
+    received_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='received_receipts', limit_choices_to={'profile__department__department_name': 'Sales'})
+    qc_done_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='qc_receipts', limit_choices_to={'profile__department__department_name': 'Sales'})
     status = models.CharField(
         max_length=20,
         choices=[('Draft', 'Draft'), ('Submitted', 'Submitted'), ('Returned', 'Returned'), ('Cancelled', 'Cancelled')],
         default='Draft'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['received_date', 'id'], name='purchase_grn_date_id_idx'),
+            models.Index(fields=['status', 'received_date', 'id'], name='purchase_grn_status_date_idx'),
+            models.Index(fields=['supplier', 'received_date', 'id'], name='purchase_grn_supp_date_idx'),
+        ]
+
+    # Accepted quantities are on hand while the receipt is in one of these statuses
+    STOCK_POSTED_STATUSES = ('Submitted', 'Returned')
+
     def save(self, *args, **kwargs):
         if not self.GRN_ID:
-            last_grn = StockReceipt.objects.order_by('-id').first()
-            new_id = f'GRN-{timezone.now().strftime("%Y%m%d")}-{str(last_grn.id + 1).zfill(4) if last_grn else "0001"}'
-            self.GRN_ID = new_id
-        super().save(*args, **kwargs)
+            self.GRN_ID = next_document_number('stock_receipt')
+        with transaction.atomic():
+            previous_status = locked_status(self, 'status')
+            super().save(*args, **kwargs)
+            sync_document_stock(self, 'stock_receipt', previous_status, self.status)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            post_document('stock_receipt', self.pk, [])
+            return super().delete(*args, **kwargs)
+
+    def stock_lines(self):
+        return self.items.values_list('product_id', Coalesce('warehouse_id', 'product__warehouse_id'), 'accepted_qty')
 
 class StockReceiptItem(models.Model):
     stock_receipt = models.ForeignKey(StockReceipt, on_delete=models.CASCADE, related_name='items')
@@ -127,12 +154,56 @@ class StockReceiptItem(models.Model):
         if self.rejected_qty < 0:
             self.rejected_qty = 0
         self.total = self.qty_received * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sync_line_stock(self.stock_receipt, 'stock_receipt', 'status')
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            sync_line_stock(self.stock_receipt, 'stock_receipt', 'status')
+            return result
 
 class SerialNumber(models.Model):
     stock_receipt_item = models.ForeignKey(StockReceiptItem, on_delete=models.CASCADE, related_name='serial_numbers')
     serial_no = models.CharField(max_length=50, unique=True)
 
+    def save(self, *args, **kwargs):
+        from .serial_stock import stock_for_serials
+        created = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created:
+                SerialStock.objects.bulk_create(stock_for_serials(self.stock_receipt_item, [self]))
+
+class SerialStock(models.Model):
+    # Where each receipt serial stands, kept by purchase.serial_stock so picking serials
+    # for a delivery is a range read on (product, status) instead of an anti-join
+    STATUS_CHOICES = [
+        ('in_stock', 'In Stock'),
+        ('reserved', 'Reserved'),
+        ('delivered', 'Delivered'),
+        ('returned', 'Returned'),
+    ]
+    serial_number = models.OneToOneField(SerialNumber, on_delete=models.CASCADE, primary_key=True, related_name='stock')
+    serial_no = models.CharField(max_length=50)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='serial_stock')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='in_stock')
+    # The delivery line the serial is reserved for or was last delivered on
+    delivery_note_item = models.ForeignKey('crm.DeliveryNoteItem', on_delete=models.SET_NULL, null=True, blank=True, related_name='serial_stock')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'status', 'serial_number'], name='purchase_serial_avail_idx'),
+        ]
+        verbose_name = "Serial Stock"
+        verbose_name_plural = "Serial Stock"
+
+    def __str__(self):
+        return f"{self.serial_no} ({self.status})"
+
 class BatchNumber(models.Model):
     stock_receipt_item = models.ForeignKey(StockReceiptItem, on_delete=models.CASCADE, related_name='batch_numbers')
     batch_no = models.CharField(max_length=50, unique=True)
@@ -171,7 +242,7 @@ class StockReturn(models.Model):
     GRN_reference = models.ForeignKey(StockReceipt, on_delete=models.SET_NULL, null=True, blank=True)
     received_date = models.DateField()
     return_date = models.DateField(default=get_default_srn_date)
-    return_initiated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, limit_choices_to={'department__department_name': 'Sales'})
+    return_initiated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, limit_choices_to={'profile__department__department_name': 'Sales'})
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True)
     status = models.CharField(
         max_length=20,
@@ -185,16 +256,31 @@ class StockReturn(models.Model):
     rounding_adjustment = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     amount_to_recover = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    # Returned quantities have left stock while the return is in one of these statuses
+    STOCK_POSTED_STATUSES = ('Submitted', 'Partially Returned')
+
     def save(self, *args, **kwargs):
         if not self.SRN_ID:
-            last_srn = StockReturn.objects.order_by('-id').first()
-            new_id = f'SRN-{timezone.now().strftime("%Y%m%d")}-{str(last_srn.id + 1).zfill(4) if last_srn else "0001"}'
-            self.SRN_ID = new_id
+            self.SRN_ID = next_document_number('stock_return')
         if self.pk and self.items.exists():
             self.return_subtotal = sum(item.total for item in self.items.all())
             self.global_discount_amount = self.return_subtotal * (self.global_discount / 100)
             self.amount_to_recover = self.return_subtotal - self.global_discount_amount + self.rounding_adjustment
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous_status = locked_status(self, 'status')
+            super().save(*args, **kwargs)
+            sync_document_stock(self, 'stock_return', previous_status, self.status)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            post_document('stock_return', self.pk, [])
+            return super().delete(*args, **kwargs)
+
+    def stock_lines(self):
+        lines = self.items.values_list(
+            'product_id', Coalesce('stock_receipt_item__warehouse_id', 'product__warehouse_id'), 'qty_returned',
+        )
+        return [(product_id, warehouse_id, -quantity) for product_id, warehouse_id, quantity in lines]
 
 class StockReturnItem(models.Model):
     stock_return = models.ForeignKey(StockReturn, on_delete=models.CASCADE, related_name='items')
@@ -222,8 +308,16 @@ class StockReturnItem(models.Model):
         self.total = self.qty_returned * self.unit_price * (1 - self.discount / 100) * (1 + self.tax / 100)
         if self.qty_returned > (self.qty_rejected or 0):
             raise ValueError("Qty returned cannot exceed rejected qty")
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sync_line_stock(self.stock_return, 'stock_return', 'status')
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            sync_line_stock(self.stock_return, 'stock_return', 'status')
+            return result
 
 class SerialNumberReturn(models.Model):
     stock_return_item = models.ForeignKey(StockReturnItem, on_delete=models.CASCADE, related_name='serial_numbers')
-    serial_no = models.CharField(max_length=50)
\ No newline at end of file
+    serial_no = models.CharField(max_length=50)
\ No newline at end of file
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.models import Product
+from core.sequences import allocate_document_numbers, insert_numbered_documents
+from core.totals import CENT, amount
+from .models import PurchaseOrder, PurchaseOrderItem, PurchaseOrderHistory, StockReceipt, StockReceiptItem
+
+# Quantities on these orders are already coming in and count towards the stock position
+OPEN_ORDER_STATUSES = ['Draft', 'Submitted', 'Partially Received']
+
+
+def _on_order():
+    # What open order lines still have to deliver. Posted receipts against the order are
+    # already in Product.quantity, so a Partially Received order only counts the rest.
+    received = Coalesce(Subquery(
+        StockReceiptItem.objects.filter(
+            stock_receipt__PO_reference=OuterRef('purchase_order'), product=OuterRef('product'),
+            stock_receipt__status__in=StockReceipt.STOCK_POSTED_STATUSES,
+        ).values('product').annotate(total=Sum('qty_received')).values('total')
+    ), 0)
+    return Coalesce(Subquery(
+        PurchaseOrderItem.objects.filter(product=OuterRef('pk'), purchase_order__status__in=OPEN_ORDER_STATUSES)
+        .annotate(outstanding=Greatest(F('qty_ordered') - received, Value(0)))
+        .values('product').annotate(total=Sum('outstanding')).values('total')
+    ), 0)
+
+
+def shortfalls(supplier_ids=None):
+    # One query over the catalogue: active stocked products whose on-hand quantity plus
+    # open orders is below reorder_level. Orders top up to stock_level when it is set
+    # above the reorder point, otherwise back to the reorder point itself.
+    products = Product.objects.filter(reorder_level__gt=0, status='Active').exclude(product_type='Services')
+    if supplier_ids:
+        products = products.filter(supplier_id__in=supplier_ids)
+    return (
+        products.annotate(on_order=_on_order())
+        .annotate(position=F('quantity') + F('on_order'), target=Greatest('reorder_level', 'stock_level'))
+        .filter(position__lt=F('reorder_level'))
+        .values(
+            'id', 'name', 'supplier_id', 'supplier__name', 'unit_price', 'discount', 'tax_code__percentage',
+            'quantity', 'on_order', 'reorder_level', 'position', 'target',
+        )
+        .order_by('supplier_id', 'id')
+    )
+
+
+def plan_reorders(supplier_ids=None):
+    """Group shortfalls by supplier: returns ({(supplier_id, name): [rows]}, rows without a supplier)."""
+    plan = defaultdict(list)
+    unassigned = []
+    for row in shortfalls(supplier_ids).iterator(chunk_size=5000):
+        row['order_qty'] = row['target'] - row['position']
+        if row['supplier_id'] is None:
+            unassigned.append(row)
+        else:
+            plan[(row['supplier_id'], row['supplier__name'])].append(row)
+    return plan, unassigned
+
+
+def _item(row):
+    unit_price = amount(row['unit_price'])
+    discount = amount(row['discount'])
+    tax = amount(row['tax_code__percentage'])
+    net = row['order_qty'] * unit_price * (1 - discount / 100)
+    return PurchaseOrderItem(
+        product_id=row['id'],
+        qty_ordered=row['order_qty'],
+        insufficient_stock=max(row['reorder_level'] - row['quantity'], 0),
+        unit_price=unit_price,
+        tax=tax,
+        discount=discount,
+        # PurchaseOrderItem.save() is skipped by bulk_create, so its total is computed here
+        total=(net * (1 + tax / 100)).quantize(CENT, ROUND_HALF_UP),
+    )
+
+
+def draft_purchase_orders(plan, lead_days=7, currency='INR', performed_by='reorder'):
+    """Insert one Draft PurchaseOrder per supplier in the plan, with its lines in bulk."""
+    suppliers = sorted(plan)
+    today = timezone.localdate()
+    with transaction.atomic():
+        numbers = allocate_document_numbers('purchase_order', len(suppliers))
+        orders, order_items = [], []
+        for number, (supplier_id, supplier_name) in zip(numbers, suppliers):
+            items = [_item(row) for row in plan[(supplier_id, supplier_name)]]
+            subtotal = sum((item.qty_ordered * item.unit_price * (1 - item.discount / 100) for item in items), Decimal('0'))
+            total = sum((item.total for item in items), Decimal('0'))
+            orders.append(PurchaseOrder(
+                PO_ID=number,
+                PO_date=today,
+                delivery_date=today + timedelta(days=lead_days),
+                status='Draft',
+                sales_order_reference='',
+                supplier_id=supplier_id,
+                supplier_name=supplier_name,
+                payment_terms='',
+                inco_terms='',
+                currency=currency,
+                notes_comments=f'Drafted for {len(items)} product(s) below their reorder level',
+                subtotal=subtotal.quantize(CENT, ROUND_HALF_UP),
+                tax_summary=(total - subtotal).quantize(CENT, ROUND_HALF_UP),
+                shipping_charges=Decimal('0'),
+                total_order_value=total,
+            ))
+            order_items.append(items)
+        insert_numbered_documents(PurchaseOrder, 'PO_ID', orders)
+        for order, items in zip(orders, order_items):
+            for item in items:
+                item.purchase_order = order
+        PurchaseOrderItem.objects.bulk_create([item for items in order_items for item in items], batch_size=2000)
+        PurchaseOrderHistory.objects.bulk_create([
+            PurchaseOrderHistory(purchase_order=order, action='Drafted from reorder levels', performed_by=performed_by)
+            for order in orders
+        ])
+    return orders
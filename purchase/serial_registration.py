@@ -0,0 +1,165 @@
+import codecs
+import csv
+import re
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from core.sequences import insert_numbered_documents
+from .models import BatchNumber, BatchSerialNumber, SerialNumber, SerialStock
+from .serial_stock import stock_for_serials
+
+BATCH_SIZE = 1000
+# Upper bound on the serials one request may expand to, ranges included
+MAX_SERIALS = 100000
+TRAILING_NUMBER = re.compile(r'^(.*?)(\d+)(\D*)$')
+
+
+class RegistrationError(Exception):
+    pass
+
+
+def read_csv(file):
+    # Expects a binary file with a serial_no column and an optional batch_no column
+    return csv.DictReader(codecs.iterdecode(file, 'utf-8-sig'))
+
+
+def expand_range(spec):
+    # Either {"first": "SN000001", "last": "SN010000"} or
+    # {"prefix": "SN", "start": 1, "count": 10000, "width": 6, "suffix": ""}
+    if spec.get('first'):
+        first, last = TRAILING_NUMBER.match(spec['first']), TRAILING_NUMBER.match(spec['last'])
+        if not first or not last or first.group(1, 3) != last.group(1, 3):
+            raise RegistrationError(f"{spec['first']}..{spec['last']} is not a range of one prefix and counter")
+        prefix, suffix = first.group(1), first.group(3)
+        start, end, width = int(first.group(2)), int(last.group(2)), len(first.group(2))
+        count = end - start + 1
+    else:
+        prefix, suffix, start, count, width = spec['prefix'], spec['suffix'], spec['start'], spec['count'], spec['width']
+    if count < 1 or count > MAX_SERIALS:
+        raise RegistrationError(f'A range must cover between 1 and {MAX_SERIALS} serials')
+    return [f'{prefix}{number:0{width}d}{suffix}' for number in range(start, start + count)]
+
+
+def collect_serials(spec):
+    serials = list(spec.get('serials', []))
+    for serial_range in spec.get('ranges', []):
+        serials.extend(expand_range(serial_range))
+    max_length = SerialNumber._meta.get_field('serial_no').max_length
+    too_long = [serial for serial in serials if len(serial) > max_length]
+    if too_long:
+        raise RegistrationError(f'Serials are limited to {max_length} characters: {too_long[0]}')
+    return serials
+
+
+def _lookup_chunk_size():
+    # SQLite caps the bound parameters of one statement; other backends take the whole list
+    return connection.features.max_query_params or MAX_SERIALS
+
+
+def _registered(serials):
+    # Serials are unique across plain and batch serials, so one UNION query per chunk finds both
+    serials = list(serials)
+    size = _lookup_chunk_size() // 2
+    found = set()
+    for start in range(0, len(serials), size):
+        chunk = serials[start:start + size]
+        found.update(
+            SerialNumber.objects.filter(serial_no__in=chunk).values_list('serial_no', flat=True).union(
+                BatchSerialNumber.objects.filter(serial_no__in=chunk).values_list('serial_no', flat=True)
+            )
+        )
+    return found
+
+
+def register_serials(item, serials=(), batches=(), reject_conflicts=False):
+    """Register serials and batches against one StockReceiptItem.
+
+    ``serials`` are (serial_no, batch_no) pairs, batch_no None for a plain serial;
+    ``batches`` are new BatchNumber fields for this item. Duplicates are reported in
+    ``conflicts`` and skipped, or nothing is written when ``reject_conflicts`` is set.
+    """
+    report = {'received': len(serials), 'registered': 0, 'batches': 0, 'conflicts': []}
+    if len(serials) > MAX_SERIALS:
+        raise RegistrationError(f'At most {MAX_SERIALS} serials can be registered per request')
+
+    batch_nos = [batch['batch_no'] for batch in batches]
+    if len(set(batch_nos)) != len(batch_nos):
+        raise RegistrationError('Each batch_no may appear only once per request')
+    taken_batches = dict(BatchNumber.objects.filter(batch_no__in=batch_nos).values_list('batch_no', 'stock_receipt_item_id'))
+    for batch_no in sorted(taken_batches):
+        report['conflicts'].append({'batch_no': batch_no, 'reason': 'already registered'})
+    # A taken batch of this line still takes the serials; one of another line cannot
+    foreign_batches = {batch_no for batch_no, item_id in taken_batches.items() if item_id != item.pk}
+
+    seen, fresh = set(), []
+    for serial_no, batch_no in serials:
+        if batch_no in foreign_batches:
+            report['conflicts'].append({'serial_no': serial_no, 'batch_no': batch_no, 'reason': 'batch registered on another line'})
+            continue
+        if serial_no in seen:
+            report['conflicts'].append({'serial_no': serial_no, 'reason': 'repeated in request'})
+            continue
+        seen.add(serial_no)
+        fresh.append((serial_no, batch_no))
+    taken = _registered(seen)
+    for serial_no, _ in fresh:
+        if serial_no in taken:
+            report['conflicts'].append({'serial_no': serial_no, 'reason': 'already registered'})
+    fresh = [(serial_no, batch_no) for serial_no, batch_no in fresh if serial_no not in taken]
+    if report['conflicts'] and reject_conflicts:
+        return report
+
+    per_batch = {}
+    for _, batch_no in fresh:
+        if batch_no:
+            per_batch[batch_no] = per_batch.get(batch_no, 0) + 1
+    for batch in batches:
+        # A batch registered with its serials defaults to holding exactly those serials
+        if batch.get('batch_qty') is None:
+            batch['batch_qty'] = per_batch.get(batch['batch_no'], 0)
+
+    with transaction.atomic():
+        new_batches = insert_numbered_documents(BatchNumber, 'batch_no', [
+            BatchNumber(stock_receipt_item=item, **batch) for batch in batches if batch['batch_no'] not in taken_batches
+        ])
+        batch_ids = dict(BatchNumber.objects.filter(
+            stock_receipt_item=item, batch_no__in={batch_no for _, batch_no in fresh if batch_no},
+        ).values_list('batch_no', 'id'))
+        batch_ids.update((batch.batch_no, batch.pk) for batch in new_batches)
+        unknown = sorted({batch_no for _, batch_no in fresh if batch_no and batch_no not in batch_ids})
+        if unknown:
+            raise RegistrationError(f'Unknown batch_no for this item: {unknown}')
+        _check_quantities(item, fresh, per_batch, batch_ids)
+
+        serial_numbers = insert_numbered_documents(SerialNumber, 'serial_no', [
+            SerialNumber(stock_receipt_item=item, serial_no=serial_no) for serial_no, batch_no in fresh if not batch_no
+        ], batch_size=BATCH_SIZE)
+        SerialStock.objects.bulk_create(stock_for_serials(item, serial_numbers), batch_size=BATCH_SIZE)
+        BatchSerialNumber.objects.bulk_create([
+            BatchSerialNumber(batch_number_id=batch_ids[batch_no], serial_no=serial_no)
+            for serial_no, batch_no in fresh if batch_no
+        ], batch_size=BATCH_SIZE)
+
+    report['registered'] = len(fresh)
+    report['batches'] = len(new_batches)
+    return report
+
+
+def _check_quantities(item, serials, per_batch, batch_ids):
+    # Runs inside the registration transaction: the new serials may not outnumber the
+    # received quantity of the line, or the quantity of the batch they belong to
+    plain = sum(1 for _, batch_no in serials if not batch_no)
+    if plain:
+        total = item.serial_numbers.count() + plain
+        if total > item.qty_received:
+            raise RegistrationError(f'The line received {item.qty_received} unit(s); {total} serials would exceed it')
+    if not per_batch:
+        return
+    batches = BatchNumber.objects.filter(pk__in=[batch_ids[batch_no] for batch_no in per_batch]).values_list('batch_no', 'batch_qty')
+    counts = dict(BatchSerialNumber.objects.filter(batch_number_id__in=[batch_ids[batch_no] for batch_no in per_batch])
+                  .values_list('batch_number__batch_no').annotate(total=Count('id')).order_by())
+    for batch_no, batch_qty in batches:
+        if counts.get(batch_no, 0) + per_batch[batch_no] > batch_qty:
+            raise RegistrationError(f'Batch {batch_no} holds {batch_qty} unit(s); '
+                                    f'{counts.get(batch_no, 0) + per_batch[batch_no]} serials would exceed it')
@@ -0,0 +1,115 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.functions import Coalesce
+
+from .models import SerialNumber, SerialStock
+
+# Serials a delivery line may pick: on the shelf, or back from a customer return
+AVAILABLE_STATUSES = ('in_stock', 'returned')
+
+
+class SerialStockError(Exception):
+    pass
+
+
+def stock_for_serials(item, serials):
+    # Status rows for serials just registered against a receipt line
+    if item.product_id is None:
+        return []
+    warehouse_id = item.warehouse_id
+    if warehouse_id is None:
+        warehouse_id = type(item.product).objects.filter(pk=item.product_id).values_list('warehouse_id', flat=True).first()
+    return [
+        SerialStock(serial_number=serial, serial_no=serial.serial_no, product_id=item.product_id, warehouse_id=warehouse_id)
+        for serial in serials
+    ]
+
+
+def available_serials(product_id):
+    return SerialStock.objects.filter(product_id=product_id, status__in=AVAILABLE_STATUSES)
+
+
+def reserve_serials(delivery_note_item, serial_ids):
+    # The conditional UPDATE is the reservation: a serial picked by two deliveries at once
+    # is only updated for one of them, and the other sees a short count and rolls back
+    serial_ids = set(serial_ids)
+    with transaction.atomic():
+        reserved = available_serials(delivery_note_item.product_id).filter(pk__in=serial_ids).update(
+            status='reserved', delivery_note_item=delivery_note_item,
+        )
+        if reserved != len(serial_ids):
+            raise SerialStockError('Some serial numbers are not available for this product')
+        delivery_note_item.serial_numbers.add(*serial_ids)
+
+
+def sync_delivery_serials(delivery_note_id, status, posted_statuses):
+    # Called from DeliveryNote.save()/delete(): delivered while posted, back to reserved
+    # in draft, and released to stock when the note is cancelled or deleted
+    serials = SerialStock.objects.filter(delivery_note_item__delivery_note_id=delivery_note_id)
+    if status in posted_statuses:
+        serials.filter(status='reserved').update(status='delivered')
+    elif status in ('Cancelled', None):
+        serials.filter(status__in=('reserved', 'delivered')).update(status='in_stock', delivery_note_item=None)
+    else:
+        serials.filter(status='delivered').update(status='reserved')
+
+
+def release_item_serials(delivery_note_item_id):
+    SerialStock.objects.filter(
+        delivery_note_item_id=delivery_note_item_id, status__in=('reserved', 'delivered'),
+    ).update(status='in_stock', delivery_note_item=None)
+
+
+def sync_return_serials(delivery_note_return_id, posted):
+    # Called from DeliveryNoteReturn.save()/delete() with whether the return is submitted
+    serials = SerialStock.objects.filter(serial_number__deliverynotereturnitem__delivery_note_return_id=delivery_note_return_id)
+    if posted:
+        serials.filter(status='delivered').update(status='returned')
+    else:
+        serials.filter(status='returned').update(status='delivered')
+
+
+def rebuild_serial_stock(batch_size=1000):
+    """Recompute every serial's status from receipts, delivery lines and customer returns."""
+    DeliveryNote = apps.get_model('crm', 'DeliveryNote')
+    DeliveryNoteItem = apps.get_model('crm', 'DeliveryNoteItem')
+    DeliveryNoteReturnItem = apps.get_model('crm', 'DeliveryNoteReturnItem')
+    posted = DeliveryNote.STOCK_POSTED_STATUSES
+    # The latest live delivery line of each serial decides reserved/delivered
+    deliveries = {}
+    for serial_id, item_id, delivery_status in (
+        DeliveryNoteItem.serial_numbers.through.objects
+        .exclude(deliverynoteitem__delivery_note__delivery_status='Cancelled')
+        .values_list('serialnumber_id', 'deliverynoteitem_id', 'deliverynoteitem__delivery_note__delivery_status')
+        .order_by('deliverynoteitem_id')
+    ):
+        deliveries[serial_id] = (item_id, 'delivered' if delivery_status in posted else 'reserved')
+    returned = set(
+        DeliveryNoteReturnItem.serial_numbers.through.objects
+        .filter(deliverynotereturnitem__delivery_note_return__status__in=apps.get_model('crm', 'DeliveryNoteReturn').STOCK_POSTED_STATUSES)
+        .values_list('serialnumber_id', flat=True)
+    )
+
+    rows = SerialNumber.objects.filter(stock_receipt_item__product__isnull=False).values_list(
+        'id', 'serial_no', 'stock_receipt_item__product_id',
+        Coalesce('stock_receipt_item__warehouse_id', 'stock_receipt_item__product__warehouse_id'),
+    ).order_by('id')
+    created = 0
+    with transaction.atomic():
+        SerialStock.objects.all().delete()
+        batch = []
+        for serial_id, serial_no, product_id, warehouse_id in rows.iterator(chunk_size=batch_size):
+            item_id, serial_status = deliveries.get(serial_id, (None, 'in_stock'))
+            if serial_status == 'delivered' and serial_id in returned:
+                serial_status = 'returned'
+            batch.append(SerialStock(
+                serial_number_id=serial_id, serial_no=serial_no, product_id=product_id, warehouse_id=warehouse_id,
+                status=serial_status, delivery_note_item_id=item_id,
+            ))
+            if len(batch) >= batch_size:
+                SerialStock.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        SerialStock.objects.bulk_create(batch)
+        created += len(batch)
+    return created
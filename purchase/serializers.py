@@ -62,7 +62,7 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
     
 
 from rest_framework import serializers
-from .models import StockReceipt, StockReceiptItem, SerialNumber, BatchNumber, BatchSerialNumber, StockReceiptRemark, StockReceiptAttachment
+from .models import StockReceipt, StockReceiptItem, SerialNumber, SerialStock, BatchNumber, BatchSerialNumber, StockReceiptRemark, StockReceiptAttachment
 
 class StockReceiptAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -79,6 +79,13 @@ class SerialNumberSerializer(serializers.ModelSerializer):
         model = SerialNumber
         fields = ['id', 'serial_no']
 
+class SerialStockSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='serial_number_id', read_only=True)
+
+    class Meta:
+        model = SerialStock
+        fields = ['id', 'serial_no', 'status', 'warehouse']
+
 class BatchSerialNumberSerializer(serializers.ModelSerializer):
     class Meta:
         model = BatchSerialNumber
@@ -98,13 +105,45 @@ class BatchNumberSerializer(serializers.ModelSerializer):
             BatchSerialNumber.objects.create(batch_number=batch, **serial_data)
         return batch
 
+class SerialRangeSerializer(serializers.Serializer):
+    # Either first/last ("SN000001".."SN010000") or prefix + start/count + zero-padding width
+    first = serializers.CharField(max_length=50, required=False)
+    last = serializers.CharField(max_length=50, required=False)
+    prefix = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    suffix = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    start = serializers.IntegerField(min_value=0, required=False)
+    count = serializers.IntegerField(min_value=1, required=False)
+    width = serializers.IntegerField(min_value=0, max_value=50, default=0)
+
+    def validate(self, data):
+        if data.get('first') or data.get('last'):
+            if not (data.get('first') and data.get('last')):
+                raise serializers.ValidationError('first and last must be given together')
+        elif data.get('start') is None or data.get('count') is None:
+            raise serializers.ValidationError('Give first and last, or start and count')
+        return data
+
+class BatchRegistrationSerializer(serializers.Serializer):
+    batch_no = serializers.CharField(max_length=50)
+    batch_qty = serializers.IntegerField(min_value=0, required=False)
+    mfg_date = serializers.DateField()
+    expiry_date = serializers.DateField()
+    serials = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    ranges = SerialRangeSerializer(many=True, required=False)
+
+class SerialRegistrationSerializer(serializers.Serializer):
+    serials = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    ranges = SerialRangeSerializer(many=True, required=False)
+    batches = BatchRegistrationSerializer(many=True, required=False)
+    on_conflict = serializers.ChoiceField(choices=['skip', 'reject'], default='skip')
+
 class StockReceiptItemSerializer(serializers.ModelSerializer):
     serial_numbers = SerialNumberSerializer(many=True, required=False)
     batch_numbers = BatchNumberSerializer(many=True, required=False)
 
     class Meta:
         model = StockReceiptItem
-        fields = ['id', 'product', 'product_id', 'uom', 'qty_ordered', 'qty_received', 'accepted_qty', 'rejected_qty', 'qty_returned', 'stock_dim', 'warehouse', 'serial_numbers', 'batch_numbers']
+        fields = ['id', 'product', 'product_id', 'uom', 'qty_ordered', 'qty_received', 'accepted_qty', 'rejected_qty', 'qty_returned', 'stock_dim', 'warehouse', 'unit_price', 'tax', 'discount', 'serial_numbers', 'batch_numbers']
         extra_kwargs = {
             'product_id': {'required': False, 'allow_blank': True},
             'uom': {'required': False, 'allow_blank': True},
@@ -118,7 +157,7 @@ class StockReceiptItemSerializer(serializers.ModelSerializer):
         for serial_data in serial_numbers_data:
             SerialNumber.objects.create(stock_receipt_item=item, **serial_data)
         for batch_data in batch_numbers_data:
-            BatchNumberSerializer().create(batch_data)
+            BatchNumberSerializer().create({**batch_data, 'stock_receipt_item': item})
         return item
 
 class StockReceiptSerializer(serializers.ModelSerializer):
@@ -136,7 +175,7 @@ class StockReceiptSerializer(serializers.ModelSerializer):
         remarks_data = validated_data.pop('remarks', [])
         stock_receipt = StockReceipt.objects.create(**validated_data)
         for item_data in items_data:
-            StockReceiptItemSerializer().create(item_data)
+            StockReceiptItemSerializer().create({**item_data, 'stock_receipt': stock_receipt})
         for attachment_data in attachments_data:
             StockReceiptAttachment.objects.create(stock_receipt=stock_receipt, **attachment_data)
         for remark_data in remarks_data:
@@ -151,7 +190,7 @@ class StockReceiptSerializer(serializers.ModelSerializer):
         if items_data:
             instance.items.all().delete()
             for item_data in items_data:
-                StockReceiptItemSerializer().create(item_data)
+                StockReceiptItemSerializer().create({**item_data, 'stock_receipt': instance})
         if attachments_data:
             instance.attachments.all().delete()
             for attachment_data in attachments_data:
@@ -1,3 +1,116 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.models import Product, StockLevel, Warehouse
+from .models import PurchaseOrder, PurchaseOrderItem, StockReceipt, StockReceiptItem
+from .reorder import shortfalls
+from .serializers import StockReceiptSerializer
+
+
+class StockReceiptLineStockTests(TestCase):
+    # A posted receipt's ledger follows its lines, however they are written
+
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name='Main', location='Chennai')
+        self.product = Product.objects.create(
+            name='Bolt', product_type='Goods', unit_price=1, status='Active', product_usage='Both',
+        )
+
+    def on_hand(self):
+        level = StockLevel.objects.filter(product=self.product, warehouse=self.warehouse).first()
+        return level.on_hand if level else 0
+
+    def test_nested_create_as_submitted_posts_the_lines(self):
+        StockReceiptSerializer().create({
+            'status': 'Submitted',
+            'items': [
+                {'product': self.product, 'qty_received': 12, 'accepted_qty': 10, 'warehouse': self.warehouse, 'unit_price': 1},
+                {'product': self.product, 'qty_received': 3, 'accepted_qty': 3, 'warehouse': self.warehouse, 'unit_price': 1},
+            ],
+        })
+        self.assertEqual(self.on_hand(), 13)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 13)
+
+    def test_line_edits_on_a_posted_receipt_move_stock(self):
+        receipt = StockReceipt.objects.create(status='Submitted')
+        item = StockReceiptItem.objects.create(
+            stock_receipt=receipt, product=self.product, qty_received=10, accepted_qty=10, unit_price=1, warehouse=self.warehouse,
+        )
+        self.assertEqual(self.on_hand(), 10)
+        item.accepted_qty = 7
+        item.save()
+        self.assertEqual(self.on_hand(), 7)
+        item.delete()
+        self.assertEqual(self.on_hand(), 0)
+
+    def test_line_edits_on_a_draft_receipt_post_nothing(self):
+        receipt = StockReceipt.objects.create()
+        StockReceiptItem.objects.create(
+            stock_receipt=receipt, product=self.product, qty_received=10, accepted_qty=10, unit_price=1, warehouse=self.warehouse,
+        )
+        self.assertEqual(self.on_hand(), 0)
+        receipt.status = 'Submitted'
+        receipt.save()
+        self.assertEqual(self.on_hand(), 10)
+
+
+class ReorderPositionTests(TestCase):
+    def test_partially_received_order_counts_only_what_is_still_due(self):
+        product = Product.objects.create(
+            name='Nut', product_type='Goods', unit_price=1, status='Active', product_usage='Both', reorder_level=20,
+        )
+        order = PurchaseOrder.objects.create(
+            delivery_date='2026-11-01', sales_order_reference='', supplier_name='Acme', payment_terms='', inco_terms='',
+            currency='INR', subtotal=0, tax_summary=0, shipping_charges=0, total_order_value=0, status='Partially Received',
+        )
+        PurchaseOrderItem.objects.create(purchase_order=order, product=product, qty_ordered=10, insufficient_stock=0, unit_price=1)
+        receipt = StockReceipt.objects.create(PO_reference=order, status='Submitted')
+        StockReceiptItem.objects.create(stock_receipt=receipt, product=product, qty_received=6, accepted_qty=6, unit_price=1)
+
+        row = shortfalls().get(id=product.pk)
+        # 6 received are on hand, 4 still to come: the order is not counted twice
+        self.assertEqual((row['quantity'], row['on_order'], row['position']), (6, 4, 10))
+
+
+class SerialRegistrationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='stores'))
+        product = Product.objects.create(
+            name='Drill', product_type='Goods', unit_price=1, status='Active', product_usage='Both',
+        )
+        self.receipt = StockReceipt.objects.create()
+        self.items = [
+            StockReceiptItem.objects.create(
+                stock_receipt=self.receipt, product=product, qty_received=5, accepted_qty=5, unit_price=1,
+            )
+            for _ in range(2)
+        ]
+
+    def register(self, item, data):
+        return self.client.post(f'/stock-receipts/{self.receipt.pk}/items/{item.pk}/serials/', data, format='json')
+
+    def test_registers_serials_and_ranges(self):
+        response = self.register(self.items[0], {'serials': ['SN-A'], 'ranges': [{'first': 'SN001', 'last': 'SN003'}]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['registered'], 4)
+        self.assertEqual(self.items[0].serial_numbers.count(), 4)
+
+
+    def test_skip_mode_skips_serials_of_a_batch_taken_by_another_line(self):
+        batch = {'batch_no': 'B1', 'mfg_date': '2026-01-01', 'expiry_date': '2027-01-01'}
+        self.assertEqual(self.register(self.items[0], {'batches': [{**batch, 'serials': ['S1']}]}).status_code, 201)
+
+        response = self.register(self.items[1], {'serials': ['S2'], 'batches': [{**batch, 'serials': ['S3', 'S4']}]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['registered'], 1)
+        self.assertEqual(
+            [conflict.get('serial_no', conflict.get('batch_no')) for conflict in response.data['conflicts']],
+            ['B1', 'S3', 'S4'],
+        )
+        self.assertEqual(list(self.items[1].serial_numbers.values_list('serial_no', flat=True)), ['S2'])
+
+        response = self.register(self.items[1], {'serials': ['S5'], 'batches': [{**batch, 'serials': ['S6']}], 'on_conflict': 'reject'})
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(self.items[1].serial_numbers.filter(serial_no='S5').exists())
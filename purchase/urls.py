@@ -1,6 +1,7 @@
 from django.urls import path
+from core.async_views import run_mode_view
 from. import views
-from .views import PurchaseOrderListView, PurchaseOrderDetailView, PurchaseOrderItemView, PurchaseOrderHistoryView, PurchaseOrderCommentView,  PurchaseOrderEmailView
+from .views import PurchaseOrderListView, PurchaseOrderDetailView, PurchaseOrderItemView, PurchaseOrderHistoryView, PurchaseOrderCommentView,  PurchaseOrderEmailView, AsyncPurchaseOrderEmailView
 
 urlpatterns = [
     path('purchase-orders/', PurchaseOrderListView.as_view(), name='purchase-order-list'),
@@ -9,11 +10,12 @@ urlpatterns = [
     path('purchase-orders/<int:pk>/history/', PurchaseOrderHistoryView.as_view(), name='purchase-order-history'),
     path('purchase-orders/<int:pk>/comments/', PurchaseOrderCommentView.as_view(), name='purchase-order-comments'),
     # path('purchase-orders/<int:pk>/pdf/', PurchaseOrderPDFView.as_view(), name='purchase-order-pdf'),
-    path('purchase-orders/<int:pk>/email/', PurchaseOrderEmailView.as_view(), name='purchase-order-email'),
+    path('purchase-orders/<int:pk>/email/', run_mode_view(PurchaseOrderEmailView, AsyncPurchaseOrderEmailView), name='purchase-order-email'),
 
     path('stock-receipts/', views.StockReceiptListView.as_view(), name='stock-receipt-list'),
     path('stock-receipts/<int:pk>/', views.StockReceiptDetailView.as_view(), name='stock-receipt-detail'),
     path('stock-receipts/<int:pk>/items/', views.StockReceiptItemView.as_view(), name='stock-receipt-items'),
+    path('stock-receipts/<int:pk>/items/<int:item_pk>/serials/', views.StockReceiptItemSerialsView.as_view(), name='stock-receipt-item-serials'),
     path('stock-receipts/<int:pk>/pdf/', views.StockReceiptPDFView.as_view(), name='stock-receipt-pdf'),
-    path('stock-receipts/<int:pk>/email/', views.StockReceiptEmailView.as_view(), name='stock-receipt-email'),
+    path('stock-receipts/<int:pk>/email/', run_mode_view(views.StockReceiptEmailView, views.AsyncStockReceiptEmailView), name='stock-receipt-email'),
 ]
\ No newline at end of file
@@ -5,6 +5,10 @@ from rest_framework import status, permissions
 from .models import PurchaseOrder, PurchaseOrderItem, PurchaseOrderHistory, PurchaseOrderComment
 from .serializers import PurchaseOrderSerializer, PurchaseOrderItemSerializer, PurchaseOrderHistorySerializer, PurchaseOrderCommentSerializer
 from django.core.exceptions import ObjectDoesNotExist
+from core.outbox import queue_email
+from core.async_views import AsyncDocumentEmailView
+from core.listing import ListQuery
+from core.pdf_cache import cached_pdf_response, render_lines
 from django.http import HttpResponse
 from reportlab.lib import colors
 # from reportlab.lib.pagesizes = letter
@@ -13,13 +17,19 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 import io
 
+PURCHASE_ORDER_LISTING = ListQuery(
+    filters={'status': 'status', 'supplier': 'supplier_id', 'date_from': 'PO_date__gte', 'date_to': 'PO_date__lte'},
+    sorts=('PO_date', 'delivery_date'),
+)
+
 class PurchaseOrderListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        purchase_orders = PurchaseOrder.objects.all().order_by('-PO_date')
-        serializer = PurchaseOrderSerializer(purchase_orders, many=True)
-        return Response(serializer.data)
+        listing = PURCHASE_ORDER_LISTING.apply(PurchaseOrder.objects.all(), request, PurchaseOrderSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = PurchaseOrderSerializer(data=request.data)
@@ -178,14 +188,19 @@ class PurchaseOrderEmailView(APIView):
 
             subject = f'Purchase Order {purchase_order.PO_ID}'
             html_message = render_to_string('purchase_order_email_template.html', {'purchase_order': purchase_order})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Purchase Order not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class AsyncPurchaseOrderEmailView(AsyncDocumentEmailView):
+    model = PurchaseOrder
+    template = 'purchase_order_email_template.html'
+    context_name = 'purchase_order'
+    subject = 'Purchase Order {document.PO_ID}'
+    label = 'Purchase Order'
         
 
 
@@ -193,8 +208,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .models import StockReceipt, StockReceiptItem, SerialNumber, BatchNumber, BatchSerialNumber, StockReceiptRemark, StockReceiptAttachment
-from .serializers import StockReceiptSerializer, StockReceiptItemSerializer, SerialNumberSerializer, BatchNumberSerializer, StockReceiptAttachmentSerializer, StockReceiptRemarkSerializer
+from .serializers import StockReceiptSerializer, StockReceiptItemSerializer, SerialNumberSerializer, BatchNumberSerializer, StockReceiptAttachmentSerializer, StockReceiptRemarkSerializer, SerialRegistrationSerializer
+from .serial_registration import RegistrationError, collect_serials, read_csv, register_serials
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError
 from django.http import HttpResponse
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
@@ -203,13 +220,19 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 import io
 
+STOCK_RECEIPT_LISTING = ListQuery(
+    filters={'status': 'status', 'supplier': 'supplier_id', 'date_from': 'received_date__gte', 'date_to': 'received_date__lte'},
+    sorts=('received_date',),
+)
+
 class StockReceiptListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        stock_receipts = StockReceipt.objects.all().order_by('-received_date')
-        serializer = StockReceiptSerializer(stock_receipts, many=True)
-        return Response(serializer.data)
+        listing = STOCK_RECEIPT_LISTING.apply(StockReceipt.objects.all(), request, StockReceiptSerializer)
+        paginator = listing.paginator()
+        page = paginator.paginate_queryset(listing.queryset, request)
+        return paginator.get_paginated_response(listing.serialize(page))
 
     def post(self, request):
         serializer = StockReceiptSerializer(data=request.data)
@@ -262,42 +285,71 @@ class StockReceiptItemView(APIView):
         except ObjectDoesNotExist:
             return Response({'error': 'Stock Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class StockReceiptItemSerialsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk, item_pk):
+        try:
+            item = StockReceiptItem.objects.get(id=item_pk, stock_receipt_id=pk)
+        except ObjectDoesNotExist:
+            return Response({'error': 'Stock Receipt Item not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Either a CSV upload with serial_no (and optionally batch_no) columns, or JSON
+        # with serial lists, ranges and new batches
+        file = request.FILES.get('file')
+        try:
+            if file:
+                rows = read_csv(file)
+                if 'serial_no' not in (rows.fieldnames or []):
+                    return Response({'error': 'Missing required fields: serial_no'}, status=status.HTTP_400_BAD_REQUEST)
+                serials = [
+                    (str(row.get('serial_no') or '').strip(), str(row.get('batch_no') or '').strip() or None)
+                    for row in rows
+                ]
+                serials = [(serial_no, batch_no) for serial_no, batch_no in serials if serial_no]
+                batches = []
+                reject_conflicts = request.data.get('on_conflict') == 'reject'
+            else:
+                serializer = SerialRegistrationSerializer(data=request.data)
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                data = serializer.validated_data
+                serials = [(serial_no, None) for serial_no in collect_serials(data)]
+                batches = []
+                for batch in data.get('batches', []):
+                    serials.extend((serial_no, batch['batch_no']) for serial_no in collect_serials(batch))
+                    batches.append({field: batch[field] for field in ('batch_no', 'batch_qty', 'mfg_date', 'expiry_date') if field in batch})
+                reject_conflicts = data['on_conflict'] == 'reject'
+            report = register_serials(item, serials, batches, reject_conflicts=reject_conflicts)
+        except UnicodeDecodeError:
+            return Response({'error': 'Could not read the uploaded file'}, status=status.HTTP_400_BAD_REQUEST)
+        except RegistrationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response({'error': 'Some serials were registered by another request; retry to see them as conflicts'}, status=status.HTTP_409_CONFLICT)
+        if reject_conflicts and report['conflicts']:
+            return Response(report, status=status.HTTP_409_CONFLICT)
+        return Response(report, status=status.HTTP_201_CREATED)
+
+def stock_receipt_pdf_lines(stock_receipt):
+    return [
+        f"GRN ID: {stock_receipt.GRN_ID}",
+        f"Received Date: {stock_receipt.received_date}",
+        f"Supplier: {stock_receipt.supplier or ''}",
+        f"Total Items: {len(stock_receipt.items.all())}",
+    ]
+
+
 class StockReceiptPDFView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
         try:
             stock_receipt = StockReceipt.objects.get(id=pk)
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            elements = []
-
-            data = [
-                ['GRN ID', stock_receipt.GRN_ID],
-                ['Received Date', stock_receipt.received_date],
-                ['Supplier', stock_receipt.supplier.name],
-                ['Total Items', len(stock_receipt.items.all())],
-            ]
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 12),
-            ]))
-            elements.append(table)
-
-            doc.build(elements)
-            buffer.seek(0)
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="stock_receipt_{stock_receipt.GRN_ID}.pdf"'
-            return response
+            lines = stock_receipt_pdf_lines(stock_receipt)
+            return cached_pdf_response(
+                request, 'stock_receipt', stock_receipt, f'stock_receipt_{stock_receipt.GRN_ID}.pdf', lambda: render_lines(lines), extra=lines
+            )
         except ObjectDoesNotExist:
             return Response({'error': 'Stock Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -315,11 +367,16 @@ class StockReceiptEmailView(APIView):
 
             subject = f'Stock Receipt {stock_receipt.GRN_ID}'
             html_message = render_to_string('stock_receipt_email_template.html', {'stock_receipt': stock_receipt})
-            msg = EmailMessage(subject, html_message, to=[email])
-            msg.content_subtype = 'html'
-            msg.send()
-            return Response({'message': 'Email sent successfully'}, status=status.HTTP_200_OK)
+            queued_email = queue_email(subject, html_message, [email], html=True, user=request.user)
+            return Response({'message': 'Email queued for delivery', 'email_id': queued_email.id}, status=status.HTTP_202_ACCEPTED)
         except ObjectDoesNotExist:
             return Response({'error': 'Stock Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class AsyncStockReceiptEmailView(AsyncDocumentEmailView):
+    model = StockReceipt
+    template = 'stock_receipt_email_template.html'
+    context_name = 'stock_receipt'
+    subject = 'Stock Receipt {document.GRN_ID}'
+    label = 'Stock Receipt'
\ No newline at end of file